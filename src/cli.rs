@@ -15,6 +15,11 @@ pub struct Cli {
     /// Installation path
     #[arg(long)]
     pub install_path: Option<PathBuf>,
+
+    /// Re-verify environment tools even if they were checked recently
+    /// (Linux/macOS: re-create the micromamba base env even if its spec is unchanged)
+    #[arg(long)]
+    pub force_check: bool,
     
     #[command(subcommand)]
     pub command: Option<Commands>,
@@ -100,8 +105,52 @@ pub enum Commands {
 impl Cli {
     /// Parse command line arguments
     pub fn parse_args() -> Self {
+        // Без аргументов или с одной командой без параметров не строим clap-парсер
+        // (команды, help-тексты); всё остальное, включая --help, разбирает clap
+        let mut args = std::env::args_os().skip(1);
+        match (args.next(), args.next()) {
+            (None, _) => return Self::default_invocation(None),
+            (Some(arg), None) => {
+                if let Some(command) = arg.to_str().and_then(Self::unit_command) {
+                    return Self::default_invocation(Some(command));
+                }
+            }
+            _ => {}
+        }
         Self::parse()
     }
+
+    /// Invocation with default flags and the given command
+    fn default_invocation(command: Option<Commands>) -> Self {
+        Self { debug: false, install_path: None, force_check: false, command }
+    }
+
+    /// Subcommands that take no arguments, by name or alias
+    fn unit_command(name: &str) -> Option<Commands> {
+        let command = match name {
+            "setup-env" => Commands::SetupEnv,
+            #[cfg(unix)]
+            "setup-reg" => Commands::SetupReg,
+            #[cfg(unix)]
+            "unregister" => Commands::Unregister,
+            #[cfg(unix)]
+            "uninstall" => Commands::Uninstall,
+            #[cfg(unix)]
+            "change-path" => Commands::ChangePath,
+            "update-repo" | "ur" => Commands::UpdateRepo { repo: None },
+            "list-repos" | "lr" => Commands::ListRepos,
+            "system-info" => Commands::SystemInfo,
+            "check-env" => Commands::CheckEnv,
+            #[cfg(windows)]
+            "install-msvc" => Commands::InstallMsvc,
+            #[cfg(windows)]
+            "check-msvc" => Commands::CheckMsvc,
+            "check-gpu" => Commands::CheckGpu,
+            "version" => Commands::Version,
+            _ => return None,
+        };
+        Some(command)
+    }
     
     /// Check if any command was provided
     pub fn has_command(&self) -> bool {
@@ -112,4 +161,19 @@ impl Cli {
     pub fn get_command(&self) -> &Commands {
         self.command.as_ref().unwrap_or(&Commands::SystemInfo)
     }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_unit_commands_match_clap() {
+        for name in ["setup-env", "update-repo", "ur", "list-repos", "lr", "system-info", "check-env", "check-gpu", "version"] {
+            let fast = Cli::unit_command(name).expect(name);
+            let parsed = Cli::try_parse_from(["portablesource", name]).expect(name).command.expect(name);
+            assert_eq!(std::mem::discriminant(&fast), std::mem::discriminant(&parsed), "{}", name);
+        }
+        assert!(Cli::unit_command("install-repo").is_none());
+    }
 }
\ No newline at end of file
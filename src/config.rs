@@ -4,9 +4,13 @@ use serde::{Deserialize, Serialize};
 use std::collections::HashMap;
 use std::path::{PathBuf};
 use crate::{Result, PortableSourceError};
-use crate::gpu::{GpuDetector, GpuInfo};
+use crate::gpu::{GpuDetector, GpuInfo, GpuType};
 use log::{info, warn};
 
+/// Поколение текущего GPU на время процесса: железо не меняется, а разбор имени повторяется
+/// при каждом has_cuda/get_cuda_version/supports_tensorrt
+static CURRENT_GPU_GENERATION: std::sync::OnceLock<GpuGeneration> = std::sync::OnceLock::new();
+
 // Constants
 pub const SERVER_DOMAIN: &str = "server.portables.dev";
 pub const VERSION: &str = env!("CARGO_PKG_VERSION");
@@ -105,23 +109,41 @@ impl Default for PortableSourceConfig {
     }
 }
 
+/// Подстроки имени GPU по поколениям (в верхнем регистре — сравниваются с именем через to_uppercase)
+const GPU_PATTERNS: &[(GpuGeneration, &[&str])] = &[
+    (GpuGeneration::Pascal, &[
+        "GTX 10", "GTX 1050", "GTX 1060", "GTX 1070", "GTX 1080",
+        "TITAN X", "TITAN XP",
+    ]),
+    (GpuGeneration::Turing, &[
+        "GTX 16", "GTX 1650", "GTX 1660",
+        "RTX 20", "RTX 2060", "RTX 2070", "RTX 2080",
+        "TITAN RTX",
+    ]),
+    (GpuGeneration::Ampere, &[
+        "RTX 30", "RTX 3060", "RTX 3070", "RTX 3080", "RTX 3090",
+        "RTX A", "A40", "A100",
+    ]),
+    (GpuGeneration::AdaLovelace, &[
+        "RTX 40", "RTX 4060", "RTX 4070", "RTX 4080", "RTX 4090",
+        "RTX ADA", "L40", "L4",
+    ]),
+    (GpuGeneration::Blackwell, &[
+        "RTX 50", "RTX 5060", "RTX 5070", "RTX 5080", "RTX 5090",
+    ]),
+];
+
 #[derive(Clone)]
 pub struct ConfigManager {
     config: PortableSourceConfig,
     config_path: PathBuf,
-    gpu_patterns: HashMap<GpuGeneration, Vec<&'static str>>,
-    cuda_mapping: HashMap<GpuGeneration, CudaVersion>,
 }
 
 impl ConfigManager {
     /// Dynamically detect if CUDA should be installed based on GPU
     pub fn has_cuda(&self) -> bool {
-        // Check if we have an NVIDIA GPU that supports CUDA
-        if let Some(gpu_info) = self.detect_gpu() {
-            let gpu_name_upper = gpu_info.name.to_uppercase();
-            return gpu_name_upper.contains("NVIDIA") || gpu_name_upper.contains("GEFORCE") || gpu_name_upper.contains("RTX");
-        }
-        false
+        // Check if we have an NVIDIA GPU that supports CUDA; vendor is classified once at detection
+        self.detect_gpu().is_some_and(|gpu_info| gpu_info.gpu_type == GpuType::Nvidia)
     }
     
     /// Dynamically get CUDA version based on GPU generation
@@ -137,8 +159,12 @@ impl ConfigManager {
     
     /// Dynamically detect GPU generation
     pub fn detect_current_gpu_generation(&self) -> GpuGeneration {
+        if let Some(generation) = CURRENT_GPU_GENERATION.get() {
+            return generation.clone();
+        }
+        // Кэшируем только найденный GPU: None может быть временной ошибкой детекта
         if let Some(gpu_info) = self.detect_gpu() {
-            self.detect_gpu_generation(&gpu_info.name)
+            CURRENT_GPU_GENERATION.get_or_init(|| self.detect_gpu_generation(&gpu_info.name)).clone()
         } else {
             GpuGeneration::Unknown
         }
@@ -205,42 +231,9 @@ impl ConfigManager {
         };
         let config_path = config_path.unwrap_or_else(default_path);
         
-        // Initialize GPU patterns
-        let mut gpu_patterns = HashMap::new();
-        gpu_patterns.insert(GpuGeneration::Pascal, vec![
-            "GTX 10", "GTX 1050", "GTX 1060", "GTX 1070", "GTX 1080",
-            "TITAN X", "TITAN XP"
-        ]);
-        gpu_patterns.insert(GpuGeneration::Turing, vec![
-            "GTX 16", "GTX 1650", "GTX 1660",
-            "RTX 20", "RTX 2060", "RTX 2070", "RTX 2080",
-            "TITAN RTX"
-        ]);
-        gpu_patterns.insert(GpuGeneration::Ampere, vec![
-            "RTX 30", "RTX 3060", "RTX 3070", "RTX 3080", "RTX 3090",
-            "RTX A", "A40", "A100"
-        ]);
-        gpu_patterns.insert(GpuGeneration::AdaLovelace, vec![
-            "RTX 40", "RTX 4060", "RTX 4070", "RTX 4080", "RTX 4090",
-            "RTX ADA", "L40", "L4"
-        ]);
-        gpu_patterns.insert(GpuGeneration::Blackwell, vec![
-            "RTX 50", "RTX 5060", "RTX 5070", "RTX 5080", "RTX 5090"
-        ]);
-        
-        // Initialize CUDA mapping
-        let mut cuda_mapping = HashMap::new();
-        cuda_mapping.insert(GpuGeneration::Pascal, CudaVersion::Cuda118);
-        cuda_mapping.insert(GpuGeneration::Turing, CudaVersion::Cuda124);
-        cuda_mapping.insert(GpuGeneration::Ampere, CudaVersion::Cuda124);
-        cuda_mapping.insert(GpuGeneration::AdaLovelace, CudaVersion::Cuda128);
-        cuda_mapping.insert(GpuGeneration::Blackwell, CudaVersion::Cuda128);
-        
         let mut manager = Self {
             config: PortableSourceConfig::default(),
             config_path,
-            gpu_patterns,
-            cuda_mapping,
         };
         
         // Try to load existing config
@@ -283,8 +276,8 @@ impl ConfigManager {
     pub fn detect_gpu_generation(&self, gpu_name: &str) -> GpuGeneration {
         let gpu_name_upper = gpu_name.to_uppercase();
         
-        for (generation, patterns) in &self.gpu_patterns {
-            if patterns.iter().any(|pattern| gpu_name_upper.contains(&pattern.to_uppercase())) {
+        for (generation, patterns) in GPU_PATTERNS {
+            if patterns.iter().any(|pattern| gpu_name_upper.contains(pattern)) {
                 return generation.clone();
             }
         }
@@ -294,7 +287,12 @@ impl ConfigManager {
     }
     
     pub fn get_recommended_cuda_version(&self, generation: &GpuGeneration) -> Option<CudaVersion> {
-        self.cuda_mapping.get(generation).cloned()
+        match generation {
+            GpuGeneration::Pascal => Some(CudaVersion::Cuda118),
+            GpuGeneration::Turing | GpuGeneration::Ampere => Some(CudaVersion::Cuda124),
+            GpuGeneration::AdaLovelace | GpuGeneration::Blackwell => Some(CudaVersion::Cuda128),
+            GpuGeneration::Unknown => None,
+        }
     }
     
     pub fn get_gpu_name(&self) -> String {
@@ -457,7 +455,8 @@ impl ConfigManager {
             std::fs::create_dir_all(parent)?;
         }
         
-        let json = serde_json::to_string_pretty(&self.config)?;
+        // Сериализуем сразу в байты и пишем одним вызовом
+        let json = serde_json::to_vec_pretty(&self.config)?;
         std::fs::write(&self.config_path, json)?;
         
         info!("Configuration saved to: {:?}", self.config_path);
@@ -465,60 +464,19 @@ impl ConfigManager {
     }
     
     pub fn load_config(&mut self) -> Result<()> {
-        if !self.config_path.exists() {
-            info!("No configuration file found, creating default configuration");
-            return Ok(()); // Use default config
-        }
-        
-        let content = std::fs::read_to_string(&self.config_path)?;
-        self.config = serde_json::from_str(&content)?;
+        // Читаем байты без отдельной проверки exists() и без промежуточной String
+        let content = match std::fs::read(&self.config_path) {
+            Ok(content) => content,
+            Err(e) if e.kind() == std::io::ErrorKind::NotFound => {
+                info!("No configuration file found, creating default configuration");
+                return Ok(()); // Use default config
+            }
+            Err(e) => return Err(e.into()),
+        };
+        self.config = serde_json::from_slice(&content)?;
         
         info!("Configuration loaded from: {:?}", self.config_path);
         Ok(())
     }
     
 }
-
-// Detect CUDA version by parsing `nvcc --version` output (Linux)
-#[cfg(unix)]
-fn detect_cuda_version_from_nvcc() -> Option<CudaVersion> {
-    let output = std::process::Command::new("nvcc")
-        .arg("--version")
-        .output()
-        .ok()?;
-    if !output.status.success() { return None; }
-    let stdout = String::from_utf8_lossy(&output.stdout);
-    // Typical line: "Cuda compilation tools, release 12.4, V12.4.131"
-    for line in stdout.lines() {
-        let l = line.to_lowercase();
-        if l.contains("release") && l.contains("cuda compilation tools") {
-            // extract number after 'release '
-            if let Some(pos) = l.find("release") {
-                let rest = &l[pos + "release".len()..];
-                let rest = rest.trim().trim_start_matches(':').trim_start_matches(',').trim();
-                // rest starts like "12.4, v12.4.131"
-                let ver = rest.split(|c| c == ',' || c == ' ').next().unwrap_or("");
-                if ver.starts_with("12.8") { return Some(CudaVersion::Cuda128); }
-                if ver.starts_with("12.4") { return Some(CudaVersion::Cuda124); }
-                if ver.starts_with("11.8") { return Some(CudaVersion::Cuda118); }
-            }
-        }
-    }
-    None
-}
-
-// Fallback: detect CUDA Toolkit installed on filesystem
-#[cfg(unix)]
-fn detect_cuda_version_from_filesystem() -> Option<CudaVersion> {
-    use std::fs;
-    use std::path::Path;
-    let vt = Path::new("/usr/local/cuda/version.txt");
-    if let Ok(content) = fs::read_to_string(vt) {
-        let lower = content.to_lowercase();
-        // lines like: CUDA Version 12.4.0
-        if lower.contains("12.8") { return Some(CudaVersion::Cuda128); }
-        if lower.contains("12.4") { return Some(CudaVersion::Cuda124); }
-        if lower.contains("11.8") { return Some(CudaVersion::Cuda118); }
-    }
-    None
-}
\ No newline at end of file
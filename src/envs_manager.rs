@@ -5,18 +5,23 @@
 
 use crate::{Result, PortableSourceError};
 use crate::config::{ConfigManager, ToolLinks};
+use crate::utils::{download_buffer_size, send_with_retry, DOWNLOAD_CHUNK_SIZE};
 use url::Url;
 use std::fs::{self, OpenOptions};
 use std::io::{self, Seek, SeekFrom, Read, Write};
 use std::path::Path;
 use std::process::{Command, Stdio};
-use crate::gpu::GpuDetector;
-use std::collections::HashMap;
+use std::collections::{HashMap, HashSet};
 use std::path::{PathBuf};
 use std::sync::{Arc, Mutex};
 use std::sync::atomic::{AtomicUsize, Ordering};
-use indicatif::{ProgressBar, ProgressStyle};
-use std::time::Instant;
+use indicatif::{MultiProgress, ProgressBar, ProgressDrawTarget, ProgressStyle};
+use std::time::{Duration, Instant, SystemTime};
+
+/// Marker written into ps_env after a successful tool verification
+const ENV_VERIFIED_STAMP: &str = ".env_ok";
+/// How long a successful verification is trusted when nothing was installed
+const ENV_VERIFIED_TTL: Duration = Duration::from_secs(6 * 60 * 60);
 
 #[derive(Clone, Debug)]
 struct PortableToolSpec {
@@ -30,8 +35,13 @@ pub struct PortableEnvironmentManager {
     install_path: PathBuf,
     ps_env_path: PathBuf,
     config_manager: ConfigManager,
-    gpu_detector: GpuDetector,
     tool_specs: HashMap<String, PortableToolSpec>,
+    force_check: bool,
+    /// Найденные исполняемые файлы (python/git/ffmpeg); кэшируются только найденные,
+    /// так что установка в ходе работы подхватывается следующим поиском
+    exe_cache: Mutex<HashMap<&'static str, PathBuf>>,
+    /// Собранное окружение для дочерних процессов; сбрасывается после установки инструментов
+    subprocess_env: Mutex<Option<Arc<HashMap<String, String>>>>,
 }
 
 impl PortableEnvironmentManager {
@@ -39,18 +49,31 @@ impl PortableEnvironmentManager {
         let ps_env_path = install_path.join("ps_env");
         let config_manager = ConfigManager::new(None).expect("ConfigManager init failed");
         let tool_specs = Self::build_tool_specs();
-        Self { install_path, ps_env_path, config_manager, gpu_detector: GpuDetector::new(), tool_specs }
+        Self { install_path, ps_env_path, config_manager, tool_specs, force_check: false, exe_cache: Mutex::default(), subprocess_env: Mutex::default() }
     }
 
     pub fn with_config(install_path: PathBuf, config_manager: ConfigManager) -> Self {
         let ps_env_path = install_path.join("ps_env");
         let tool_specs = Self::build_tool_specs();
-        Self { install_path, ps_env_path, config_manager, gpu_detector: GpuDetector::new(), tool_specs }
+        Self { install_path, ps_env_path, config_manager, tool_specs, force_check: false, exe_cache: Mutex::default(), subprocess_env: Mutex::default() }
+    }
+
+    /// Always run the tool verification, ignoring a recent success marker
+    pub fn with_force_check(mut self, force_check: bool) -> Self {
+        self.force_check = force_check;
+        self
+    }
+
+    /// Top-level entries of ps_env from a single read_dir; lets the install checks skip
+    /// stat calls for tools whose folder is not there at all
+    fn ps_env_entries(&self) -> HashSet<String> {
+        crate::utils::list_dir_names(&self.ps_env_path).unwrap_or_default()
     }
 
     /// Check if portable tool with given key is already installed (by executable presence)
-    fn is_tool_installed(&self, key: &str) -> bool {
+    fn is_tool_installed(&self, key: &str, ps_env_entries: &HashSet<String>) -> bool {
         if let Some(spec) = self.tool_specs.get(key) {
+            if !ps_env_entries.contains(&spec.extract_path) { return false; }
             let exe_path = self.ps_env_path.join(&spec.executable_path);
             return exe_path.exists();
         }
@@ -58,9 +81,8 @@ impl PortableEnvironmentManager {
     }
 
     /// Check if CUDA is already installed (by CUDA/bin presence)
-    fn is_cuda_installed(&self) -> bool {
-        let cuda_dir = self.ps_env_path.join("CUDA");
-        cuda_dir.join("bin").exists()
+    fn is_cuda_installed(&self, ps_env_entries: &HashSet<String>) -> bool {
+        ps_env_entries.contains("CUDA") && self.ps_env_path.join("CUDA").join("bin").exists()
     }
 
     fn build_tool_specs() -> HashMap<String, PortableToolSpec> {
@@ -98,40 +120,31 @@ impl PortableEnvironmentManager {
 
     // --- Downloads ---
     fn download_with_resume(&self, url: &str, destination: &Path) -> Result<()> {
-        use reqwest::blocking::Client;
         use reqwest::header::{RANGE, CONTENT_RANGE};
 
-        let client = Client::builder()
-            .timeout(std::time::Duration::from_secs(600))
-            .build()?;
+        let client = crate::utils::download_client()?;
 
         let mut existing_len: u64 = 0;
         if destination.exists() {
             existing_len = destination.metadata()?.len();
         } else if let Some(parent) = destination.parent() { fs::create_dir_all(parent)?; }
 
-        // Проверяем полный размер файла с сервера
-        let head_resp = client.head(url).send()?;
-        if let Some(total_size) = head_resp.content_length() {
-            if existing_len == total_size {
-                // Файл уже полностью скачан
-                let file_name = destination.file_name().map(|s| s.to_string_lossy().to_string()).unwrap_or_else(|| "file".into());
-                println!("[Setup] {} already downloaded.", file_name);
-                return Ok(());
-            }
-        }
-
-        // Try ranged request if we have partial file
+        // Try ranged request if we have partial file; the GET itself tells whether the file is complete
         let mut resp = if existing_len > 0 {
-            client.get(url).header(RANGE, format!("bytes={}-", existing_len)).send()?
+            send_with_retry(client.get(url).header(RANGE, format!("bytes={}-", existing_len)))?
         } else {
-            client.get(url).send()?
+            send_with_retry(client.get(url))?
         };
+        if download_already_complete(&resp, existing_len) {
+            let file_name = destination.file_name().map(|s| s.to_string_lossy().to_string()).unwrap_or_else(|| "file".into());
+            println!("[Setup] {} already downloaded.", file_name);
+            return Ok(());
+        }
 
         if !resp.status().is_success() {
             // If ranged not supported, retry from start
             if existing_len > 0 {
-                resp = client.get(url).send()?;
+                resp = send_with_retry(client.get(url))?;
                 if !resp.status().is_success() {
                     return Err(PortableSourceError::environment(format!(
                         "Download failed: HTTP {}", resp.status()
@@ -146,14 +159,13 @@ impl PortableEnvironmentManager {
                 let pb = create_download_progress_bar(total_opt, &format!("Downloading {}", file_name));
                 let mut downloaded: u64 = 0;
                 let start = Instant::now();
-                let mut buf = [0u8; 64 * 1024];
+                let mut buf = vec![0u8; download_buffer_size(total_opt)];
                 loop {
                     let n = resp.read(&mut buf)?;
                     if n == 0 { break; }
                     f.write_all(&buf[..n])?;
                     downloaded += n as u64;
-                    if let Some(total) = total_opt { pb.set_position(downloaded.min(total)); } else { pb.set_position(downloaded); }
-                    update_download_pb_message(&pb, downloaded, total_opt, start);
+                    report_download_progress(&pb, downloaded, n as u64, total_opt, start);
                 }
                 finish_progress(pb, &format!("Downloaded {}", file_name));
                 return Ok(());
@@ -182,14 +194,13 @@ impl PortableEnvironmentManager {
         if let Some(total) = total_opt { pb.set_position(existing_len.min(total)); }
         let mut downloaded = existing_len;
         let start = Instant::now();
-        let mut buf = [0u8; 64 * 1024];
+        let mut buf = vec![0u8; download_buffer_size(total_opt.map(|total| total.saturating_sub(existing_len)))];
         loop {
             let n = resp.read(&mut buf)?;
             if n == 0 { break; }
             file.write_all(&buf[..n])?;
             downloaded += n as u64;
-            if let Some(total) = total_opt { pb.set_position(downloaded.min(total)); } else { pb.set_position(downloaded); }
-            update_download_pb_message(&pb, downloaded, total_opt, start);
+            report_download_progress(&pb, downloaded, n as u64, total_opt, start);
         }
         finish_progress(pb, &format!("Downloaded {}", file_name));
         Ok(())
@@ -197,28 +208,26 @@ impl PortableEnvironmentManager {
 
     // Static helpers for parallel tasks
     fn download_with_resume_static(url: String, destination: PathBuf) -> Result<()> {
-        use reqwest::blocking::Client;
+        Self::download_with_resume_in(url, destination, None)
+    }
+
+    /// Same as `download_with_resume_static`; with `bars` the progress bar joins a shared
+    /// MultiProgress so concurrent downloads don't overwrite each other's line
+    fn download_with_resume_in(url: String, destination: PathBuf, bars: Option<&MultiProgress>) -> Result<()> {
         use reqwest::header::{RANGE, CONTENT_RANGE};
-        let client = Client::builder().timeout(std::time::Duration::from_secs(600)).build()?;
+        let client = crate::utils::download_client()?;
         if let Some(parent) = destination.parent() { fs::create_dir_all(parent)?; }
         let existing_len: u64 = if destination.exists() { destination.metadata()?.len() } else { 0 };
-        
-        // Проверяем полный размер файла с сервера
-        let head_resp = client.head(&url).send()?;
-        if let Some(total_size) = head_resp.content_length() {
-            if existing_len == total_size {
-                // Файл уже полностью скачан
-                let file_name = destination.file_name().map(|s| s.to_string_lossy().to_string()).unwrap_or_else(|| "file".into());
-                println!("[Setup] {} already downloaded.", file_name);
-                return Ok(());
-            }
-        }
-        
         let mut resp = if existing_len > 0 {
-            client.get(&url).header(RANGE, format!("bytes={}-", existing_len)).send()?
-        } else { client.get(&url).send()? };
+            send_with_retry(client.get(&url).header(RANGE, format!("bytes={}-", existing_len)))?
+        } else { send_with_retry(client.get(&url))? };
+        if download_already_complete(&resp, existing_len) {
+            let file_name = destination.file_name().map(|s| s.to_string_lossy().to_string()).unwrap_or_else(|| "file".into());
+            println!("[Setup] {} already downloaded.", file_name);
+            return Ok(());
+        }
         if !resp.status().is_success() {
-            if existing_len > 0 { resp = client.get(&url).send()?; }
+            if existing_len > 0 { resp = send_with_retry(client.get(&url))?; }
             if !resp.status().is_success() {
                 return Err(PortableSourceError::environment(format!("Download failed: HTTP {}", resp.status())));
             }
@@ -226,17 +235,16 @@ impl PortableEnvironmentManager {
             let mut f = OpenOptions::new().create(true).write(true).open(&destination)?;
             let total_opt = resp.content_length();
             let file_name = destination.file_name().map(|s| s.to_string_lossy().to_string()).unwrap_or_else(|| "download".into());
-            let pb = create_download_progress_bar(total_opt, &format!("Downloading {}", file_name));
+            let pb = attach_progress(bars, create_download_progress_bar(total_opt, &format!("Downloading {}", file_name)));
             let mut downloaded: u64 = 0;
             let start = Instant::now();
-            let mut buf = [0u8; 64 * 1024];
+            let mut buf = vec![0u8; download_buffer_size(total_opt)];
             loop {
                 let n = resp.read(&mut buf)?;
                 if n == 0 { break; }
                 f.write_all(&buf[..n])?;
                 downloaded += n as u64;
-                if let Some(total) = total_opt { pb.set_position(downloaded.min(total)); } else { pb.set_position(downloaded); }
-                update_download_pb_message(&pb, downloaded, total_opt, start);
+                report_download_progress(&pb, downloaded, n as u64, total_opt, start);
             }
             finish_progress(pb, &format!("Downloaded {}", file_name));
             return Ok(());
@@ -251,18 +259,17 @@ impl PortableEnvironmentManager {
             None => resp.content_length().map(|len| existing_len + len),
         };
         let file_name = destination.file_name().map(|s| s.to_string_lossy().to_string()).unwrap_or_else(|| "download".into());
-        let pb = create_download_progress_bar(total_opt, &format!("Downloading {}", file_name));
+        let pb = attach_progress(bars, create_download_progress_bar(total_opt, &format!("Downloading {}", file_name)));
         if let Some(total) = total_opt { pb.set_position(existing_len.min(total)); }
         let mut downloaded = existing_len;
         let start = Instant::now();
-        let mut buf = [0u8; 64 * 1024];
+        let mut buf = vec![0u8; download_buffer_size(total_opt.map(|total| total.saturating_sub(existing_len)))];
         loop {
             let n = resp.read(&mut buf)?;
             if n == 0 { break; }
             file.write_all(&buf[..n])?;
             downloaded += n as u64;
-            if let Some(total) = total_opt { pb.set_position(downloaded.min(total)); } else { pb.set_position(downloaded); }
-            update_download_pb_message(&pb, downloaded, total_opt, start);
+            report_download_progress(&pb, downloaded, n as u64, total_opt, start);
         }
         finish_progress(pb, &format!("Downloaded {}", file_name));
         Ok(())
@@ -344,6 +351,31 @@ impl PortableEnvironmentManager {
         Ok(())
     }
     
+    /// Скачивает .tar.zst и распаковывает его на лету, минуя временный файл архива.
+    /// При ошибке удаляет недораспакованный `cleanup_dir`, чтобы инструмент не считался установленным
+    fn download_and_extract_stream(url: &str, extract_to: &Path, cleanup_dir: &Path, label: &str, bars: Option<&MultiProgress>) -> Result<()> {
+        fs::create_dir_all(extract_to)?;
+        let result = (|| -> Result<()> {
+            let resp = send_with_retry(crate::utils::download_client()?.get(url))?;
+            if !resp.status().is_success() {
+                return Err(PortableSourceError::environment(format!("Download failed: HTTP {}", resp.status())));
+            }
+            let total_opt = resp.content_length();
+            let pb = attach_progress(bars, create_download_progress_bar(total_opt, &format!("Installing {}", label)));
+            let reader = ProgressReader { inner: resp, pb: pb.clone(), downloaded: 0, total_opt, start: Instant::now() };
+            let zstd_decoder = zstd::stream::Decoder::with_buffer(io::BufReader::with_capacity(DOWNLOAD_CHUNK_SIZE, reader))
+                .map_err(|e| PortableSourceError::environment(format!("Failed to create zstd decoder: {}", e)))?;
+            tar::Archive::new(zstd_decoder).unpack(extract_to)
+                .map_err(|e| PortableSourceError::environment(format!("Failed to extract tar archive: {}", e)))?;
+            finish_progress(pb, &format!("Installed {}", label));
+            Ok(())
+        })();
+        if result.is_err() && cleanup_dir.exists() {
+            let _ = fs::remove_dir_all(cleanup_dir);
+        }
+        result
+    }
+
     fn install_portable_tool(&self, key: &str) -> Result<()> {
         let spec = self.tool_specs.get(key).ok_or_else(|| PortableSourceError::environment(format!("Unknown tool: {}", key)))?;
         let exe_path = self.ps_env_path.join(&spec.executable_path);
@@ -356,11 +388,17 @@ impl PortableEnvironmentManager {
             .unwrap_or_else(|| format!("{}.tar.zst", spec.name));
         let archive_path = self.ps_env_path.join(&archive_name);
 
-        self.download_with_resume(&spec.url, &archive_path)?;
         // Extract to ps_env root; archives are structured with top-level folder (ffmpeg/git/python)
-        self.extract_tar_zstd(&archive_path, &self.ps_env_path)?;
-        let _ = fs::remove_file(&archive_path);
+        if archive_path.exists() {
+            // Недокачанный архив с прошлого запуска — докачиваем его, а не начинаем заново
+            self.download_with_resume(&spec.url, &archive_path)?;
+            self.extract_tar_zstd(&archive_path, &self.ps_env_path)?;
+            let _ = fs::remove_file(&archive_path);
+        } else {
+            Self::download_and_extract_stream(&spec.url, &self.ps_env_path, &self.ps_env_path.join(&spec.extract_path), &archive_name, None)?;
+        }
 
+        self.invalidate_subprocess_env();
         if !exe_path.exists() {
             return Err(PortableSourceError::environment(format!(
                 "{} installation failed: executable not found at {:?}",
@@ -371,8 +409,26 @@ impl PortableEnvironmentManager {
     }
 
     // --- Env for subprocess ---
-    pub fn setup_environment_for_subprocess(&self) -> HashMap<String, String> {
-        let mut env_vars: HashMap<String, String> = std::env::vars().collect();
+    /// Overrides for child processes (PATH, CUDA, ...), built once and shared by every spawned command.
+    /// The rest of the environment is inherited by `Command`, so it is not copied here
+    pub fn setup_environment_for_subprocess(&self) -> Arc<HashMap<String, String>> {
+        if let Some(env) = self.subprocess_env.lock().ok().and_then(|c| c.clone()) {
+            return env;
+        }
+        let env = Arc::new(self.build_subprocess_env());
+        // Пока ps_env нет, окружение ещё поменяется — не кэшируем
+        if self.ps_env_path.exists() {
+            if let Ok(mut cache) = self.subprocess_env.lock() { *cache = Some(env.clone()); }
+        }
+        env
+    }
+
+    fn invalidate_subprocess_env(&self) {
+        if let Ok(mut cache) = self.subprocess_env.lock() { *cache = None; }
+    }
+
+    fn build_subprocess_env(&self) -> HashMap<String, String> {
+        let mut env_vars: HashMap<String, String> = HashMap::new();
         if !self.ps_env_path.exists() { return env_vars; }
 
         let mut tool_paths: Vec<String> = Vec::new();
@@ -394,7 +450,7 @@ impl PortableEnvironmentManager {
             if mamba_lib.exists() { ld_paths.push(mamba_lib.to_string_lossy().to_string()); }
             if mamba_lib64.exists() { ld_paths.push(mamba_lib64.to_string_lossy().to_string()); }
             if !ld_paths.is_empty() {
-                let current = env_vars.get("LD_LIBRARY_PATH").cloned().unwrap_or_default();
+                let current = std::env::var("LD_LIBRARY_PATH").unwrap_or_default();
                 let sep = ":";
                 let merged = if current.is_empty() { ld_paths.join(sep) } else { format!("{}{}{}", ld_paths.join(sep), sep, current) };
                 env_vars.insert("LD_LIBRARY_PATH".to_string(), merged);
@@ -402,32 +458,28 @@ impl PortableEnvironmentManager {
         }
 
         // CUDA PATH vars
-        if self.config_manager.has_cuda() {
-            if let Some(base) = self.config_manager.get_cuda_base_path() {
-                if let Some(bin) = self.config_manager.get_cuda_bin() {
-                    if bin.exists() { tool_paths.push(bin.to_string_lossy().to_string()); }
-                    env_vars.insert("CUDA_BIN_PATH".to_string(), bin.to_string_lossy().to_string());
-                }
-                if let Some(lib64) = self.config_manager.get_cuda_lib_64() {
-                    if lib64.exists() { 
-                        tool_paths.push(lib64.to_string_lossy().to_string()); 
-                        env_vars.insert("CUDA_LIB_PATH".to_string(), lib64.to_string_lossy().to_string());
-                    } else if let Some(lib) = self.config_manager.get_cuda_lib() {
-                        if lib.exists() { 
-                            tool_paths.push(lib.to_string_lossy().to_string()); 
-                            env_vars.insert("CUDA_LIB_PATH".to_string(), lib.to_string_lossy().to_string());
-                        }
-                    }
-                }
-                env_vars.insert("CUDA_PATH".to_string(), base.to_string_lossy().to_string());
-                env_vars.insert("CUDA_HOME".to_string(), base.to_string_lossy().to_string());
-                env_vars.insert("CUDA_ROOT".to_string(), base.to_string_lossy().to_string());
+        // get_cuda_base_path сам проверяет has_cuda; bin/lib считаем от base, каждую строку пути — один раз
+        if let Some(base) = self.config_manager.get_cuda_base_path() {
+            let bin = base.join("bin");
+            let bin_str = bin.to_string_lossy().to_string();
+            if bin.exists() { tool_paths.push(bin_str.clone()); }
+            env_vars.insert("CUDA_BIN_PATH".to_string(), bin_str);
+            let lib64 = base.join("lib").join("x64");
+            let lib = base.join("lib");
+            if let Some(lib_dir) = [lib64, lib].into_iter().find(|p| p.exists()) {
+                let lib_str = lib_dir.to_string_lossy().to_string();
+                tool_paths.push(lib_str.clone());
+                env_vars.insert("CUDA_LIB_PATH".to_string(), lib_str);
             }
+            let base_str = base.to_string_lossy().to_string();
+            env_vars.insert("CUDA_PATH".to_string(), base_str.clone());
+            env_vars.insert("CUDA_HOME".to_string(), base_str.clone());
+            env_vars.insert("CUDA_ROOT".to_string(), base_str);
         }
 
         if !tool_paths.is_empty() {
             let sep = if cfg!(windows) { ";" } else { ":" };
-            let current = env_vars.get("PATH").cloned().unwrap_or_default();
+            let current = std::env::var("PATH").unwrap_or_default();
             env_vars.insert("PATH".to_string(), format!("{}{}{}", tool_paths.join(sep), sep, current));
         }
         
@@ -457,7 +509,7 @@ impl PortableEnvironmentManager {
         }
     
         // Остальная часть функции без изменений
-        cmd.envs(&envs)
+        cmd.envs(envs.iter())
             .stdout(Stdio::piped())
             .stderr(Stdio::piped())
             .output()
@@ -516,14 +568,15 @@ impl PortableEnvironmentManager {
             };
             match self.run_in_activated_environment(&cmd, None) {
                 Ok(output) => {
-                    let stdout = String::from_utf8_lossy(&output.stdout).to_string();
-                    let stderr = String::from_utf8_lossy(&output.stderr).to_string();
-                    let text = if stdout.trim().is_empty() { &stderr } else { &stdout };
-                    let version = self.extract_version_from_output(tool, text);
+                    // Декодируем без копий и только нужный поток: stderr — если версии нет в stdout или для ошибки
+                    let stdout = String::from_utf8_lossy(&output.stdout);
+                    let text = if stdout.trim().is_empty() { String::from_utf8_lossy(&output.stderr) } else { stdout };
+                    let version = self.extract_version_from_output(tool, &text);
                     if version != "Unknown version" {
                         log::info!("[OK] {}: {}", tool, version);
                     } else {
                         log::error!("[ERROR] {}: Failed to run (code {:?})", tool, output.status.code());
+                        let stderr = String::from_utf8_lossy(&output.stderr);
                         if !stderr.trim().is_empty() { log::error!("   Error: {}", stderr.trim()); }
                         all_ok = false;
                     }
@@ -546,6 +599,33 @@ impl PortableEnvironmentManager {
         Ok(all_ok)
     }
     
+    /// Verify tools unless nothing was installed and a recent verification marker exists
+    fn verify_environment_tools_cached(&self, installed_anything: bool) -> Result<bool> {
+        let stamp = self.ps_env_path.join(ENV_VERIFIED_STAMP);
+        if !self.force_check && !installed_anything {
+            let fresh = fs::metadata(&stamp)
+                .and_then(|m| m.modified())
+                .ok()
+                .and_then(|mtime| SystemTime::now().duration_since(mtime).ok())
+                .map(|age| age < ENV_VERIFIED_TTL)
+                .unwrap_or(false);
+            if fresh {
+                log::info!("Environment recently verified, skipping tool checks (use --force-check to re-run)");
+                return Ok(true);
+            }
+        }
+
+        let ok = self.verify_environment_tools()?;
+        if ok {
+            let _ = fs::write(&stamp, b"");
+        }
+        Ok(ok)
+    }
+
+    fn invalidate_verification_stamp(&self) {
+        let _ = fs::remove_file(self.ps_env_path.join(ENV_VERIFIED_STAMP));
+    }
+
     /// Setup the portable environment
     pub async fn setup_environment(&self) -> Result<()> {
         log::info!("Setting up portable environment...");
@@ -566,13 +646,15 @@ impl PortableEnvironmentManager {
         let mut total_steps: usize = 0;
 
         // Determine total steps before starting any tasks
+        let ps_env_entries = self.ps_env_entries();
+        let cuda_installed = self.is_cuda_installed(&ps_env_entries);
         let mut cuda_plan: Option<(String, String)> = None; // (download_link, expected_folder)
         if self.config_manager.has_cuda() {
             if let Some(cuda_ver) = self.config_manager.get_cuda_version() {
                 if self.config_manager.get_recommended_backend().contains("cuda") {
                     if let Some(link) = self.config_manager.get_cuda_download_link(Some(&cuda_ver)) {
                         // count CUDA steps only if not installed
-                        if !self.is_cuda_installed() {
+                        if !cuda_installed {
                             total_steps += 2; // CUDA download + extract
                         }
                         let version_debug = format!("{:?}", cuda_ver).to_lowercase();
@@ -586,100 +668,138 @@ impl PortableEnvironmentManager {
         // Each tool: download + extract (only for missing ones)
         let mut tools_to_install: Vec<&str> = Vec::new();
         for key in ["python", "git", "ffmpeg"] {
-            if !self.is_tool_installed(key) {
+            if !self.is_tool_installed(key, &ps_env_entries) {
                 total_steps += 2;
                 tools_to_install.push(key);
             }
         }
 
+        // Что-то будем ставить — прежняя отметка о проверке больше не действительна
+        if total_steps > 0 { self.invalidate_verification_stamp(); self.invalidate_subprocess_env(); }
+
         // Announce total steps
         {
             let _g = print_lock.lock().unwrap();
             println!("[Setup] Total steps: {}", total_steps);
         }
 
-        // Переходим на последовательную установку для стабильного вывода прогресса
         let total_c = total_steps; // используем для сообщений
+        let print_progress = |what: &str| {
+            let _g = print_lock.lock().unwrap();
+            let done = completed.load(Ordering::SeqCst);
+            println!("[Setup] {}", what);
+            println!("[Setup] Progress: {}/{} ({:.0}%)", done, total_c, (done as f32/ total_c as f32)*100.0);
+        };
 
-        if let Some((link, expected_folder)) = cuda_plan {
-            // Skip CUDA task if already installed
-            if !self.is_cuda_installed() {
-                let ps_env = self.ps_env_path.clone();
+        // Что ставим: CUDA (если нужна) и недостающие инструменты
+        let ps_env = self.ps_env_path.clone();
+        let cuda_job = cuda_plan
+            .filter(|_| !cuda_installed)
+            .map(|(link, expected_folder)| {
                 let archive_path = ps_env.join(format!(
                     "CUDA_{}.tar.zst",
                     expected_folder.trim_start_matches("cuda_").to_uppercase()
                 ));
-                {
-                    let _g = print_lock.lock().unwrap();
-                    let done = completed.load(Ordering::SeqCst);
-                    println!("[Setup] Downloading CUDA archive... (step {}/{})", done + 1, total_c);
-                }
-                PortableEnvironmentManager::download_with_resume_static(link, archive_path.clone())?;
-                completed.fetch_add(1, Ordering::SeqCst);
-                {
-                    let _g = print_lock.lock().unwrap();
-                    let done = completed.load(Ordering::SeqCst);
-                    println!("[Setup] Progress: {}/{} ({:.0}%)", done, total_c, (done as f32/ total_c as f32)*100.0);
-                    println!("[Setup] CUDA downloaded.\n[Setup] Extracting CUDA... (next step)");
-                }
-                let temp_extract = ps_env.join("__cuda_extract_temp__");
-                if temp_extract.exists() { let _ = fs::remove_dir_all(&temp_extract); }
-                PortableEnvironmentManager::extract_tar_zstd_static(archive_path.clone(), temp_extract.clone())?;
-                let extracted_sub = temp_extract.join(&expected_folder);
-                let cuda_dir = ps_env.join("CUDA");
-                if cuda_dir.exists() { let _ = fs::remove_dir_all(&cuda_dir); }
-                if !extracted_sub.exists() { return Err(PortableSourceError::environment("Expected CUDA folder missing after extraction")); }
-                fs::rename(&extracted_sub, &cuda_dir)?;
-                let _ = fs::remove_dir_all(&temp_extract);
-                let _ = fs::remove_file(&archive_path);
-                completed.fetch_add(1, Ordering::SeqCst);
-                {
-                    let _g = print_lock.lock().unwrap();
-                    let done = completed.load(Ordering::SeqCst);
-                    println!("[Setup] CUDA extracted.");
-                    println!("[Setup] Progress: {}/{} ({:.0}%)", done, total_c, (done as f32/ total_c as f32)*100.0);
-                }
-            }
-        }
-
-        // Other tools — последовательная установка для корректного отображения прогресса
-        for key in tools_to_install {
-            if let Some(spec) = self.tool_specs.get(key) {
-                let url = spec.url.clone();
-                let archive_name = Url::parse(&url)
+                (link, expected_folder, archive_path)
+            });
+        let tool_jobs: Vec<(String, String, String, PathBuf, PathBuf)> = tools_to_install
+            .iter()
+            .filter_map(|key| self.tool_specs.get(*key))
+            .map(|spec| {
+                let archive_name = Url::parse(&spec.url)
                     .ok()
                     .and_then(|u| u.path_segments().and_then(|mut s| s.next_back()).map(|s| s.to_string()))
                     .unwrap_or_else(|| format!("{}.tar.zst", spec.name));
-                let ps_env = self.ps_env_path.clone();
-                let exe_rel = spec.executable_path.clone();
-                {
-                    let _g = print_lock.lock().unwrap();
-                    let done = completed.load(Ordering::SeqCst);
-                    println!("[Setup] Downloading {}... (step {}/{})", archive_name, done + 1, total_c);
-                }
                 let archive_path = ps_env.join(&archive_name);
-                PortableEnvironmentManager::download_with_resume_static(url, archive_path.clone())?;
-                completed.fetch_add(1, Ordering::SeqCst);
-                {
-                    let _g = print_lock.lock().unwrap();
-                    let done = completed.load(Ordering::SeqCst);
-                    println!("[Setup] Progress: {}/{} ({:.0}%)", done, total_c, (done as f32/ total_c as f32)*100.0);
-                    println!("[Setup] Extracting {}...", archive_name);
-                }
-                PortableEnvironmentManager::extract_tar_zstd_static(archive_path.clone(), ps_env.clone())?;
-                let _ = fs::remove_file(&archive_path);
-                let exe_path = ps_env.join(&exe_rel);
-                if !exe_path.exists() {
-                    return Err(PortableSourceError::environment(format!("Executable not found: {:?}", exe_path)));
+                (archive_name, spec.url.clone(), spec.executable_path.clone(), archive_path, ps_env.join(&spec.extract_path))
+            })
+            .collect();
+        // Инструменты без остатков прошлой загрузки распаковываются прямо из HTTP-потока;
+        // недокачанные архивы (и CUDA, которую выгодно уметь докачивать) идут через файл
+        let (resume_jobs, stream_jobs): (Vec<_>, Vec<_>) = tool_jobs
+            .into_iter()
+            .partition(|(_, _, _, archive_path, _)| archive_path.exists());
+
+        // Загрузки идут параллельно: сеть не простаивает между архивами, общее время ~ самый большой архив.
+        // Распаковка файловых архивов остаётся последовательной — она упирается в диск и CPU
+        let mut downloads: Vec<(&str, &Path)> = Vec::new();
+        if let Some((link, _, archive_path)) = &cuda_job { downloads.push((link.as_str(), archive_path.as_path())); }
+        downloads.extend(resume_jobs.iter().map(|(_, url, _, archive_path, _)| (url.as_str(), archive_path.as_path())));
+        if !downloads.is_empty() || !stream_jobs.is_empty() {
+            {
+                let _g = print_lock.lock().unwrap();
+                let done = completed.load(Ordering::SeqCst);
+                let steps = downloads.len() + 2 * stream_jobs.len();
+                println!("[Setup] Downloading {} archive(s) in parallel... (steps {}-{}/{})", downloads.len() + stream_jobs.len(), done + 1, done + steps, total_c);
+            }
+            let bars = MultiProgress::with_draw_target(ProgressDrawTarget::stderr_with_hz(4));
+            let results: Vec<Result<()>> = std::thread::scope(|scope| {
+                let completed = &completed;
+                let bars = &bars;
+                let ps_env = ps_env.as_path();
+                let mut handles = Vec::with_capacity(downloads.len() + stream_jobs.len());
+                for &(url, archive_path) in &downloads {
+                    handles.push(scope.spawn(move || {
+                        let res = PortableEnvironmentManager::download_with_resume_in(url.to_string(), archive_path.to_path_buf(), Some(bars));
+                        if res.is_ok() { completed.fetch_add(1, Ordering::SeqCst); }
+                        res
+                    }));
                 }
-                completed.fetch_add(1, Ordering::SeqCst);
-                {
-                    let _g = print_lock.lock().unwrap();
-                    let done = completed.load(Ordering::SeqCst);
-                    println!("[Setup] {} installed.", exe_rel);
-                    println!("[Setup] Progress: {}/{} ({:.0}%)", done, total_c, (done as f32/ total_c as f32)*100.0);
+                for (archive_name, url, _, _, extract_dir) in &stream_jobs {
+                    handles.push(scope.spawn(move || {
+                        let res = PortableEnvironmentManager::download_and_extract_stream(url, ps_env, extract_dir, archive_name, Some(bars));
+                        if res.is_ok() { completed.fetch_add(2, Ordering::SeqCst); }
+                        res
+                    }));
                 }
+                handles
+                    .into_iter()
+                    .map(|h| h.join().unwrap_or_else(|_| Err(PortableSourceError::environment("Download thread panicked"))))
+                    .collect()
+            });
+            results.into_iter().collect::<Result<Vec<()>>>()?;
+            print_progress("All archives downloaded.");
+        }
+
+        if let Some((_, expected_folder, archive_path)) = cuda_job {
+            {
+                let _g = print_lock.lock().unwrap();
+                println!("[Setup] Extracting CUDA...");
+            }
+            let temp_extract = ps_env.join("__cuda_extract_temp__");
+            if temp_extract.exists() { let _ = fs::remove_dir_all(&temp_extract); }
+            PortableEnvironmentManager::extract_tar_zstd_static(archive_path.clone(), temp_extract.clone())?;
+            let extracted_sub = temp_extract.join(&expected_folder);
+            let cuda_dir = ps_env.join("CUDA");
+            if cuda_dir.exists() { let _ = fs::remove_dir_all(&cuda_dir); }
+            if !extracted_sub.exists() { return Err(PortableSourceError::environment("Expected CUDA folder missing after extraction")); }
+            fs::rename(&extracted_sub, &cuda_dir)?;
+            let _ = fs::remove_dir_all(&temp_extract);
+            let _ = fs::remove_file(&archive_path);
+            completed.fetch_add(1, Ordering::SeqCst);
+            print_progress("CUDA extracted.");
+        }
+
+        for (archive_name, _, exe_rel, archive_path, _) in resume_jobs {
+            {
+                let _g = print_lock.lock().unwrap();
+                println!("[Setup] Extracting {}...", archive_name);
+            }
+            PortableEnvironmentManager::extract_tar_zstd_static(archive_path.clone(), ps_env.clone())?;
+            let _ = fs::remove_file(&archive_path);
+            let exe_path = ps_env.join(&exe_rel);
+            if !exe_path.exists() {
+                return Err(PortableSourceError::environment(format!("Executable not found: {:?}", exe_path)));
+            }
+            completed.fetch_add(1, Ordering::SeqCst);
+            print_progress(&format!("{} installed.", exe_rel));
+        }
+        for (_, _, exe_rel, _, _) in stream_jobs {
+            let exe_path = ps_env.join(&exe_rel);
+            if !exe_path.exists() {
+                return Err(PortableSourceError::environment(format!("Executable not found: {:?}", exe_path)));
             }
+            print_progress(&format!("{} installed.", exe_rel));
         }
 
         // Итоговая печать прогресса (только если не было 100%)
@@ -707,7 +827,7 @@ impl PortableEnvironmentManager {
         // CUDA paths are now computed dynamically when needed
 
         // Verify tools
-        if !self.verify_environment_tools()? { return Err(PortableSourceError::environment("Environment tools verification failed")); }
+        if !self.verify_environment_tools_cached(total_steps > 0)? { return Err(PortableSourceError::environment("Environment tools verification failed")); }
 
         // Mark completed (без немедленного сохранения)
         cfgm.get_config_mut().environment_setup_completed = true;
@@ -736,12 +856,14 @@ impl PortableEnvironmentManager {
         let mut total_steps: usize = 0;
 
         // CUDA plan detection same as in setup_environment
+        let ps_env_entries = self.ps_env_entries();
+        let cuda_installed = self.is_cuda_installed(&ps_env_entries);
         let mut cuda_plan: Option<(String, String)> = None; // (download_link, expected_folder)
         if self.config_manager.has_cuda() {
             if let Some(cuda_ver) = self.config_manager.get_cuda_version() {
                 if self.config_manager.get_recommended_backend().contains("cuda") {
                     if let Some(link) = self.config_manager.get_cuda_download_link(Some(&cuda_ver)) {
-                        if !self.is_cuda_installed() { total_steps += 2; }
+                        if !cuda_installed { total_steps += 2; }
                         let version_debug = format!("{:?}", cuda_ver).to_lowercase();
                         let cleaned = version_debug.replace("cuda", "").replace(['_', '"'], "");
                         let expected_folder = format!("cuda_{}", cleaned);
@@ -753,12 +875,14 @@ impl PortableEnvironmentManager {
         // python, git, ffmpeg each: download + extract (only for missing ones)
         let mut tools_to_install: Vec<&str> = Vec::new();
         for key in ["python", "git", "ffmpeg"] {
-            if !self.is_tool_installed(key) {
+            if !self.is_tool_installed(key, &ps_env_entries) {
                 total_steps += 2;
                 tools_to_install.push(key);
             }
         }
 
+        if total_steps > 0 { self.invalidate_verification_stamp(); self.invalidate_subprocess_env(); }
+
         // Tell UI initial total
         cb_arc.clone()("init".to_string(), 0, total_steps);
 
@@ -766,7 +890,7 @@ impl PortableEnvironmentManager {
         let total_c = total_steps;
         let cb_cuda = cb_arc.clone();
         if let Some((link, expected_folder)) = cuda_plan {
-            if !self.is_cuda_installed() {
+            if !cuda_installed {
             let ps_env = self.ps_env_path.clone();
             let archive_path = ps_env.join(format!(
                 "CUDA_{}.tar.zst",
@@ -844,7 +968,7 @@ impl PortableEnvironmentManager {
         }
 
         // CUDA paths are now computed dynamically when needed
-        if !self.verify_environment_tools()? { return Err(PortableSourceError::environment("Environment tools verification failed")); }
+        if !self.verify_environment_tools_cached(total_steps > 0)? { return Err(PortableSourceError::environment("Environment tools verification failed")); }
         cfgm.mark_environment_setup_completed(true)?;
         Ok(())
     }
@@ -855,10 +979,10 @@ impl PortableEnvironmentManager {
         if !self.ps_env_path.exists() {
             return Ok(false);
         }
-        let py = self.get_python_executable().map(|p| p.exists()).unwrap_or(false);
-        let git = self.get_git_executable().map(|p| p.exists()).unwrap_or(false);
-        let ffmpeg = self.get_ffmpeg_executable().map(|p| p.exists()).unwrap_or(false);
-        Ok(py && git && ffmpeg)
+        // get_*_executable уже проверяют существование файла
+        Ok(self.get_python_executable().is_some()
+            && self.get_git_executable().is_some()
+            && self.get_ffmpeg_executable().is_some())
     }
     
     /// Install a specific tool
@@ -886,6 +1010,8 @@ impl PortableEnvironmentManager {
         if let Some(git_exe) = self.get_git_executable() {
             let mut cmd = Command::new(git_exe);
             cmd.args(["config", "--global", "http.sslBackend", "openssl"]);
+            // stdout не читается — не захватываем его, stderr нужен для предупреждения
+            cmd.stdout(Stdio::null());
             
             // Hide console window on Windows
             #[cfg(windows)]
@@ -990,49 +1116,60 @@ impl PortableEnvironmentManager {
         Ok(())
     }
     
+    /// Previously found executable for `key`
+    fn cached_executable(&self, key: &'static str) -> Option<PathBuf> {
+        self.exe_cache.lock().ok()?.get(key).cloned()
+    }
+
+    /// First existing path among `candidates`, remembered for later lookups
+    fn find_executable(&self, key: &'static str, candidates: &[PathBuf]) -> Option<PathBuf> {
+        let found = candidates.iter().find(|p| p.exists())?.clone();
+        if let Ok(mut cache) = self.exe_cache.lock() {
+            cache.insert(key, found.clone());
+        }
+        Some(found)
+    }
+
     /// Get path to Python executable
     pub fn get_python_executable(&self) -> Option<PathBuf> {
+        if let Some(p) = self.cached_executable("python") { return Some(p); }
         if cfg!(windows) {
-            let p = self.ps_env_path.join("python").join("python.exe");
-            if p.exists() { return Some(p); }
+            self.find_executable("python", &[self.ps_env_path.join("python").join("python.exe")])
         } else {
             // Linux: prefer micromamba base if present
-            let base = self.install_path.join("ps_env").join("mamba_env").join("bin").join("python");
-            if base.exists() { return Some(base); }
-            let p = self.ps_env_path.join("python").join("bin").join("python");
-            if p.exists() { return Some(p); }
+            self.find_executable("python", &[
+                self.install_path.join("ps_env").join("mamba_env").join("bin").join("python"),
+                self.ps_env_path.join("python").join("bin").join("python"),
+            ])
         }
-        None
     }
 
     // Removed: we universally use `python -m pip` via repository_installer
     
     /// Get path to Git executable
     pub fn get_git_executable(&self) -> Option<PathBuf> {
+        if let Some(p) = self.cached_executable("git") { return Some(p); }
         if cfg!(windows) {
-            let git_path = self.ps_env_path.join("git").join("bin").join("git.exe");
-            return if git_path.exists() { Some(git_path) } else { None };
+            self.find_executable("git", &[self.ps_env_path.join("git").join("bin").join("git.exe")])
         } else {
             // Prefer micromamba base
-            let m_git = self.install_path.join("ps_env").join("mamba_env").join("bin").join("git");
-            if m_git.exists() { return Some(m_git); }
-            let p = self.ps_env_path.join("git").join("bin").join("git");
-            if p.exists() { return Some(p); }
-            None
+            self.find_executable("git", &[
+                self.install_path.join("ps_env").join("mamba_env").join("bin").join("git"),
+                self.ps_env_path.join("git").join("bin").join("git"),
+            ])
         }
     }
 
     /// Get path to FFmpeg executable
     pub fn get_ffmpeg_executable(&self) -> Option<PathBuf> {
+        if let Some(p) = self.cached_executable("ffmpeg") { return Some(p); }
         if cfg!(windows) {
-            let ffmpeg_path = self.ps_env_path.join("ffmpeg").join("ffmpeg.exe");
-            return if ffmpeg_path.exists() { Some(ffmpeg_path) } else { None };
+            self.find_executable("ffmpeg", &[self.ps_env_path.join("ffmpeg").join("ffmpeg.exe")])
         } else {
-            let m_ff = self.install_path.join("ps_env").join("mamba_env").join("bin").join("ffmpeg");
-            if m_ff.exists() { return Some(m_ff); }
-            let p = self.ps_env_path.join("ffmpeg").join("ffmpeg");
-            if p.exists() { return Some(p); }
-            None
+            self.find_executable("ffmpeg", &[
+                self.install_path.join("ps_env").join("mamba_env").join("bin").join("ffmpeg"),
+                self.ps_env_path.join("ffmpeg").join("ffmpeg"),
+            ])
         }
     }
     
@@ -1058,22 +1195,21 @@ impl PortableEnvironmentManager {
             ("git", vec!["--version"]),
             ("ffmpeg", vec!["-version"]),
         ];
-        if let Ok(list) = self.gpu_detector.detect_gpu_wmi() {
-            if list.iter().any(|g| g.gpu_type == crate::gpu::GpuType::Nvidia) {
-                tools.push(("nvcc", vec!["--version"]));
-            }
+        // NVIDIA берём из того же детекта, что уже сделал check_and_suggest_cuda_installation,
+        // без отдельного WMI-запроса (список WMI-адаптеров бывает только на Windows)
+        if cfg!(windows) && self.config_manager.has_cuda() {
+            tools.push(("nvcc", vec!["--version"]));
         }
 
         for (tool, args) in tools {
             let cmd: Vec<String> = std::iter::once(tool.to_string()).chain(args.into_iter().map(|s| s.to_string())).collect();
             match self.run_in_activated_environment(&cmd, None) {
                 Ok(output) => {
-                    let stdout = String::from_utf8_lossy(&output.stdout).to_string();
-                    let stderr = String::from_utf8_lossy(&output.stderr).to_string();
-                    let version = self.extract_version_from_output(tool, &stdout);
+                    let version = self.extract_version_from_output(tool, &String::from_utf8_lossy(&output.stdout));
                     if version != "Unknown version" {
                         status.tools_status.insert(tool.to_string(), ToolStatus { working: true, version: Some(version), error: None, stderr: None });
                     } else {
+                        let stderr = String::from_utf8_lossy(&output.stderr);
                         status.tools_status.insert(tool.to_string(), ToolStatus { working: false, version: None, error: Some(format!("Exit code {:?}", output.status.code())), stderr: if stderr.trim().is_empty() { None } else { Some(stderr.trim().to_string()) } });
                         status.all_tools_working = false;
                     }
@@ -1090,13 +1226,18 @@ impl PortableEnvironmentManager {
 
     /// Get environment info (paths and installed tools)
     pub fn get_environment_info(&self) -> EnvironmentInfo {
-        let python_path = self.get_python_executable();
-        let base_env_exists = self.ps_env_path.exists() && python_path.as_ref().map(|p| p.exists()).unwrap_or(false);
-        let mut installed_tools = HashMap::new();
-        for (name, spec) in &self.tool_specs {
-            let tool_dir = self.ps_env_path.join(&spec.extract_path);
-            installed_tools.insert(name.clone(), tool_dir.exists());
-        }
+        // Папки инструментов — верхний уровень ps_env: один read_dir вместо stat на каждую
+        let entries = self.ps_env_entries();
+        // Интерпретатор лежит в ps_env/python или ps_env/mamba_env: без обеих папок кандидатов не stat'им
+        let python_path = if entries.contains("python") || entries.contains("mamba_env") {
+            self.get_python_executable()
+        } else {
+            None
+        };
+        let base_env_exists = python_path.is_some();
+        let installed_tools = self.tool_specs.iter()
+            .map(|(name, spec)| (name.clone(), entries.contains(&spec.extract_path)))
+            .collect();
         EnvironmentInfo {
             base_env_exists,
             base_env_python: python_path.map(|p| p.to_string_lossy().to_string()),
@@ -1127,20 +1268,26 @@ impl PortableEnvironmentManager {
     
     /// Recursively copy directory from src to dst
     fn copy_dir_recursive(src: &Path, dst: &Path) -> Result<()> {
-        if !src.exists() {
-            return Err(PortableSourceError::environment(format!("Source directory does not exist: {:?}", src)));
-        }
+        let entries = match fs::read_dir(src) {
+            Ok(entries) => entries,
+            Err(e) if e.kind() == std::io::ErrorKind::NotFound => {
+                return Err(PortableSourceError::environment(format!("Source directory does not exist: {:?}", src)));
+            }
+            Err(e) => return Err(e.into()),
+        };
         
-        if !dst.exists() {
-            fs::create_dir_all(dst)?;
-        }
+        fs::create_dir_all(dst)?;
         
-        for entry in fs::read_dir(src)? {
+        for entry in entries {
             let entry = entry?;
             let src_path = entry.path();
             let dst_path = dst.join(entry.file_name());
             
-            if src_path.is_dir() {
+            // Тип берём из dirent, без отдельного stat на каждый элемент; только для ссылок
+            // смотрим на цель, как это делал is_dir()
+            let file_type = entry.file_type()?;
+            let is_dir = if file_type.is_symlink() { fs::metadata(&src_path)?.is_dir() } else { file_type.is_dir() };
+            if is_dir {
                 Self::copy_dir_recursive(&src_path, &dst_path)?;
             } else {
                 fs::copy(&src_path, &dst_path)?;
@@ -1159,6 +1306,7 @@ impl PortableEnvironmentManager {
             // Simply run 'git lfs install' command
             let mut cmd = Command::new(git_exe);
             cmd.args(["lfs", "install"]);
+            cmd.stdout(Stdio::null());
             
             // Hide console window on Windows
             #[cfg(windows)]
@@ -1189,20 +1337,35 @@ impl PortableEnvironmentManager {
 // так как они больше не нужны для tar zstd
 
 // ===== Progress helpers =====
-fn create_download_progress_bar(total_opt: Option<u64>, prefix: &str) -> ProgressBar {
+
+/// Прогресс рисуем только в терминал: в CI/при перенаправлении stderr бары скрыты
+fn progress_enabled() -> bool {
+    use std::io::IsTerminal;
+    io::stderr().is_terminal()
+}
+
+static DOWNLOAD_BAR_STYLE: std::sync::OnceLock<ProgressStyle> = std::sync::OnceLock::new();
+static SPINNER_STYLE: std::sync::OnceLock<ProgressStyle> = std::sync::OnceLock::new();
+static EXTRACT_BAR_STYLE: std::sync::OnceLock<ProgressStyle> = std::sync::OnceLock::new();
+
+/// Шаблон разбирается один раз за процесс; каждому бару отдаётся клон готового стиля
+fn cached_style(cell: &'static std::sync::OnceLock<ProgressStyle>, template: &'static str) -> ProgressStyle {
+    cell.get_or_init(|| ProgressStyle::with_template(template).unwrap().progress_chars("=>-")).clone()
+}
+
+/// Download bar when the size is known, otherwise a spinner; hidden when stderr is not a terminal
+pub(crate) fn create_download_progress_bar(total_opt: Option<u64>, prefix: &str) -> ProgressBar {
+    if !progress_enabled() { return ProgressBar::hidden(); }
     match total_opt {
         Some(total) if total > 0 => {
-            let pb = ProgressBar::new(total);
-            let style = ProgressStyle::with_template("{prefix:.bold} [{bar:40.cyan/blue}] {percent:>3}% {msg} ETA {eta}")
-                .unwrap()
-                .progress_chars("=>-");
-            pb.set_style(style);
+            let pb = ProgressBar::with_draw_target(Some(total), ProgressDrawTarget::stderr_with_hz(4));
+            pb.set_style(cached_style(&DOWNLOAD_BAR_STYLE, "{prefix:.bold} [{bar:40.cyan/blue}] {percent:>3}% {msg} ETA {eta}"));
             pb.set_prefix(prefix.to_string());
             pb
         }
         _ => {
-            let pb = ProgressBar::new_spinner();
-            pb.set_style(ProgressStyle::with_template("{prefix:.bold} {spinner} {msg}").unwrap());
+            let pb = ProgressBar::with_draw_target(None, ProgressDrawTarget::stderr_with_hz(4));
+            pb.set_style(cached_style(&SPINNER_STYLE, "{prefix:.bold} {spinner} {msg}"));
             pb.set_prefix(prefix.to_string());
             pb.enable_steady_tick(std::time::Duration::from_millis(120));
             pb
@@ -1210,12 +1373,19 @@ fn create_download_progress_bar(total_opt: Option<u64>, prefix: &str) -> Progres
     }
 }
 
+/// Register `pb` with a shared MultiProgress when downloads run concurrently
+fn attach_progress(bars: Option<&MultiProgress>, pb: ProgressBar) -> ProgressBar {
+    match bars {
+        // Скрытый бар не добавляем: MultiProgress заменил бы ему draw target
+        Some(bars) if !pb.is_hidden() => bars.add(pb),
+        _ => pb,
+    }
+}
+
 fn create_extract_progress_bar(prefix: &str) -> ProgressBar {
+    if !progress_enabled() { return ProgressBar::hidden(); }
     let pb = ProgressBar::new(100);
-    let style = ProgressStyle::with_template("{prefix:.bold} [{bar:40.magenta/blue}] {pos:>3}% ETA {eta}")
-        .unwrap()
-        .progress_chars("=>-");
-    pb.set_style(style);
+    pb.set_style(cached_style(&EXTRACT_BAR_STYLE, "{prefix:.bold} [{bar:40.magenta/blue}] {pos:>3}% ETA {eta}"));
     pb.set_prefix(prefix.to_string());
     pb
 }
@@ -1224,6 +1394,44 @@ fn finish_progress(pb: ProgressBar, msg: &str) {
     pb.finish_with_message(msg.to_string());
 }
 
+/// Reader над телом ответа, который двигает прогресс-бар загрузки по мере чтения
+struct ProgressReader<R> {
+    inner: R,
+    pb: ProgressBar,
+    downloaded: u64,
+    total_opt: Option<u64>,
+    start: Instant,
+}
+
+impl<R: Read> Read for ProgressReader<R> {
+    fn read(&mut self, buf: &mut [u8]) -> io::Result<usize> {
+        let n = self.inner.read(buf)?;
+        self.downloaded += n as u64;
+        report_download_progress(&self.pb, self.downloaded, n as u64, self.total_opt, self.start);
+        Ok(n)
+    }
+}
+
+/// Файл уже скачан целиком: сервер ответил 416 на Range с конца файла
+/// (или 200 с тем же размером, если Range не поддерживается)
+fn download_already_complete(resp: &reqwest::blocking::Response, existing_len: u64) -> bool {
+    let content_range = resp.headers().get(reqwest::header::CONTENT_RANGE).and_then(|hv| hv.to_str().ok());
+    range_response_complete(resp.status(), content_range, resp.content_length(), existing_len)
+}
+
+fn range_response_complete(status: reqwest::StatusCode, content_range: Option<&str>, content_length: Option<u64>, existing_len: u64) -> bool {
+    use reqwest::StatusCode;
+    if existing_len == 0 { return false; }
+    match status {
+        // "bytes */total"; без заголовка считаем файл полным
+        StatusCode::RANGE_NOT_SATISFIABLE => content_range
+            .and_then(parse_total_from_content_range)
+            .map_or(true, |total| total == existing_len),
+        StatusCode::OK => content_length == Some(existing_len),
+        _ => false,
+    }
+}
+
 fn parse_total_from_content_range(hv: &str) -> Option<u64> {
     // Expected like: "bytes start-end/total"
     if let Some(slash_pos) = hv.rfind('/') {
@@ -1235,6 +1443,16 @@ fn parse_total_from_content_range(hv: &str) -> Option<u64> {
 
 // Функция extract_percent удалена, так как tar не выводит прогресс в процентах
 
+/// Move the download bar to `downloaded` after reading `n` more bytes; the text message
+/// (format! per call) is rebuilt only when a 1 MiB boundary is crossed
+fn report_download_progress(pb: &ProgressBar, downloaded: u64, n: u64, total_opt: Option<u64>, start: Instant) {
+    if pb.is_hidden() { return; }
+    pb.set_position(total_opt.map_or(downloaded, |total| downloaded.min(total)));
+    if (downloaded - n) >> 20 != downloaded >> 20 {
+        update_download_pb_message(pb, downloaded, total_opt, start);
+    }
+}
+
 fn update_download_pb_message(pb: &ProgressBar, downloaded: u64, total_opt: Option<u64>, start: Instant) {
     let elapsed = start.elapsed().as_secs_f64();
     let mb_downloaded = bytes_to_mb(downloaded);
@@ -1277,4 +1495,26 @@ pub struct EnvironmentInfo {
     pub base_env_pip: Option<String>,
     pub installed_tools: HashMap<String, bool>,
     pub paths: EnvironmentPaths,
-}
\ No newline at end of file
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use reqwest::StatusCode;
+
+    #[test]
+    fn test_range_response_complete() {
+        // 416 на Range с конца файла: сверяем размер из "bytes */total"
+        assert!(range_response_complete(StatusCode::RANGE_NOT_SATISFIABLE, Some("bytes */1000"), None, 1000));
+        assert!(!range_response_complete(StatusCode::RANGE_NOT_SATISFIABLE, Some("bytes */2000"), None, 1000));
+        assert!(range_response_complete(StatusCode::RANGE_NOT_SATISFIABLE, None, None, 1000));
+        // Range не поддерживается: 200 с тем же размером
+        assert!(range_response_complete(StatusCode::OK, None, Some(1000), 1000));
+        assert!(!range_response_complete(StatusCode::OK, None, Some(2000), 1000));
+        assert!(!range_response_complete(StatusCode::OK, None, None, 1000));
+        // Докачка продолжается
+        assert!(!range_response_complete(StatusCode::PARTIAL_CONTENT, Some("bytes 1000-1999/2000"), Some(1000), 1000));
+        // Пустой файл никогда не считается скачанным
+        assert!(!range_response_complete(StatusCode::RANGE_NOT_SATISFIABLE, Some("bytes */0"), None, 0));
+    }
+}
@@ -1,7 +1,11 @@
 //! GPU detection and management
+//!
+//! `PORTABLESOURCE_IGNORE_CUDA_DETECTION=1` (or `true`) skips probing entirely: no GPU is
+//! reported and environments are set up CPU-only.
 
 use crate::{Result, PortableSourceError};
 use std::process::Command;
+use std::sync::OnceLock;
 #[cfg(windows)]
 use serde::Deserialize;
 #[cfg(windows)]
@@ -23,6 +27,47 @@ pub struct GpuInfo {
     pub driver_version: Option<String>,
 }
 
+/// Маркеры производителей в одном регулярном выражении: имя GPU просматривается за один проход.
+/// `ATI` — только целым словом, иначе он находится внутри "CORPORATION"
+static GPU_BRAND_RE: OnceLock<regex::Regex> = OnceLock::new();
+
+/// Classify a GPU name / lspci / glxinfo line by vendor (NVIDIA > AMD > Intel when several match)
+pub(crate) fn classify_gpu_brand(text: &str) -> GpuType {
+    let re = GPU_BRAND_RE.get_or_init(|| {
+        regex::Regex::new(r"(?i)(?P<nvidia>NVIDIA|GEFORCE|QUADRO|TESLA|RTX|GTX)|(?P<amd>AMD|\bATI\b|RADEON)|(?P<intel>INTEL)")
+            .expect("valid GPU brand regex")
+    });
+    let mut best = GpuType::Unknown;
+    for caps in re.captures_iter(text) {
+        if caps.name("nvidia").is_some() {
+            return GpuType::Nvidia;
+        } else if caps.name("amd").is_some() {
+            best = GpuType::Amd;
+        } else if best == GpuType::Unknown {
+            best = GpuType::Intel;
+        }
+    }
+    best
+}
+
+/// Результат get_best_gpu на время процесса: железо не меняется, а опрос запускает nvidia-smi/WMI
+static BEST_GPU: OnceLock<Option<GpuInfo>> = OnceLock::new();
+
+/// Ответ nvidia-smi на время процесса (его спрашивают и get_best_gpu, и has_nvidia_gpu)
+static NVIDIA_SMI_GPU: OnceLock<Option<GpuInfo>> = OnceLock::new();
+
+/// Список видеоадаптеров из WMI/WMIC на время процесса (его опрашивают и конфиг, и проверка среды)
+#[cfg(windows)]
+static WMI_GPUS: OnceLock<Vec<GpuInfo>> = OnceLock::new();
+
+/// Env override that turns GPU probing off
+pub const IGNORE_CUDA_DETECTION_VAR: &str = "PORTABLESOURCE_IGNORE_CUDA_DETECTION";
+
+fn gpu_detection_disabled() -> bool {
+    std::env::var(IGNORE_CUDA_DETECTION_VAR)
+        .is_ok_and(|v| v == "1" || v.eq_ignore_ascii_case("true"))
+}
+
 pub struct GpuDetector;
 
 impl GpuDetector {
@@ -30,8 +75,17 @@ impl GpuDetector {
         Self
     }
     
-    /// Detect NVIDIA GPU using nvidia-smi
+    /// Detect NVIDIA GPU using nvidia-smi; queried once per process
     pub fn detect_nvidia_gpu(&self) -> Result<Option<GpuInfo>> {
+        if gpu_detection_disabled() { return Ok(None); }
+        if let Some(cached) = NVIDIA_SMI_GPU.get() {
+            return Ok(cached.clone());
+        }
+        let gpu = self.query_nvidia_smi()?;
+        Ok(NVIDIA_SMI_GPU.get_or_init(|| gpu).clone())
+    }
+
+    fn query_nvidia_smi(&self) -> Result<Option<GpuInfo>> {
         let mut cmd = Command::new("nvidia-smi");
         cmd.args(&["--query-gpu=name,memory.total,driver_version", "--format=csv,noheader,nounits"]);
 
@@ -79,71 +133,78 @@ impl GpuDetector {
         }
     }
     
-    /// Detect GPU using Windows WMI (via wmi crate), fallback to WMIC on Windows only
+    /// Detect GPU using Windows WMI (via wmi crate), fallback to WMIC on Windows only;
+    /// the adapter list is queried once per process
     pub fn detect_gpu_wmi(&self) -> Result<Vec<GpuInfo>> {
+        if gpu_detection_disabled() { return Ok(Vec::new()); }
         #[cfg(windows)]
         {
-            if let Ok(com) = COMLibrary::new() {
-                if let Ok(wmi_con) = WMIConnection::new(com.into()) {
-                    #[derive(Deserialize)]
-                    #[allow(non_snake_case)]
-                    struct Win32VideoController {
-                        #[serde(rename = "Name")] Name: Option<String>,
-                        #[serde(rename = "AdapterRAM")] AdapterRAM: Option<u64>,
-                        #[serde(rename = "DriverVersion")] DriverVersion: Option<String>,
-                    }
-                    if let Ok(results) = wmi_con.query::<Win32VideoController>() {
-                        let mut gpus = Vec::new();
-                        for r in results {
-                            let name = r.Name.unwrap_or_default();
-                            if name.is_empty() { continue; }
-                            let adapter_ram = r.AdapterRAM.unwrap_or(0);
-                            let memory_mb = (adapter_ram / (1024 * 1024)) as u32;
-                            let driver_version = r.DriverVersion;
-                            let gpu_type = self.determine_gpu_type(&name);
-                            gpus.push(GpuInfo { name, gpu_type, memory_mb, driver_version });
-                        }
-                        if !gpus.is_empty() { return Ok(gpus); }
-                    }
-                }
-            }
+            Ok(WMI_GPUS.get_or_init(|| self.query_gpu_wmi()).clone())
+        }
+        #[cfg(not(windows))]
+        {
+            Ok(Vec::new())
+        }
+    }
 
-            // Fallback: WMIC CLI
-            let mut cmd = Command::new("wmic");
-            cmd.args(&["path", "win32_VideoController", "get", "name,AdapterRAM,DriverVersion", "/format:csv"]);
-            {
-                use std::os::windows::process::CommandExt;
-                cmd.creation_flags(0x08000000);
-            }
-            let output = cmd.output();
-            match output {
-                Ok(output) if output.status.success() => {
-                    let stdout = String::from_utf8_lossy(&output.stdout);
+    #[cfg(windows)]
+    fn query_gpu_wmi(&self) -> Vec<GpuInfo> {
+        if let Ok(com) = COMLibrary::new() {
+            if let Ok(wmi_con) = WMIConnection::new(com.into()) {
+                #[derive(Deserialize)]
+                #[allow(non_snake_case)]
+                struct Win32VideoController {
+                    #[serde(rename = "Name")] Name: Option<String>,
+                    #[serde(rename = "AdapterRAM")] AdapterRAM: Option<u64>,
+                    #[serde(rename = "DriverVersion")] DriverVersion: Option<String>,
+                }
+                if let Ok(results) = wmi_con.query::<Win32VideoController>() {
                     let mut gpus = Vec::new();
-                    for line in stdout.lines().skip(1) {
-                        if line.trim().is_empty() { continue; }
-                        let parts: Vec<&str> = line.split(',').collect();
-                        if parts.len() >= 4 {
-                            let name = parts[3].trim().to_string();
-                            if name.is_empty() || name == "Name" { continue; }
-                            let memory_bytes = parts[2].trim().parse::<u64>().unwrap_or(0);
-                            let memory_mb = (memory_bytes / (1024 * 1024)) as u32;
-                            let driver_version = {
-                                let dv = parts.get(1).map(|s| s.trim()).unwrap_or("");
-                                if dv.is_empty() || dv == "DriverVersion" { None } else { Some(dv.to_string()) }
-                            };
-                            let gpu_type = self.determine_gpu_type(&name);
-                            gpus.push(GpuInfo { name, gpu_type, memory_mb, driver_version });
-                        }
+                    for r in results {
+                        let name = r.Name.unwrap_or_default();
+                        if name.is_empty() { continue; }
+                        let adapter_ram = r.AdapterRAM.unwrap_or(0);
+                        let memory_mb = (adapter_ram / (1024 * 1024)) as u32;
+                        let driver_version = r.DriverVersion;
+                        let gpu_type = self.determine_gpu_type(&name);
+                        gpus.push(GpuInfo { name, gpu_type, memory_mb, driver_version });
                     }
-                    Ok(gpus)
+                    if !gpus.is_empty() { return gpus; }
                 }
-                _ => Ok(Vec::new()),
             }
         }
-        #[cfg(not(windows))]
+
+        // Fallback: WMIC CLI
+        let mut cmd = Command::new("wmic");
+        cmd.args(&["path", "win32_VideoController", "get", "name,AdapterRAM,DriverVersion", "/format:csv"]);
         {
-            Ok(Vec::new())
+            use std::os::windows::process::CommandExt;
+            cmd.creation_flags(0x08000000);
+        }
+        let output = cmd.output();
+        match output {
+            Ok(output) if output.status.success() => {
+                let stdout = String::from_utf8_lossy(&output.stdout);
+                let mut gpus = Vec::new();
+                for line in stdout.lines().skip(1) {
+                    if line.trim().is_empty() { continue; }
+                    let parts: Vec<&str> = line.split(',').collect();
+                    if parts.len() >= 4 {
+                        let name = parts[3].trim().to_string();
+                        if name.is_empty() || name == "Name" { continue; }
+                        let memory_bytes = parts[2].trim().parse::<u64>().unwrap_or(0);
+                        let memory_mb = (memory_bytes / (1024 * 1024)) as u32;
+                        let driver_version = {
+                            let dv = parts.get(1).map(|s| s.trim()).unwrap_or("");
+                            if dv.is_empty() || dv == "DriverVersion" { None } else { Some(dv.to_string()) }
+                        };
+                        let gpu_type = self.determine_gpu_type(&name);
+                        gpus.push(GpuInfo { name, gpu_type, memory_mb, driver_version });
+                    }
+                }
+                gpus
+            }
+            _ => Vec::new(),
         }
     }
 
@@ -159,8 +220,7 @@ impl GpuDetector {
                 let text = String::from_utf8_lossy(&out.stdout);
                 for line in text.lines() {
                     let l = line.to_string();
-                    let up = l.to_uppercase();
-                    let gpu_type = if up.contains("NVIDIA") { GpuType::Nvidia } else if up.contains("AMD") || up.contains("ATI") || up.contains("RADEON") { GpuType::Amd } else if up.contains("INTEL") { GpuType::Intel } else { GpuType::Unknown };
+                    let gpu_type = classify_gpu_brand(&l);
                     if gpu_type != GpuType::Unknown {
                         // Try to extract model name between quotes if present
                         let name = if let Some(start) = l.find('"') { if let Some(end) = l[start+1..].find('"') { l[start+1..start+1+end].to_string() } else { l.clone() } } else { l.clone() };
@@ -178,28 +238,30 @@ impl GpuDetector {
         if !out.status.success() { return None; }
         let text = String::from_utf8_lossy(&out.stdout);
         let line = text.lines().next()?.to_string();
-        let lower = line.to_lowercase();
-        let gpu_type = if lower.contains("nvidia") { GpuType::Nvidia } else if lower.contains("amd") || lower.contains("radeon") { GpuType::Amd } else if lower.contains("intel") { GpuType::Intel } else { GpuType::Unknown };
+        let gpu_type = classify_gpu_brand(&line);
         Some(GpuInfo { name: line, gpu_type, memory_mb: 0, driver_version: None })
     }
 
     
     fn determine_gpu_type(&self, name: &str) -> GpuType {
-        let name_upper = name.to_uppercase();
-        
-        if name_upper.contains("NVIDIA") || name_upper.contains("GEFORCE") || name_upper.contains("QUADRO") || name_upper.contains("TESLA") {
-            GpuType::Nvidia
-        } else if name_upper.contains("AMD") || name_upper.contains("RADEON") {
-            GpuType::Amd
-        } else if name_upper.contains("INTEL") {
-            GpuType::Intel
-        } else {
-            GpuType::Unknown
-        }
+        classify_gpu_brand(name)
     }
     
-    /// Get the best available GPU (prioritize NVIDIA)
+    /// Get the best available GPU (prioritize NVIDIA); detected once per process
     pub fn get_best_gpu(&self) -> Result<Option<GpuInfo>> {
+        if gpu_detection_disabled() {
+            log::debug!("{} set, skipping GPU detection", IGNORE_CUDA_DETECTION_VAR);
+            return Ok(None);
+        }
+        if let Some(cached) = BEST_GPU.get() {
+            return Ok(cached.clone());
+        }
+        // Ошибки не кэшируем — следующий вызов попробует снова
+        let gpu = self.detect_best_gpu()?;
+        Ok(BEST_GPU.get_or_init(|| gpu).clone())
+    }
+
+    fn detect_best_gpu(&self) -> Result<Option<GpuInfo>> {
         // First try nvidia-smi for accurate NVIDIA detection
         if let Some(nvidia_gpu) = self.detect_nvidia_gpu()? {
             return Ok(Some(nvidia_gpu));
@@ -237,4 +299,35 @@ impl Default for GpuDetector {
     fn default() -> Self {
         Self::new()
     }
-}
\ No newline at end of file
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_classify_gpu_brand_lspci() {
+        assert_eq!(
+            classify_gpu_brand(r#"00:02.0 "VGA compatible controller" "Intel Corporation" "UHD Graphics 620""#),
+            GpuType::Intel
+        );
+        assert_eq!(
+            classify_gpu_brand(r#"03:00.0 "VGA compatible controller" "Advanced Micro Devices, Inc. [AMD/ATI]" "Navi 21 [Radeon RX 6800]""#),
+            GpuType::Amd
+        );
+        assert_eq!(
+            classify_gpu_brand(r#"01:00.0 "VGA compatible controller" "NVIDIA Corporation" "GA102 [GeForce RTX 3090]""#),
+            GpuType::Nvidia
+        );
+    }
+
+    #[test]
+    fn test_classify_gpu_brand_names() {
+        assert_eq!(classify_gpu_brand("RTX 4090"), GpuType::Nvidia);
+        assert_eq!(classify_gpu_brand("GTX 1080 Ti"), GpuType::Nvidia);
+        assert_eq!(classify_gpu_brand("Radeon RX 7900 XTX"), GpuType::Amd);
+        assert_eq!(classify_gpu_brand("Matrox G200eR2"), GpuType::Unknown);
+        // NVIDIA побеждает, даже если в строке есть Intel (гибридная графика)
+        assert_eq!(classify_gpu_brand("Intel UHD Graphics / NVIDIA GeForce RTX 3060 Laptop GPU"), GpuType::Nvidia);
+    }
+}
@@ -2,7 +2,7 @@
 
 use crate::{Result, PortableSourceError};
 use crate::envs_manager::PortableEnvironmentManager;
-use log::{info, debug};
+use log::{info, debug, log_enabled, Level};
 use std::io::{BufRead, BufReader};
 use std::path::Path;
 use std::process::{Command, Stdio};
@@ -37,7 +37,9 @@ impl<'a> CommandRunner<'a> {
         if args.is_empty() { return Ok(()); }
         
         let mut cmd = self.create_command(args, cwd);
-        cmd.stdout(Stdio::piped()).stderr(Stdio::piped());
+        // stdout нужен только для debug-лога; без него не держим pipe и не режем вывод на строки
+        let stdout = if log_enabled!(Level::Debug) { Stdio::piped() } else { Stdio::null() };
+        cmd.stdout(stdout).stderr(Stdio::piped());
         
         let command_type = self.determine_command_type(args);
         
@@ -70,7 +72,7 @@ impl<'a> CommandRunner<'a> {
             cmd.current_dir(dir);
         }
         let envs = self.env_manager.setup_environment_for_subprocess();
-        cmd.envs(envs);
+        cmd.envs(envs.iter());
         
         // Hide console window on Windows
         #[cfg(windows)]
@@ -84,12 +86,11 @@ impl<'a> CommandRunner<'a> {
         // Твоя логика определения типа команды...
         // ... (скопировано 1-в-1 из твоего run_tool_with_env)
         if args.len() >= 2 {
-            let exe_name = Path::new(&args[0]).file_stem()
-                .and_then(|s| s.to_str())
-                .unwrap_or(&args[0])
-                .to_lowercase();
+            // Без Path и to_lowercase: срез строки и регистронезависимое сравнение
+            let exe_name = exe_stem(&args[0]);
+            let is = |name: &str| exe_name.eq_ignore_ascii_case(name);
             
-            if exe_name == "python" || exe_name == "python3" {
+            if is("python") || is("python3") {
                 if args.len() >= 3 && args[1] == "-m" {
                     match args[2].as_str() {
                         "pip" => CommandType::Pip,
@@ -99,11 +100,11 @@ impl<'a> CommandRunner<'a> {
                 } else {
                     CommandType::Python
                 }
-            } else if exe_name == "pip" || exe_name == "pip3" {
+            } else if is("pip") || is("pip3") {
                 CommandType::Pip
-            } else if exe_name == "uv" {
+            } else if is("uv") {
                 CommandType::Uv
-            } else if exe_name == "git" {
+            } else if is("git") {
                 CommandType::Git
             } else {
                 CommandType::Other
@@ -121,8 +122,6 @@ impl<'a> CommandRunner<'a> {
         if let Some(l) = label { info!("{}...", l); }
         let mut child = cmd.spawn().map_err(|e| PortableSourceError::command(e.to_string()))?;
         
-        let mut stderr_lines = Vec::new();
-        
         let error_prefix = match command_type {
             CommandType::Git => "Git command failed",
             CommandType::Pip => "Pip command failed",
@@ -131,21 +130,37 @@ impl<'a> CommandRunner<'a> {
             CommandType::Other => "Command failed",
         };
         
-        if let Some(out) = child.stdout.take() {
-            let reader = BufReader::new(out);
-            for line in reader.lines().flatten() { debug!("[stdout] {}", line); }
-        }
-        
-        if let Some(err) = child.stderr.take() {
-            let reader = BufReader::new(err);
-            for line in reader.lines().flatten() {
-                debug!("[stderr] {}", line);
-                stderr_lines.push(line);
+        // Вывод читаем потоково сырыми байтами: в строки декодируем только для debug-лога,
+        // а от stderr держим лишь хвост для сообщения об ошибке
+        let stdout = child.stdout.take();
+        let stderr = child.stderr.take();
+        let stderr_buf = std::thread::scope(|s| {
+            // stdout (есть только в debug) — в отдельном потоке, чтобы заполненный pipe stderr не подвесил процесс
+            if let Some(out) = stdout {
+                s.spawn(move || {
+                    for line in BufReader::new(out).split(b'\n').flatten() {
+                        debug!("[stdout] {}", String::from_utf8_lossy(&line).trim_end());
+                    }
+                });
             }
-        }
+            let mut tail = Vec::new();
+            if let Some(err) = stderr {
+                for line in BufReader::new(err).split(b'\n').flatten() {
+                    debug!("[stderr] {}", String::from_utf8_lossy(&line).trim_end());
+                    tail.extend_from_slice(&line);
+                    tail.push(b'\n');
+                    if tail.len() > 2 * STDERR_TAIL_BYTES {
+                        tail.drain(..tail.len() - STDERR_TAIL_BYTES);
+                    }
+                }
+            }
+            tail
+        });
         
         let status = child.wait().map_err(|e| PortableSourceError::command(e.to_string()))?;
         if !status.success() {
+            let stderr_text = String::from_utf8_lossy(&stderr_buf);
+            let stderr_lines: Vec<&str> = stderr_text.lines().collect();
             let error_msg = if !stderr_lines.is_empty() {
                 format!("Command failed with status: {}\nOutput:\n{}", status, stderr_lines.join("\n"))
             } else {
@@ -156,4 +171,16 @@ impl<'a> CommandRunner<'a> {
         }
         Ok(())
     }
-}
\ No newline at end of file
+}
+
+/// How much of a failed command's stderr is kept for the error message
+const STDERR_TAIL_BYTES: usize = 64 * 1024;
+
+/// File stem of an executable argument (`C:\env\python.exe` -> `python`), without allocating
+fn exe_stem(arg: &str) -> &str {
+    let base = arg.rsplit(|c| c == '/' || c == '\\').next().unwrap_or(arg);
+    match base.rfind('.') {
+        Some(dot) if dot > 0 => &base[..dot],
+        _ => base,
+    }
+}
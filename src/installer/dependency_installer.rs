@@ -33,11 +33,19 @@ impl<'a> DependencyInstaller<'a> {
         info!("Installing dependencies for: {:?}", repo_path);
         let repo_name = repo_path.file_name().and_then(|s| s.to_str()).unwrap_or("").to_lowercase();
 
-        // Ensure project environment exists (Windows: copy portable python; Linux: create venv)
-        self.create_venv_environment(&repo_name)?;
+        // Ensure project environment exists (Windows: copy portable python; Linux: create venv).
+        // План установки запрашиваем с сервера параллельно: сеть не ждёт диска и наоборот
+        let server_client = self.server_client;
+        let (venv_result, plan_result) = std::thread::scope(|s| {
+            let plan = s.spawn(|| server_client.get_installation_plan(&repo_name));
+            let venv = self.create_venv_environment(&repo_name);
+            let plan = plan.join().unwrap_or_else(|_| Err(PortableSourceError::installation("install-plan fetch panicked")));
+            (venv, plan)
+        });
+        venv_result?;
 
         // Try server installation plan first
-        if let Some(plan) = self.server_client.get_installation_plan(&repo_name)? {
+        if let Some(plan) = plan_result? {
             info!("Using server installation plan");
             if self.execute_server_installation_plan(&repo_name, &plan, Some(repo_path))? {
                 return Ok(());
@@ -82,11 +90,37 @@ impl<'a> DependencyInstaller<'a> {
         let envs_path = install_path.join("envs");
         let venv_path = envs_path.join(repo_name);
         
-        // Remove existing environment if present
-        if venv_path.exists() { 
-            fs::remove_dir_all(&venv_path)?; 
+        // Остатки прошлых запусков, которые не удалось удалить (например, файл был занят)
+        let mut stale = stale_venv_dirs(&envs_path);
+
+        // Existing environment: переименование в сторону — O(1), а само удаление идёт в фоне,
+        // пока создаётся новое окружение
+        if venv_path.exists() {
+            let aside = envs_path.join(format!(".{}.old.{}", repo_name, std::process::id()));
+            match fs::rename(&venv_path, &aside) {
+                Ok(()) => { if !stale.contains(&aside) { stale.push(aside); } }
+                Err(_) => crate::utils::remove_dir_all_parallel(&venv_path)?,
+            }
+        }
+        let stale_removal = (!stale.is_empty()).then(|| std::thread::spawn(move || {
+            for dir in stale {
+                if let Err(e) = crate::utils::remove_dir_all_parallel(&dir) {
+                    warn!("Failed to remove old environment {:?}: {}", dir, e);
+                }
+            }
+        }));
+
+        let result = self.populate_venv(&install_path, &envs_path, &venv_path);
+        if let Some(handle) = stale_removal {
+            if handle.join().is_err() {
+                warn!("Removal of old environments in {:?} panicked", envs_path);
+            }
         }
+        result
+    }
 
+    /// Fill a fresh `venv_path` (Windows: copy of portable Python; Linux: `python -m venv`)
+    fn populate_venv(&self, install_path: &Path, envs_path: &Path, venv_path: &Path) -> Result<()> {
         if cfg!(windows) {
             // Windows: копируем портативный Python в envs/{repo}
             let ps_env_python = install_path.join("ps_env").join("python");
@@ -134,7 +168,8 @@ impl<'a> DependencyInstaller<'a> {
             
             // Ensure pip is present in the new venv
             let venv_py = venv_path.join("bin").join("python");
-            let pip_ok = {
+            // Скрипт pip, положенный ensurepip, — достаточное доказательство; интерпретатор запускаем только без него
+            let pip_ok = ["pip", "pip3"].iter().any(|n| venv_path.join("bin").join(n).is_file()) || {
                 let mut cmd = std::process::Command::new(&venv_py);
                 cmd.args(["-m", "pip", "--version"]);
                 
@@ -187,4 +222,18 @@ impl<'a> DependencyInstaller<'a> {
         }
         Ok(())
     }
-}
\ No newline at end of file
+}
+/// Hidden `envs/.{repo}.old.{pid}` directories left behind by earlier environment re-creations
+fn stale_venv_dirs(envs_path: &Path) -> Vec<PathBuf> {
+    let Ok(entries) = fs::read_dir(envs_path) else { return Vec::new() };
+    entries
+        .flatten()
+        .filter(|e| {
+            let name = e.file_name();
+            let name = name.to_string_lossy();
+            name.starts_with('.')
+                && name.rsplit_once(".old.").is_some_and(|(_, pid)| !pid.is_empty() && pid.bytes().all(|b| b.is_ascii_digit()))
+        })
+        .map(|e| e.path())
+        .collect()
+}
@@ -1,6 +1,8 @@
 //! Main file finder for detecting the main executable file in repositories.
 
 use crate::installer::server_client::ServerClient;
+use crate::utils::file_name_key;
+use std::collections::HashSet;
 use std::path::Path;
 use std::fs;
 use url::Url;
@@ -26,6 +28,23 @@ impl MainFileFinder {
             }
         }
         
+        // Один read_dir корня репозитория; дальше все проверки по именам файлов в памяти
+        let mut files: Vec<String> = Vec::new();
+        if let Ok(entries) = fs::read_dir(repo_path) {
+            for entry in entries.flatten() {
+                let is_file = match entry.file_type() {
+                    // Ссылку проверяем по цели, как это делал exists()
+                    Ok(t) if t.is_symlink() => fs::metadata(entry.path()).map(|m| m.is_file()).unwrap_or(false),
+                    Ok(t) => t.is_file(),
+                    Err(_) => false,
+                };
+                if is_file {
+                    files.push(entry.file_name().to_string_lossy().to_string());
+                }
+            }
+        }
+        let file_keys: HashSet<String> = files.iter().map(|name| file_name_key(name)).collect();
+
         // 2) Try common names
         let common_names = [
             "run.py", "app.py", "webui.py", "main.py", "start.py", 
@@ -33,30 +52,22 @@ impl MainFileFinder {
         ];
         
         for file_name in common_names {
-            if self.validate_main_file(repo_path, file_name) {
+            if file_keys.contains(&file_name_key(file_name)) {
                 return Some(file_name.to_string());
             }
         }
         
         // 3) Heuristic: any single non-test python file
-        let mut candidates: Vec<String> = Vec::new();
-        if let Ok(entries) = fs::read_dir(repo_path) {
-            for entry in entries.flatten() {
-                if let Ok(file_type) = entry.file_type() {
-                    if file_type.is_file() {
-                        let name = entry.file_name().to_string_lossy().to_string();
-                        
-                        if name.to_lowercase().ends_with(".py") 
-                            && !name.contains("test_") 
-                            && name != "setup.py" 
-                            && !name.contains("__") 
-                            && !name.contains("install") {
-                            candidates.push(name);
-                        }
-                    }
-                }
-            }
-        }
+        let candidates: Vec<String> = files
+            .into_iter()
+            .filter(|name| {
+                name.to_lowercase().ends_with(".py")
+                    && !name.contains("test_")
+                    && name != "setup.py"
+                    && !name.contains("__")
+                    && !name.contains("install")
+            })
+            .collect();
         
         // If only one candidate, use it
         if candidates.len() == 1 {
@@ -81,7 +92,7 @@ impl MainFileFinder {
                     .and_then(|s| s.last())
                     .map(|s| s.trim_end_matches(".git")) {
                     let candidate = format!("{}.py", name);
-                    if self.validate_main_file(repo_path, &candidate) {
+                    if file_keys.contains(&file_name_key(&candidate)) {
                         return Some(candidate);
                     }
                 }
@@ -4,6 +4,7 @@ use crate::installer::command_runer::CommandRunner;
 use crate::config::ConfigManager;
 use crate::PortableSourceError;
 use crate::Result;
+use crate::utils::file_name_key;
 use log::{info, debug};
 use std::path::{Path, PathBuf};
 use std::fs;
@@ -11,6 +12,12 @@ use std::io::Write;
 use serde_json::Value as JsonValue;
 use toml::Value as TomlValue;
 
+/// Platform-specific Triton distribution
+#[cfg(windows)]
+const TRITON_PACKAGE: &str = "triton-windows";
+#[cfg(not(windows))]
+const TRITON_PACKAGE: &str = "triton";
+
 #[derive(Clone, Debug, PartialEq, Eq)]
 enum PackageType {
     Regular,
@@ -186,10 +193,12 @@ impl<'a> PipManager<'a> {
         }
     }
 
-    /// Get python executable path in virtual environment
-    pub fn get_python_in_env(&self, repo_name: &str) -> PathBuf {
-        let cfg = self.config_manager.get_config();
-        let venv_path = cfg.install_path.join("envs").join(repo_name);
+    /// Virtual environment directory of the repository
+    fn venv_path(&self, repo_name: &str) -> PathBuf {
+        self.config_manager.get_config().install_path.join("envs").join(repo_name)
+    }
+
+    fn python_in_venv(venv_path: &Path) -> PathBuf {
         if cfg!(windows) {
             venv_path.join("python.exe")
         } else {
@@ -197,6 +206,11 @@ impl<'a> PipManager<'a> {
         }
     }
 
+    /// Get python executable path in virtual environment
+    pub fn get_python_in_env(&self, repo_name: &str) -> PathBuf {
+        Self::python_in_venv(&self.venv_path(repo_name))
+    }
+
     /// Get pip executable command for virtual environment
     pub fn get_pip_executable(&self, repo_name: &str) -> Vec<String> {
         let py = self.get_python_in_env(repo_name);
@@ -207,9 +221,49 @@ impl<'a> PipManager<'a> {
         }
     }
 
+    /// site-packages directories of the repository's virtual environment that exist on disk
+    fn site_packages_dirs(&self, repo_name: &str) -> Vec<PathBuf> {
+        let venv_path = self.venv_path(repo_name);
+        let candidates = if cfg!(windows) {
+            vec![venv_path.join("Lib").join("site-packages")]
+        } else {
+            fs::read_dir(venv_path.join("lib"))
+                .map(|entries| entries.flatten()
+                    .filter(|e| e.file_name().to_string_lossy().starts_with("python"))
+                    .map(|e| e.path().join("site-packages"))
+                    .collect())
+                .unwrap_or_default()
+        };
+        candidates.into_iter().filter(|p| p.is_dir()).collect()
+    }
+
+    /// Whether `package` has a `.dist-info` in the venv; `None` when site-packages can't be located.
+    /// Чтение каталога вместо `pip show`: без старта интерпретатора и импорта pip
+    fn has_dist_info(&self, repo_name: &str, package: &str) -> Option<bool> {
+        let dirs = self.site_packages_dirs(repo_name);
+        if dirs.is_empty() { return None; }
+        let prefix = format!("{}-", package);
+        Some(dirs.iter().any(|dir| {
+            fs::read_dir(dir)
+                .map(|entries| entries.flatten().any(|e| {
+                    let name = e.file_name();
+                    let name = name.to_string_lossy();
+                    name.starts_with(&prefix) && name.ends_with(".dist-info")
+                }))
+                .unwrap_or(false)
+        }))
+    }
+
     /// Get uv executable command for virtual environment
     pub fn get_uv_executable(&self, repo_name: &str) -> Vec<String> {
-        let mut py_path = self.get_python_in_env(repo_name);
+        // uv — нативный бинарь: запускаем его напрямую, без старта интерпретатора ради `python -m uv`
+        let venv_path = self.venv_path(repo_name);
+        let uv_bin = if cfg!(windows) { venv_path.join("Scripts").join("uv.exe") } else { venv_path.join("bin").join("uv") };
+        if uv_bin.is_file() {
+            return vec![uv_bin.to_string_lossy().to_string()];
+        }
+        // Тот же venv_path, без повторной сборки пути через get_python_in_env
+        let mut py_path = Self::python_in_venv(&venv_path);
         if !py_path.exists() {
             py_path = if cfg!(windows) { 
                 PathBuf::from("python.exe") 
@@ -220,12 +274,25 @@ impl<'a> PipManager<'a> {
         vec![py_path.to_string_lossy().to_string(), "-m".into(), "uv".into()]
     }
 
+    /// `uv pip install` aimed at the repository's interpreter. Запущенный напрямую бинарь uv
+    /// не знает, в какое окружение ставить (на Windows env — копия Python, не venv), поэтому
+    /// интерпретатор передаём явно через `--python`
+    pub fn get_uv_pip_install(&self, repo_name: &str) -> Vec<String> {
+        let mut cmd = self.get_uv_executable(repo_name);
+        cmd.extend(["pip".into(), "install".into()]);
+        let py = self.get_python_in_env(repo_name);
+        if py.exists() {
+            cmd.extend(["--python".into(), py.to_string_lossy().to_string()]);
+        }
+        cmd
+    }
+
     /// Install uv in virtual environment and check if it's available
     pub fn install_uv_in_venv(&self, repo_name: &str) -> Result<bool> {
         let uv_cmd = self.get_uv_executable(repo_name);
         // Try uv --version
         if self.command_runner.run_silent(
-            &vec![uv_cmd[0].clone(), uv_cmd[1].clone(), uv_cmd[2].clone(), "--version".into()], 
+            &[uv_cmd.as_slice(), &["--version".into()]].concat(), 
             None, 
             None
         ).is_ok() {
@@ -243,7 +310,7 @@ impl<'a> PipManager<'a> {
         
         // Verify installation
         let uv_works = self.command_runner.run_silent(
-            &vec![uv_cmd[0].clone(), uv_cmd[1].clone(), uv_cmd[2].clone(), "--version".into()], 
+            &[uv_cmd.as_slice(), &["--version".into()]].concat(), 
             None, 
             None
         ).is_ok();
@@ -259,68 +326,48 @@ impl<'a> PipManager<'a> {
 
     /// Find requirements files in repository, checking specific files first, then using glob patterns
     pub fn find_requirements_files(&self, repo_path: &Path) -> Option<PathBuf> {
+        // По одному read_dir на корень и requirements/: дальше все проверки по именам в памяти
+        let list_files = |dir: &Path| -> Vec<String> {
+            fs::read_dir(dir)
+                .map(|entries| entries.flatten()
+                    .filter(|e| e.file_type().map(|t| !t.is_dir()).unwrap_or(false))
+                    .filter_map(|e| e.file_name().into_string().ok())
+                    .collect())
+                .unwrap_or_default()
+        };
+        let requirements_dir = repo_path.join("requirements");
+        let root_files = list_files(repo_path);
+        let req_dir_files = list_files(&requirements_dir);
+        // Имена сравниваем через file_name_key: на Windows `Requirements.txt` находил и exists()
+        let find = |files: &[String], name: &str| {
+            let key = file_name_key(name);
+            files.iter().find(|f| file_name_key(f) == key).cloned()
+        };
+        let find_matching = |files: &[String], pred: &dyn Fn(&str) -> bool| {
+            files.iter().find(|f| pred(&file_name_key(f))).cloned()
+        };
+
         // First, check specific known files
-        let specific_candidates = [
-            repo_path.join("requirements.txt"),
-            repo_path.join("requirements_pyp.txt"),
-            repo_path.join("requirements").join("requirements_nvidia.txt"),
-            repo_path.join("requirements").join("requirements.txt"),
-            repo_path.join("install").join("requirements.txt"),
-        ];
-        
-        // Check specific files first
-        for candidate in &specific_candidates {
-            if candidate.exists() {
-                return Some(candidate.clone());
-            }
-        }
+        if let Some(name) = find(&root_files, "requirements.txt") { return Some(repo_path.join(name)); }
+        if let Some(name) = find(&root_files, "requirements_pyp.txt") { return Some(repo_path.join(name)); }
+        if let Some(name) = find(&req_dir_files, "requirements_nvidia.txt") { return Some(requirements_dir.join(name)); }
+        if let Some(name) = find(&req_dir_files, "requirements.txt") { return Some(requirements_dir.join(name)); }
+        let install_req = repo_path.join("install").join("requirements.txt");
+        if install_req.exists() { return Some(install_req); }
         
         // Then search for requirements_* patterns in root directory
-        if let Ok(entries) = fs::read_dir(repo_path) {
-            for entry in entries.flatten() {
-                if let Ok(file_type) = entry.file_type() {
-                    if file_type.is_file() {
-                        let file_name = entry.file_name();
-                        let name_str = file_name.to_string_lossy();
-                        if name_str.starts_with("requirements_") && name_str.ends_with(".txt") {
-                            return Some(entry.path());
-                        }
-                    }
-                }
-            }
+        if let Some(name) = find_matching(&root_files, &|n| n.starts_with("requirements_") && n.ends_with(".txt")) {
+            return Some(repo_path.join(name));
         }
         
         // Then search for requirements* patterns in root directory
-        if let Ok(entries) = fs::read_dir(repo_path) {
-            for entry in entries.flatten() {
-                if let Ok(file_type) = entry.file_type() {
-                    if file_type.is_file() {
-                        let file_name = entry.file_name();
-                        let name_str = file_name.to_string_lossy();
-                        if name_str.starts_with("requirements") && name_str.ends_with(".txt") && name_str != "requirements.txt" {
-                            return Some(entry.path());
-                        }
-                    }
-                }
-            }
+        if let Some(name) = find_matching(&root_files, &|n| n.starts_with("requirements") && n.ends_with(".txt") && n != "requirements.txt") {
+            return Some(repo_path.join(name));
         }
         
         // Finally, search in requirements/ subdirectory for requirements\* patterns
-        let requirements_dir = repo_path.join("requirements");
-        if requirements_dir.exists() {
-            if let Ok(entries) = fs::read_dir(&requirements_dir) {
-                for entry in entries.flatten() {
-                    if let Ok(file_type) = entry.file_type() {
-                        if file_type.is_file() {
-                            let file_name = entry.file_name();
-                            let name_str = file_name.to_string_lossy();
-                            if name_str.starts_with("requirements") && name_str.ends_with(".txt") {
-                                return Some(entry.path());
-                            }
-                        }
-                    }
-                }
-            }
+        if let Some(name) = find_matching(&req_dir_files, &|n| n.starts_with("requirements") && n.ends_with(".txt")) {
+            return Some(requirements_dir.join(name));
         }
         
         None
@@ -488,8 +535,8 @@ impl<'a> PipManager<'a> {
         };
 
         if uv_available {
-            let mut uv_cmd = self.get_uv_executable(repo_name);
-            uv_cmd.extend(["pip".into(), "install".into(), "-r".into(), filtered_req.to_string_lossy().to_string()]);
+            let mut uv_cmd = self.get_uv_pip_install(repo_name);
+            uv_cmd.extend(["-r".into(), filtered_req.to_string_lossy().to_string()]);
             self.command_runner.run(&uv_cmd, Some("Installing requirements (uv)"), repo_path)?;
         } else {
             let mut pip_cmd = self.get_pip_executable(repo_name);
@@ -510,9 +557,7 @@ impl<'a> PipManager<'a> {
         // Install ONNX with GPU detection after base requirements
         let onnx_spec = self.get_onnx_package_spec();
         let mut onnx_cmd = if uv_available {
-            let mut cmd = self.get_uv_executable(repo_name);
-            cmd.extend(["pip".into(), "install".into()]);
-            cmd
+            self.get_uv_pip_install(repo_name)
         } else {
             let mut cmd = self.get_pip_executable(repo_name);
             cmd.push("install".into());
@@ -531,9 +576,7 @@ impl<'a> PipManager<'a> {
             // Fallback without --pre if it fails
             if self.needs_onnx_nightly() {
                 let mut fallback_cmd = if uv_available {
-                    let mut cmd = self.get_uv_executable(repo_name);
-                    cmd.extend(["pip".into(), "install".into()]);
-                    cmd
+                    self.get_uv_pip_install(repo_name)
                 } else {
                     let mut cmd = self.get_pip_executable(repo_name);
                     cmd.push("install".into());
@@ -546,71 +589,66 @@ impl<'a> PipManager<'a> {
         }
 
         // Check if torch is installed and reinstall with CUDA index if needed
-        let mut check_cmd = self.get_pip_executable(repo_name);
-        check_cmd.extend(["show".into(), "torch".into()]);
-        
-        let cfg = self.config_manager.get_config();
-        let venv_path = cfg.install_path.join("envs").join(repo_name);
+        let torch_installed = self.has_dist_info(repo_name, "torch").unwrap_or_else(|| {
+            let mut check_cmd = self.get_pip_executable(repo_name);
+            check_cmd.extend(["show".into(), "torch".into()]);
+            let venv_path = self.venv_path(repo_name);
+            std::process::Command::new(&check_cmd[0])
+                .args(&check_cmd[1..])
+                .env("VIRTUAL_ENV", venv_path)
+                .stdout(std::process::Stdio::null())
+                .stderr(std::process::Stdio::null())
+                .status()
+                .map(|s| s.success())
+                .unwrap_or(false)
+        });
         
-        if let Ok(output) = std::process::Command::new(&check_cmd[0])
-            .args(&check_cmd[1..])
-            .env("VIRTUAL_ENV", venv_path)
-            .output() {
-            if output.status.success() {
-                let mut reinstall_cmd = if uv_available {
-                    let mut cmd = self.get_uv_executable(repo_name);
-                    cmd.extend(["pip".into(), "install".into()]);
-                    cmd
-                } else {
-                    let mut cmd = self.get_pip_executable(repo_name);
-                    cmd.push("install".into());
-                    cmd
-                };
-                
-                reinstall_cmd.extend([
-                    "--force-reinstall".into(), 
-                    "--index-url".into(), 
-                    self.get_default_torch_index_url(),
-                    "torch".into(), 
-                    "torchvision".into(), 
-                    "torchaudio".into()
-                ]);
-                
-                if let Err(_) = self.command_runner.run_silent(&reinstall_cmd, Some("Reinstalling torch with CUDA"), repo_path) {
-                    // Fallback to pip if uv fails
-                    if uv_available {
-                        let mut pip_cmd = self.get_pip_executable(repo_name);
-                        pip_cmd.extend([
-                            "install".into(), 
-                            "--force-reinstall".into(), 
-                            "--index-url".into(), 
-                            self.get_default_torch_index_url(),
-                            "torch".into(), 
-                            "torchvision".into(), 
-                            "torchaudio".into()
-                        ]);
-                        let _ = self.command_runner.run_silent(&pip_cmd, Some("Reinstalling torch with CUDA (pip)"), repo_path);
-                    }
+        if torch_installed {
+            let mut reinstall_cmd = if uv_available {
+                self.get_uv_pip_install(repo_name)
+            } else {
+                let mut cmd = self.get_pip_executable(repo_name);
+                cmd.push("install".into());
+                cmd
+            };
+            
+            reinstall_cmd.extend([
+                "--force-reinstall".into(), 
+                "--index-url".into(), 
+                self.get_default_torch_index_url(),
+                "torch".into(), 
+                "torchvision".into(), 
+                "torchaudio".into()
+            ]);
+            
+            if let Err(_) = self.command_runner.run_silent(&reinstall_cmd, Some("Reinstalling torch with CUDA"), repo_path) {
+                // Fallback to pip if uv fails
+                if uv_available {
+                    let mut pip_cmd = self.get_pip_executable(repo_name);
+                    pip_cmd.extend([
+                        "install".into(), 
+                        "--force-reinstall".into(), 
+                        "--index-url".into(), 
+                        self.get_default_torch_index_url(),
+                        "torch".into(), 
+                        "torchvision".into(), 
+                        "torchaudio".into()
+                    ]);
+                    let _ = self.command_runner.run_silent(&pip_cmd, Some("Reinstalling torch with CUDA (pip)"), repo_path);
                 }
             }
         }
 
         // Install Triton with platform-specific package names
         let mut triton_cmd = if uv_available {
-            let mut cmd = self.get_uv_executable(repo_name);
-            cmd.extend(["pip".into(), "install".into()]);
-            cmd
+            self.get_uv_pip_install(repo_name)
         } else {
             let mut cmd = self.get_pip_executable(repo_name);
             cmd.push("install".into());
             cmd
         };
         
-        // Use platform-specific triton package names
-        #[cfg(windows)]
-        triton_cmd.push("triton-windows".into());
-        #[cfg(not(windows))]
-        triton_cmd.push("triton".into());
+        triton_cmd.push(TRITON_PACKAGE.into());
         
         let _ = self.command_runner.run(&triton_cmd, Some("Installing Triton"), repo_path);
 
@@ -636,8 +674,8 @@ impl<'a> PipManager<'a> {
         let uv_available = self.install_uv_in_venv(repo_name).unwrap_or(false);
         
         if uv_available {
-            let mut uv_cmd = self.get_uv_executable(repo_name);
-            uv_cmd.extend(["pip".into(), "install".into(), ".".into()]);
+            let mut uv_cmd = self.get_uv_pip_install(repo_name);
+            uv_cmd.push(".".into());
             self.command_runner.run_silent(&uv_cmd, Some("Installing repository as package (uv)"), Some(repo_path))
         } else {
             let mut pip_cmd = self.get_pip_executable(repo_name);
@@ -819,12 +857,17 @@ impl<'a> PipManager<'a> {
         // Create installation plan with intelligent package separation
         let plan = analyzer.create_installation_plan(&packages);
         
+        // Triton не требует особого индекса — ставим его вместе с обычными пакетами, резолвер
+        // отрабатывает один раз. Если в плане есть torch, Triton ставится после него: torch
+        // тянет свою закреплённую версию, и ранняя установка скачала бы колесо дважды
+        let triton_in_regular_batch = !plan.triton_packages.is_empty()
+            && !plan.regular_packages.is_empty()
+            && plan.torch_packages.is_empty();
+
         // Install regular packages first (no special index needed)
         if !plan.regular_packages.is_empty() {
             let mut cmd = if uv_available {
-                let mut c = self.get_uv_executable(repo_name);
-                c.extend(["pip".into(), "install".into()]);
-                c
+                self.get_uv_pip_install(repo_name)
             } else {
                 let mut c = self.get_pip_executable(repo_name);
                 c.push("install".into());
@@ -873,6 +916,10 @@ impl<'a> PipManager<'a> {
                 };
                 cmd.push(pkg_spec);
             }
+
+            if triton_in_regular_batch {
+                cmd.push(TRITON_PACKAGE.into());
+            }
             
             self.command_runner.run(&cmd, Some("Installing regular packages"), repo_path)?;
         }
@@ -880,9 +927,7 @@ impl<'a> PipManager<'a> {
         // Install torch packages with appropriate index URL
         if !plan.torch_packages.is_empty() {
             let mut cmd = if uv_available {
-                let mut c = self.get_uv_executable(repo_name);
-                c.extend(["pip".into(), "install".into()]);
-                c
+                self.get_uv_pip_install(repo_name)
             } else {
                 let mut c = self.get_pip_executable(repo_name);
                 c.push("install".into());
@@ -931,9 +976,7 @@ impl<'a> PipManager<'a> {
         // Install onnx packages with GPU detection and version handling
         if !plan.onnx_packages.is_empty() {
             let mut cmd = if uv_available {
-                let mut c = self.get_uv_executable(repo_name);
-                c.extend(["pip".into(), "install".into()]);
-                c
+                self.get_uv_pip_install(repo_name)
             } else {
                 let mut c = self.get_pip_executable(repo_name);
                 c.push("install".into());
@@ -959,23 +1002,17 @@ impl<'a> PipManager<'a> {
             self.handle_insightface_package(repo_name, repo_path)?;
         }
         
-        // Handle triton packages with platform-specific logic
-        if !plan.triton_packages.is_empty() {
+        // Handle triton packages with platform-specific logic (after torch, unless already in the regular batch)
+        if !plan.triton_packages.is_empty() && !triton_in_regular_batch {
             let mut cmd = if uv_available {
-                let mut c = self.get_uv_executable(repo_name);
-                c.extend(["pip".into(), "install".into()]);
-                c
+                self.get_uv_pip_install(repo_name)
             } else {
                 let mut c = self.get_pip_executable(repo_name);
                 c.push("install".into());
                 c
             };
             
-            // Use platform-specific triton package names
-            #[cfg(windows)]
-            cmd.push("triton-windows".into());
-            #[cfg(not(windows))]
-            cmd.push("triton".into());
+            cmd.push(TRITON_PACKAGE.into());
             
             self.command_runner.run(&cmd, Some("Installing Triton packages"), repo_path)?;
         }
@@ -992,10 +1029,8 @@ impl<'a> PipManager<'a> {
             // Use precompiled wheel for Windows
             let wheel = "https://huggingface.co/hanamizuki-ai/pypi-wheels/resolve/main/insightface/insightface-0.7.3-cp311-cp311-win_amd64.whl";
             if uv_available {
-                let mut uv_cmd = self.get_uv_executable(repo_name);
+                let mut uv_cmd = self.get_uv_pip_install(repo_name);
                 uv_cmd.extend([
-                    "pip".into(), 
-                    "install".into(), 
                     "--force-reinstall".into(),
                     "-U".into(),
                     wheel.into(),
@@ -1020,10 +1055,8 @@ impl<'a> PipManager<'a> {
             let uv_available = self.install_uv_in_venv(repo_name).unwrap_or(false);
             
             if uv_available {
-                let mut uv_cmd = self.get_uv_executable(repo_name);
+                let mut uv_cmd = self.get_uv_pip_install(repo_name);
                 uv_cmd.extend([
-                    "pip".into(), 
-                    "install".into(), 
                     "--force-reinstall".into(),
                     "-U".into(), 
                     "insightface".into(), 
@@ -2,7 +2,10 @@
 
 use crate::Result;
 use log::warn;
-use serde::{Deserialize, Serialize};
+use serde::de::DeserializeOwned;
+use serde::{Deserialize, Deserializer, Serialize};
+use std::collections::HashMap;
+use std::sync::{Arc, Mutex};
 use std::time::Duration;
 
 #[derive(Clone, Debug, Serialize, Deserialize)]
@@ -12,10 +15,71 @@ pub struct RepositoryInfo {
     pub program_args: Option<String>,
 }
 
+/// Поле с неожиданным типом становится значением по умолчанию, а не обнуляет весь ответ
+/// (как при прежнем разборе через serde_json::Value)
+fn lenient<'de, D, T>(deserializer: D) -> std::result::Result<T, D::Error>
+where
+    D: Deserializer<'de>,
+    T: DeserializeOwned + Default,
+{
+    let value = serde_json::Value::deserialize(deserializer)?;
+    Ok(serde_json::from_value(value).unwrap_or_else(|e| {
+        warn!("Ignoring malformed field in server response: {}", e);
+        T::default()
+    }))
+}
+
+/// Response of `/api/repositories/{name}`: new format (`success` + `repository`)
+/// or legacy fields at the top level
+#[derive(Debug, Default, Deserialize)]
+#[serde(default)]
+struct RepositoryResponse {
+    #[serde(deserialize_with = "lenient")]
+    success: bool,
+    #[serde(deserialize_with = "lenient")]
+    repository: Option<ServerRepository>,
+    #[serde(deserialize_with = "lenient")]
+    url: Option<String>,
+    #[serde(deserialize_with = "lenient")]
+    main_file: Option<String>,
+    #[serde(deserialize_with = "lenient")]
+    program_args: Option<String>,
+}
+
+#[derive(Debug, Default, Deserialize)]
+#[serde(default, rename_all = "camelCase")]
+struct ServerRepository {
+    #[serde(deserialize_with = "lenient")]
+    repository_url: Option<String>,
+    #[serde(deserialize_with = "lenient")]
+    file_path: Option<String>,
+    #[serde(deserialize_with = "lenient")]
+    program_args: Option<String>,
+}
+
+/// Response of `/api/repositories/{name}/install-plan`; the plan itself stays untyped
+#[derive(Debug, Default, Deserialize)]
+#[serde(default)]
+struct InstallPlanResponse {
+    #[serde(deserialize_with = "lenient")]
+    success: bool,
+    installation_plan: Option<serde_json::Value>,
+}
+
+/// Body of `POST /api/repositories/{name}/download`
+#[derive(Debug, Serialize)]
+struct DownloadStats {
+    repository_name: String,
+    success: bool,
+    timestamp: Option<String>,
+}
+
 #[derive(Clone, Debug)]
 pub struct ServerClient {
     server_url: String,
     timeout_secs: u64,
+    /// Найденные на сервере репозитории; общий для всех клонов клиента
+    repo_info_cache: Arc<Mutex<HashMap<String, RepositoryInfo>>>,
 }
 
 impl Default for ServerClient {
@@ -23,6 +87,7 @@ impl Default for ServerClient {
         Self {
             server_url: String::new(),
             timeout_secs: 10,
+            repo_info_cache: Arc::default(),
         }
     }
 }
@@ -32,6 +97,7 @@ impl ServerClient {
         Self {
             server_url: server_url.trim_end_matches('/').to_string(),
             timeout_secs: 10,
+            repo_info_cache: Arc::default(),
         }
     }
 
@@ -42,7 +108,8 @@ impl ServerClient {
         let timeout = self.timeout_secs;
         
         std::thread::spawn(move || {
-            match reqwest::blocking::Client::new()
+            let Ok(client) = crate::utils::download_client() else { return false };
+            match client
                 .get(&url)
                 .timeout(Duration::from_secs(timeout))
                 .send() {
@@ -52,13 +119,18 @@ impl ServerClient {
         }).join().unwrap_or(false)
     }
 
-    /// Get repository information from server
+    /// Get repository information from server; hits are remembered for the client's lifetime
     pub fn get_repository_info(&self, name: &str) -> Result<Option<RepositoryInfo>> {
-        let url = format!("{}/api/repositories/{}", self.server_url, name.to_lowercase());
+        let key = name.to_lowercase();
+        if let Some(info) = self.repo_info_cache.lock().ok().and_then(|cache| cache.get(&key).cloned()) {
+            return Ok(Some(info));
+        }
+        let url = format!("{}/api/repositories/{}", self.server_url, key);
         let timeout = self.timeout_secs;
         
         let res = std::thread::spawn(move || {
-            let resp = reqwest::blocking::Client::new()
+            let Ok(client) = crate::utils::download_client() else { return Ok(None) };
+            let resp = client
                 .get(&url)
                 .timeout(Duration::from_secs(timeout))
                 .send();
@@ -66,38 +138,31 @@ impl ServerClient {
             match resp {
                 Ok(r) => {
                     if r.status().is_success() {
-                        let v: serde_json::Value = r.json().unwrap_or(serde_json::json!({}));
+                        // Десериализуем сразу в нужные поля, без промежуточного serde_json::Value
+                        let v: RepositoryResponse = match r.json() {
+                            Ok(v) => v,
+                            Err(e) => {
+                                warn!("Invalid repository info response from server: {}", e);
+                                return Ok(None);
+                            }
+                        };
                         
-                        if v.get("success").and_then(|b| b.as_bool()).unwrap_or(false) {
+                        if v.success {
                             // New format
-                            if let Some(repo) = v.get("repository") {
-                                let url = repo.get("repositoryUrl")
-                                    .and_then(|s| s.as_str())
-                                    .map(|s| s.trim().to_string());
-                                let main_file = repo.get("filePath")
-                                    .and_then(|s| s.as_str())
-                                    .map(|s| s.to_string());
-                                let program_args = repo.get("programArgs")
-                                    .and_then(|s| s.as_str())
-                                    .map(|s| s.to_string());
-                                
-                                return Ok(Some(RepositoryInfo { url, main_file, program_args }));
+                            if let Some(repo) = v.repository {
+                                return Ok(Some(RepositoryInfo {
+                                    url: repo.repository_url.map(|s| s.trim().to_string()),
+                                    main_file: repo.file_path,
+                                    program_args: repo.program_args,
+                                }));
                             }
-                        } else {
+                        } else if v.url.is_some() || v.main_file.is_some() {
                             // Legacy format
-                            let url = v.get("url")
-                                .and_then(|s| s.as_str())
-                                .map(|s| s.to_string());
-                            let main_file = v.get("main_file")
-                                .and_then(|s| s.as_str())
-                                .map(|s| s.to_string());
-                            let program_args = v.get("program_args")
-                                .and_then(|s| s.as_str())
-                                .map(|s| s.to_string());
-                            
-                            if url.is_some() || main_file.is_some() {
-                                return Ok(Some(RepositoryInfo { url, main_file, program_args }));
-                            }
+                            return Ok(Some(RepositoryInfo {
+                                url: v.url,
+                                main_file: v.main_file,
+                                program_args: v.program_args,
+                            }));
                         }
                         Ok(None)
                     } else if r.status().as_u16() == 404 {
@@ -110,6 +175,12 @@ impl ServerClient {
             }
         }).join().unwrap_or(Ok(None));
         
+        // Промахи и сетевые ошибки не кэшируем — следующий вызов спросит сервер снова
+        if let Ok(Some(info)) = &res {
+            if let Ok(mut cache) = self.repo_info_cache.lock() {
+                cache.insert(key, info.clone());
+            }
+        }
         res
     }
 
@@ -126,7 +197,8 @@ impl ServerClient {
         let timeout = self.timeout_secs;
         
         std::thread::spawn(move || {
-            let resp = reqwest::blocking::Client::new()
+            let Ok(client) = crate::utils::download_client() else { return Ok(None) };
+            let resp = client
                 .get(&url)
                 .timeout(Duration::from_secs(timeout))
                 .send();
@@ -134,12 +206,16 @@ impl ServerClient {
             match resp {
                 Ok(r) => {
                     if r.status().is_success() {
-                        let v: serde_json::Value = r.json().unwrap_or(serde_json::json!({}));
-                        
-                        if v.get("success").and_then(|b| b.as_bool()).unwrap_or(false) {
-                            if let Some(plan) = v.get("installation_plan") {
-                                return Ok(Some(plan.clone()));
+                        let v: InstallPlanResponse = match r.json() {
+                            Ok(v) => v,
+                            Err(e) => {
+                                warn!("Invalid installation plan response from server: {}", e);
+                                return Ok(None);
                             }
+                        };
+                        
+                        if v.success {
+                            return Ok(v.installation_plan);
                         }
                         Ok(None)
                     } else {
@@ -157,15 +233,16 @@ impl ServerClient {
     /// Send download statistics to server (non-fatal)
     pub fn send_download_stats(&self, repo_name: &str) -> Result<()> {
         let url = format!("{}/api/repositories/{}/download", self.server_url, repo_name.to_lowercase());
-        let body = serde_json::json!({
-            "repository_name": repo_name.to_lowercase(),
-            "success": true,
-            "timestamp": serde_json::Value::Null,
-        });
+        let body = DownloadStats {
+            repository_name: repo_name.to_lowercase(),
+            success: true,
+            timestamp: None,
+        };
         let timeout = self.timeout_secs;
         
         let _ = std::thread::spawn(move || {
-            let _ = reqwest::blocking::Client::new()
+            let Ok(client) = crate::utils::download_client() else { return };
+            let _ = client
                 .post(&url)
                 .json(&body)
                 .timeout(Duration::from_secs(timeout))
@@ -174,4 +251,25 @@ impl ServerClient {
         
         Ok(())
     }
-}
\ No newline at end of file
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_malformed_field_keeps_rest_of_response() {
+        let v: RepositoryResponse = serde_json::from_str(
+            r#"{"success": true, "repository": {"repositoryUrl": " https://github.com/a/b ", "filePath": 42, "programArgs": "--x"}}"#,
+        ).unwrap();
+        assert!(v.success);
+        let repo = v.repository.unwrap();
+        assert_eq!(repo.repository_url.as_deref(), Some(" https://github.com/a/b "));
+        assert_eq!(repo.file_path, None);
+        assert_eq!(repo.program_args.as_deref(), Some("--x"));
+
+        let v: RepositoryResponse = serde_json::from_str(r#"{"success": "yes", "url": "https://github.com/a/b"}"#).unwrap();
+        assert!(!v.success);
+        assert_eq!(v.url.as_deref(), Some("https://github.com/a/b"));
+    }
+}
@@ -3,11 +3,12 @@ use portablesource_rs::{
     config::ConfigManager,
     gpu::GpuDetector,
     utils,
-    envs_manager::PortableEnvironmentManager,
-    repository_installer::RepositoryInstaller,
+    repository_installer::{self, RepositoryInstaller},
     PortableSourceError,
     Result,
 };
+#[cfg(windows)]
+use portablesource_rs::envs_manager::PortableEnvironmentManager;
 use log::{info, error, warn, LevelFilter};
 use std::path::PathBuf;
 use std::sync::OnceLock;
@@ -16,8 +17,7 @@ use std::sync::OnceLock;
 // Глобальная переменная для хранения install_path в текущей сессии
 static SESSION_INSTALL_PATH: OnceLock<PathBuf> = OnceLock::new();
 
-#[tokio::main]
-async fn main() {
+fn main() {
     // Parse command line arguments
     let cli = Cli::parse_args();
 
@@ -25,27 +25,29 @@ async fn main() {
     let mut builder = env_logger::Builder::from_default_env();
     if cli.debug { builder.filter_level(LevelFilter::Debug); } else { builder.filter_level(LevelFilter::Info); }
     let _ = builder.try_init();
-    
-    // Run the application
-    if let Err(e) = run(cli).await {
-        error!("Application error: {}", e);
-        std::process::exit(1);
-    }
-}
 
-async fn run(cli: Cli) -> Result<()> {
-    // Fast-path: commands that don't require config or install_path
-    match cli.command.as_ref() {
-        Some(Commands::CheckGpu) => {
-            return check_gpu();
-        }
+    // Fast-path: commands that don't require config, install_path or the async runtime
+    let result = match cli.command.as_ref() {
+        Some(Commands::CheckGpu) => check_gpu(),
         Some(Commands::Version) => {
             utils::show_version();
-            return Ok(());
+            Ok(())
         }
-        _ => {}
+        // Runtime (worker threads, I/O driver) поднимаем только для "тяжёлых" команд
+        _ => tokio::runtime::Builder::new_multi_thread()
+            .enable_all()
+            .build()
+            .map_err(PortableSourceError::from)
+            .and_then(|runtime| runtime.block_on(run(cli))),
+    };
+
+    if let Err(e) = result {
+        error!("Application error: {}", e);
+        std::process::exit(1);
     }
+}
 
+async fn run(cli: Cli) -> Result<()> {
     // Initialize configuration manager
     let mut config_manager = ConfigManager::new(None)?;
     
@@ -189,9 +191,17 @@ async fn run(cli: Cli) -> Result<()> {
         // На Linux работаем как менеджер репозиториев без постоянного конфига
         // (используем только в памяти ConfigManager)
     }
-    // Hydrate config from current environment (no extra save here)
-    ensure_config_initialized(&mut config_manager)?;
-    config_manager.hydrate_from_existing_env()?;
+    // Hydrate config from current environment (no extra save here).
+    // Нужно только командам, которые читают env-переменные/состояние среды из конфига;
+    // list/run/delete/регистрация пути работают с одним install_path
+    let needs_config = matches!(
+        cli.command,
+        None | Some(Commands::SetupEnv) | Some(Commands::InstallRepo { .. }) | Some(Commands::UpdateRepo { .. }) | Some(Commands::SystemInfo)
+    );
+    if needs_config {
+        ensure_config_initialized(&mut config_manager)?;
+        config_manager.hydrate_from_existing_env()?;
+    }
 
     // Linux: выбор режима CLOUD/DESK и базовая подготовка — только когда действительно готовим базу
     #[cfg(unix)]
@@ -220,25 +230,9 @@ async fn run(cli: Cli) -> Result<()> {
             }
             LinuxMode::Desk => {
                 info!("Linux DESK mode detected: setting up micromamba base env");
-                let cv = match detect_cuda_version_from_system() {
-                    Some(_) => None,
-                    None => {
-                        if config_manager.has_cuda() {
-                            if let Some(cuda_version) = config_manager.get_cuda_version() {
-                                Some(match cuda_version {
-                                    portablesource_rs::config::CudaVersion::Cuda128 => portablesource_rs::config::CudaVersionLinux::Cuda128,
-                                    portablesource_rs::config::CudaVersion::Cuda124 => portablesource_rs::config::CudaVersionLinux::Cuda124,
-                                    portablesource_rs::config::CudaVersion::Cuda118 => portablesource_rs::config::CudaVersionLinux::Cuda118,
-                                })
-                            } else {
-                                None
-                            }
-                        } else {
-                            None
-                        }
-                    }
-                };
-                setup_micromamba_base_env(&install_path, cv)?;
+                let cv = base_env_cuda_version_with_prefetch(&install_path, &config_manager);
+                // --force-check учитывает setup_environment ниже — не пересобираем базу дважды
+                setup_micromamba_base_env(&install_path, cv, false)?;
             }
         }
     }
@@ -246,7 +240,7 @@ async fn run(cli: Cli) -> Result<()> {
     // Handle commands
     match cli.command.as_ref() {
         Some(Commands::SetupEnv) => {
-            setup_environment(&install_path, &mut config_manager).await
+            setup_environment(&install_path, &mut config_manager, cli.force_check).await
         }
         #[cfg(unix)]
         Some(Commands::SetupReg) => {
@@ -278,7 +272,7 @@ async fn run(cli: Cli) -> Result<()> {
             delete_repository(repo, &install_path, &config_manager)
         }
         Some(Commands::ListRepos) => {
-            list_repositories(&install_path, &config_manager)
+            list_repositories(&install_path)
         }
         Some(Commands::RunRepo { repo, args }) => {
             utils::run_repository(repo, &install_path, args).await
@@ -313,7 +307,7 @@ async fn run(cli: Cli) -> Result<()> {
     }
 }
 
-async fn setup_environment(install_path: &PathBuf, config_manager: &mut ConfigManager) -> Result<()> {
+async fn setup_environment(install_path: &PathBuf, config_manager: &mut ConfigManager, force_check: bool) -> Result<()> {
     // Create directory structure
     utils::create_directory_structure(install_path)?;
     
@@ -321,7 +315,7 @@ async fn setup_environment(install_path: &PathBuf, config_manager: &mut ConfigMa
     #[cfg(windows)]
     {
         // Initialize environment manager
-        let env_manager = PortableEnvironmentManager::new(install_path.clone());
+        let env_manager = PortableEnvironmentManager::new(install_path.clone()).with_force_check(force_check);
         // Setup environment via portable archives
         env_manager.setup_environment().await?;
     }
@@ -329,27 +323,9 @@ async fn setup_environment(install_path: &PathBuf, config_manager: &mut ConfigMa
     // Linux/macOS: используем системный tar, готовим базу через micromamba
     #[cfg(unix)]
     {
-        use portablesource_rs::utils::{detect_cuda_version_from_system, setup_micromamba_base_env};
-        // Если системная CUDA есть — не ставим CUDA в базу
-        let cv = match detect_cuda_version_from_system() {
-            Some(_) => None,
-            None => {
-                if config_manager.has_cuda() {
-                    if let Some(cuda_version) = config_manager.get_cuda_version() {
-                        Some(match cuda_version {
-                            portablesource_rs::config::CudaVersion::Cuda128 => portablesource_rs::config::CudaVersionLinux::Cuda128,
-                            portablesource_rs::config::CudaVersion::Cuda124 => portablesource_rs::config::CudaVersionLinux::Cuda124,
-                            portablesource_rs::config::CudaVersion::Cuda118 => portablesource_rs::config::CudaVersionLinux::Cuda118,
-                        })
-                    } else {
-                        None
-                    }
-                } else {
-                    None
-                }
-            }
-        };
-        setup_micromamba_base_env(install_path, cv)?;
+        use portablesource_rs::utils::setup_micromamba_base_env;
+        let cv = base_env_cuda_version_with_prefetch(install_path, config_manager);
+        setup_micromamba_base_env(install_path, cv, force_check)?;
     }
     
     // GPU detection is now handled dynamically by ConfigManager
@@ -373,6 +349,27 @@ async fn setup_environment(install_path: &PathBuf, config_manager: &mut ConfigMa
     Ok(())
 }
 
+/// CUDA runtime for the micromamba base env, chosen while micromamba itself is fetched in background:
+/// probing nvcc/nvidia-smi doesn't depend on the binary, so the two overlap
+#[cfg(unix)]
+fn base_env_cuda_version_with_prefetch(install_path: &PathBuf, config_manager: &ConfigManager) -> Option<portablesource_rs::config::CudaVersionLinux> {
+    use portablesource_rs::config::{CudaVersion, CudaVersionLinux};
+    std::thread::scope(|s| {
+        let prefetch = s.spawn(|| utils::prefetch_micromamba(install_path));
+        // Если системная CUDA есть — не ставим CUDA в базу
+        let cv = match utils::detect_cuda_version_from_system() {
+            Some(_) => None,
+            None => config_manager.get_cuda_version().map(|cuda_version| match cuda_version {
+                CudaVersion::Cuda128 => CudaVersionLinux::Cuda128,
+                CudaVersion::Cuda124 => CudaVersionLinux::Cuda124,
+                CudaVersion::Cuda118 => CudaVersionLinux::Cuda118,
+            }),
+        };
+        let _ = prefetch.join();
+        cv
+    })
+}
+
 #[cfg(unix)]
 async fn change_installation_path(config_manager: &mut ConfigManager) -> Result<()> {
     println!("Enter new installation path:");
@@ -380,6 +377,12 @@ async fn change_installation_path(config_manager: &mut ConfigManager) -> Result<
     std::io::stdin().read_line(&mut input).unwrap();
     let path = PathBuf::from(input.trim());
     
+    let current = config_manager.get_config().install_path.clone();
+    if !current.as_os_str().is_empty() && utils::same_install_path(&path, &current) {
+        println!("Installation path unchanged: {:?}", current);
+        return Ok(());
+    }
+    
     let validated_path = utils::validate_and_create_path(&path)?;
     config_manager.set_install_path(validated_path.clone())?;
     // Для Windows больше не используем реестр - только сессионные настройки
@@ -394,7 +397,9 @@ async fn change_installation_path(config_manager: &mut ConfigManager) -> Result<
 
 async fn install_repository(repo: &str, install_path: &PathBuf, config_manager: &ConfigManager) -> Result<()> {
     let mut installer = RepositoryInstaller::new(install_path.clone(), config_manager.clone());
-    installer.install_repository(repo).await
+    let installed = installer.install_repository(repo).await?;
+    println!("Repository '{}' installed to {}", installed.name, installed.path.display());
+    Ok(())
 }
 
 async fn update_repository(repo: Option<String>, install_path: &PathBuf, config_manager: &ConfigManager) -> Result<()> {
@@ -411,13 +416,18 @@ async fn update_repository(repo: Option<String>, install_path: &PathBuf, config_
         return Ok(());
     }
 
-    println!("Select repository to update:\n");
-    for (i, item) in labeled.iter().enumerate() {
-        println!("  [{}] {}", i + 1, item.1);
+    use std::io::{self, Write};
+    {
+        // Весь список одной буферизованной записью, а не lock+flush на каждую строку
+        let mut out = io::BufWriter::new(io::stdout().lock());
+        writeln!(out, "Select repository to update:\n")?;
+        for (i, item) in labeled.iter().enumerate() {
+            writeln!(out, "  [{}] {}", i + 1, item.1)?;
+        }
+        writeln!(out, "\nEnter number (or 0 to cancel): ")?;
+        out.flush()?;
     }
-    println!("\nEnter number (or 0 to cancel): ");
 
-    use std::io;
     let mut input = String::new();
     io::stdin().read_line(&mut input).ok();
     let trimmed = input.trim();
@@ -436,28 +446,28 @@ fn delete_repository(repo: &str, install_path: &PathBuf, config_manager: &Config
     installer.delete_repository(repo)
 }
 
-fn list_repositories(install_path: &PathBuf, config_manager: &ConfigManager) -> Result<()> {
-    let installer = RepositoryInstaller::new(install_path.clone(), config_manager.clone());
-    let repos = installer.list_repositories()?;
+fn list_repositories(install_path: &PathBuf) -> Result<()> {
+    // Без RepositoryInstaller: для списка не нужны env manager, server client и конфиг
+    let repos = repository_installer::list_repositories_at(install_path)?;
     
+    use std::io::{self, Write};
+    let mut out = io::BufWriter::new(io::stdout().lock());
     if repos.is_empty() {
-        println!("No repositories installed");
+        writeln!(out, "No repositories installed")?;
     } else {
-        println!("Installed repositories:");
+        writeln!(out, "Installed repositories:")?;
         for repo in repos {
-            println!("  - {}", repo);
+            writeln!(out, "  - {}", repo)?;
         }
     }
+    out.flush()?;
     
     Ok(())
 }
 
 async fn show_system_info(config_manager: &mut ConfigManager) -> Result<()> {
     println!("=== PortableSource System Information ===");
-    // Assemble config if empty
-    ensure_config_initialized(config_manager)?;
-    // Hydrate from existing ps_env and nvidia-smi
-    config_manager.hydrate_from_existing_env()?;
+    // ensure_config_initialized/hydrate_from_existing_env уже выполнены в run() для этой команды
     
     // Show configuration summary
     println!("\n{}", config_manager.get_config_summary());
@@ -476,8 +486,8 @@ async fn show_system_info(config_manager: &mut ConfigManager) -> Result<()> {
                     .join("mamba_env")
                     .join("bin");
                 println!("\n=== Micromamba Base ===");
-                if base_bin.exists() {
-                    let check = |name: &str| base_bin.join(name).exists();
+                if let Some(bin_names) = utils::list_dir_names(&base_bin) {
+                    let check = |name: &str| bin_names.contains(name);
                     let py_ok = check("python") || check("python3");
                     let pip_ok = check("pip") || check("pip3");
                     let git_ok = check("git");
@@ -486,8 +496,7 @@ async fn show_system_info(config_manager: &mut ConfigManager) -> Result<()> {
                     println!("pip: {}", if pip_ok { "Available" } else { "Not found" });
                     println!("git: {}", if git_ok { "Available" } else { "Not found" });
                     println!("ffmpeg: {}", if ff_ok { "Available" } else { "Not found" });
-                    let cuda_ok = base_bin.join("nvcc").exists();
-                    println!("cuda: {}", if cuda_ok { "Available" } else { "Not found" });
+                    println!("cuda: {}", if check("nvcc") { "Available" } else { "Not found" });
                 } else {
                     println!("Micromamba base not found at {}", base_bin.display());
                 }
@@ -555,14 +564,13 @@ fn ensure_config_initialized(config_manager: &mut ConfigManager) -> Result<()> {
 async fn check_environment(install_path: &PathBuf, _config_manager: &ConfigManager) -> Result<()> {
     println!("=== Environment Status ===");
     
-    let env_manager = PortableEnvironmentManager::new(install_path.clone());
+    // Один read_dir каталога bin вместо stat на каждый инструмент
     #[cfg(unix)]
-    let status = {
-        let base_bin = install_path.join("ps_env").join("mamba_env").join("bin");
-        base_bin.join("python").exists() && base_bin.join("git").exists() && base_bin.join("ffmpeg").exists()
-    };
+    let bin_names = utils::list_dir_names(&install_path.join("ps_env").join("mamba_env").join("bin")).unwrap_or_default();
+    #[cfg(unix)]
+    let status = ["python", "git", "ffmpeg"].iter().all(|name| bin_names.contains(*name));
     #[cfg(windows)]
-    let status = env_manager.check_environment_status()?;
+    let status = PortableEnvironmentManager::new(install_path.clone()).check_environment_status()?;
     
     println!("Environment setup: {}", if status { "OK" } else { "Not setup" });
     #[cfg(windows)]
@@ -572,18 +580,12 @@ async fn check_environment(install_path: &PathBuf, _config_manager: &ConfigManag
     println!("\n=== Available Tools ===");
     #[cfg(unix)]
     {
-        let base_bin = install_path.join("ps_env").join("mamba_env").join("bin");
-        let chk = |name: &str| {
-            let p = base_bin.join(name);
-            std::fs::metadata(&p).is_ok() || p.exists()
-        };
+        let chk = |name: &str| bin_names.contains(name);
         println!("git: {}", if chk("git") { "Available" } else { "Not found" });
         println!("python: {}", if chk("python") || chk("python3") { "Available" } else { "Not found" });
         println!("ffmpeg: {}", if chk("ffmpeg") { "Available" } else { "Not found" });
         // CUDA availability (via nvcc) in micromamba base
-        let nvcc_path = base_bin.join("nvcc");
-        let cuda_ok = std::fs::metadata(&nvcc_path).is_ok();
-        println!("cuda: {}", if cuda_ok { "Available" } else { "Not found" });
+        println!("cuda: {}", if chk("nvcc") { "Available" } else { "Not found" });
     }
     #[cfg(windows)]
     {
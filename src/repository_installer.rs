@@ -25,9 +25,18 @@ pub struct FallbackRepo {
     pub program_args: Option<String>,
 }
 
+/// Result of a successful install: the normalized folder name and its path under repos/
+#[derive(Clone, Debug)]
+pub struct InstalledRepository {
+    pub name: String,
+    pub path: PathBuf,
+}
+
 /// Main repository installer using modular components
 pub struct RepositoryInstaller {
     install_path: PathBuf,
+    repos_path: PathBuf,
+    envs_path: PathBuf,
     config_manager: ConfigManager,
     env_manager: PortableEnvironmentManager,
     server_client: ServerClient,
@@ -47,6 +56,8 @@ impl RepositoryInstaller {
         config_manager.set_config_path_to_install_dir();
         
         Self {
+            repos_path: install_path.join("repos"),
+            envs_path: install_path.join("envs"),
             install_path,
             config_manager,
             env_manager,
@@ -57,22 +68,24 @@ impl RepositoryInstaller {
     }
     
     /// Install a repository from URL or name
-    pub async fn install_repository(&mut self, repo_url_or_name: &str) -> Result<()> {
+    pub async fn install_repository(&mut self, repo_url_or_name: &str) -> Result<InstalledRepository> {
         info!("Installing repository: {}", repo_url_or_name);
         println!("[PortableSource] Installing repository: {}", repo_url_or_name);
         
-        if self.is_repository_url(repo_url_or_name) {
-            self.install_from_url(repo_url_or_name).await
+        let installed = if self.is_repository_url(repo_url_or_name) {
+            self.install_from_url(repo_url_or_name).await?
         } else {
-            self.install_from_name(repo_url_or_name).await
-        }
+            self.install_from_name(repo_url_or_name).await?
+        };
+        info!("Repository '{}' installed successfully", installed.name);
+        Ok(installed)
     }
     
     /// Update an existing repository
     pub async fn update_repository(&mut self, repo_name: &str) -> Result<()> {
         info!("Updating repository: {}", repo_name);
 
-        let repo_path = self.install_path.join("repos").join(repo_name);
+        let repo_path = self.repos_path.join(repo_name);
 
         if !repo_path.exists() {
             return Err(PortableSourceError::repository(
@@ -105,8 +118,8 @@ impl RepositoryInstaller {
     pub fn delete_repository(&self, repo_name: &str) -> Result<()> {
         info!("Deleting repository: {}", repo_name);
         
-        let repo_path = self.install_path.join("repos").join(repo_name);
-        let env_path = self.install_path.join("envs").join(repo_name);
+        let repo_path = self.repos_path.join(repo_name);
+        let env_path = self.envs_path.join(repo_name);
         
         if !repo_path.exists() && !env_path.exists() {
             return Err(PortableSourceError::repository(
@@ -116,7 +129,7 @@ impl RepositoryInstaller {
         
         // Delete repo folder if present
         if repo_path.exists() {
-            std::fs::remove_dir_all(&repo_path)
+            crate::utils::remove_dir_all_parallel(&repo_path)
                 .map_err(|e| PortableSourceError::repository(
                     format!("Failed to delete repository '{}': {}", repo_name, e)
                 ))?;
@@ -124,7 +137,7 @@ impl RepositoryInstaller {
 
         // Delete corresponding env folder if present
         if env_path.exists() {
-            std::fs::remove_dir_all(&env_path)
+            crate::utils::remove_dir_all_parallel(&env_path)
                 .map_err(|e| PortableSourceError::repository(
                     format!("Failed to delete environment for '{}': {}", repo_name, e)
                 ))?;
@@ -136,88 +149,28 @@ impl RepositoryInstaller {
     
     /// List installed repositories with source suffixes
     pub fn list_repositories(&self) -> Result<Vec<String>> {
-        let repos_path = self.install_path.join("repos");
-        
-        if !repos_path.exists() {
-            return Ok(Vec::new());
-        }
-        
-        let mut repositories = Vec::new();
-        
-        for entry in std::fs::read_dir(&repos_path)? {
-            let entry = entry?;
-            if entry.file_type()?.is_dir() {
-                if let Some(name) = entry.file_name().to_str() {
-                    let repo_dir = entry.path();
-                    let link_file = repo_dir.join("link.txt");
-                    let suffix = if link_file.exists() {
-                        let link = fs::read_to_string(&link_file).unwrap_or_default();
-                        let link_lower = link.to_lowercase();
-                        if link_lower.contains("github.com") { " [From github]" } else { " [From git]" }
-                    } else {
-                        " [From server]"
-                    };
-                    repositories.push(format!("{}{}", name, suffix));
-                }
-            }
-        }
-        
-        repositories.sort();
-        Ok(repositories)
+        list_repositories_at(&self.install_path)
     }
 
     /// List raw repository folder names (no suffixes)
     pub fn list_repository_names_raw(&self) -> Result<Vec<String>> {
-        let repos_path = self.install_path.join("repos");
-        if !repos_path.exists() { return Ok(Vec::new()); }
-        let mut repositories = Vec::new();
-        for entry in std::fs::read_dir(&repos_path)? {
-            let entry = entry?;
-            if entry.file_type()?.is_dir() {
-                if let Some(name) = entry.file_name().to_str() {
-                    repositories.push(name.to_string());
-                }
-            }
-        }
-        repositories.sort();
-        Ok(repositories)
+        Ok(scan_repository_dirs(&self.install_path, false)?.into_iter().map(|(name, _)| name).collect())
     }
 
     /// List repositories with labels, preserving mapping to raw names, sorted by name
     pub fn list_repositories_labeled(&self) -> Result<Vec<(String, String)>> {
-        let repos_path = self.install_path.join("repos");
-        if !repos_path.exists() { return Ok(Vec::new()); }
-        let mut items: Vec<(String, String)> = Vec::new();
-        for entry in std::fs::read_dir(&repos_path)? {
-            let entry = entry?;
-            if entry.file_type()?.is_dir() {
-                if let Some(name) = entry.file_name().to_str() {
-                    let repo_dir = entry.path();
-                    let link_file = repo_dir.join("link.txt");
-                    let suffix = if link_file.exists() {
-                        let link = fs::read_to_string(&link_file).unwrap_or_default();
-                        let link_lower = link.to_lowercase();
-                        if link_lower.contains("github.com") { " [From github]" } else { " [From git]" }
-                    } else {
-                        " [From server]"
-                    };
-                    items.push((name.to_string(), format!("{}{}", name, suffix)));
-                }
-            }
-        }
-        items.sort_by(|a, b| a.0.cmp(&b.0));
-        Ok(items)
+        list_repositories_labeled_at(&self.install_path)
     }
     
     // Private helper methods
     
-    async fn install_from_url(&mut self, repo_url: &str) -> Result<()> {
+    async fn install_from_url(&mut self, repo_url: &str) -> Result<InstalledRepository> {
         info!("Installing from URL: {}", repo_url);
         // Parse URL to get repository name
         let url = Url::parse(repo_url)
             .map_err(|e| PortableSourceError::repository(format!("Invalid repository URL: {}", e)))?;
         let repo_name = self.extract_repo_name_from_url(&url)?;
-        let repo_path = self.install_path.join("repos").join(&repo_name);
+        let repo_path = self.repos_path.join(&repo_name);
 
         // Create modular components for this operation
         let command_runner = CommandRunner::new(&self.env_manager);
@@ -261,18 +214,17 @@ impl RepositoryInstaller {
         // Send stats (non-fatal)
         let _ = self.server_client.send_download_stats(&repo_name);
 
-        info!("Repository '{}' installed successfully", repo_name);
-        Ok(())
+        Ok(InstalledRepository { name: repo_name, path: repo_path })
     }
     
-    async fn install_from_name(&mut self, repo_name: &str) -> Result<()> {
+    async fn install_from_name(&mut self, repo_name: &str) -> Result<InstalledRepository> {
         info!("Installing from name: {}", repo_name);
         println!("[PortableSource] Resolving repository '{}'", repo_name);
         let repo_info = self.get_repository_info(repo_name)?
             .ok_or_else(|| PortableSourceError::repository(format!("Repository '{}' not found", repo_name)))?;
 
         let name = self.normalize_repo_name(repo_name, &repo_info)?;
-        let repo_path = self.install_path.join("repos").join(&name);
+        let repo_path = self.repos_path.join(&name);
 
         println!("[PortableSource] Target path: {:?}", repo_path);
         println!("[PortableSource] Cloning/Updating repository...");
@@ -305,15 +257,16 @@ impl RepositoryInstaller {
             &self.main_file_finder,
             self.install_path.clone(),
         );
+        // Последнее использование repo_info — поля переносим без клонирования
         let script_repo_info = ScriptRepositoryInfo {
-            url: repo_info.url.clone(),
-            main_file: repo_info.main_file.clone(),
-            program_args: repo_info.program_args.clone(),
+            url: repo_info.url,
+            main_file: repo_info.main_file,
+            program_args: repo_info.program_args,
         };
         script_generator.generate_startup_script(&repo_path, &script_repo_info)?;
 
         let _ = self.server_client.send_download_stats(&name);
-        Ok(())
+        Ok(InstalledRepository { name, path: repo_path })
     }
     
     fn is_repository_url(&self, input: &str) -> bool {
@@ -376,6 +329,91 @@ impl RepositoryInstaller {
     }
 }
 
+/// List installed repositories with source suffixes.
+/// Needs only the install path, so read-only commands can skip building a `RepositoryInstaller`.
+pub fn list_repositories_at(install_path: &Path) -> Result<Vec<String>> {
+    Ok(list_repositories_labeled_at(install_path)?.into_iter().map(|(_, label)| label).collect())
+}
+
+/// (raw name, labeled name) pairs for installed repositories, sorted by name
+pub fn list_repositories_labeled_at(install_path: &Path) -> Result<Vec<(String, String)>> {
+    Ok(scan_repository_dirs(install_path, true)?
+        .into_iter()
+        .map(|(name, link)| {
+            let label = format!("{}{}", name, repository_source_suffix(link.as_deref()));
+            (name, label)
+        })
+        .collect())
+}
+
+/// Above this many repositories link.txt probes run on worker threads
+const PARALLEL_PROBE_THRESHOLD: usize = 8;
+const PROBE_WORKERS: usize = 8;
+
+/// Single pass over repos/: folder name and (optionally) link.txt contents, sorted by name
+fn scan_repository_dirs(install_path: &Path, read_links: bool) -> Result<Vec<(String, Option<String>)>> {
+    let repos_path = install_path.join("repos");
+    let entries = match fs::read_dir(&repos_path) {
+        Ok(entries) => entries,
+        Err(e) if e.kind() == std::io::ErrorKind::NotFound => return Ok(Vec::new()),
+        Err(e) => return Err(e.into()),
+    };
+
+    // Храним только имена: полный путь нужен лишь для чтения link.txt
+    let mut dirs: Vec<String> = Vec::new();
+    for entry in entries {
+        let entry = entry?;
+        // file_type() берётся из dirent и не следует по симлинкам
+        if !entry.file_type()?.is_dir() {
+            continue;
+        }
+        match entry.file_name().into_string() {
+            Ok(name) if !name.starts_with('.') => dirs.push(name),
+            _ => continue,
+        }
+    }
+    dirs.sort_unstable();
+
+    // Один read вместо exists()+read: отсутствие link.txt означает установку с сервера
+    let read_link = |name: &String| {
+        let mut link_path = repos_path.join(name);
+        link_path.push("link.txt");
+        fs::read_to_string(link_path).ok()
+    };
+    let links: Vec<Option<String>> = if !read_links {
+        vec![None; dirs.len()]
+    } else if dirs.len() <= PARALLEL_PROBE_THRESHOLD {
+        dirs.iter().map(read_link).collect()
+    } else {
+        // Много репозиториев (или сетевой диск): чтения link.txt перекрываем в нескольких потоках
+        let chunk_size = (dirs.len() + PROBE_WORKERS - 1) / PROBE_WORKERS;
+        std::thread::scope(|scope| {
+            let handles: Vec<_> = dirs
+                .chunks(chunk_size)
+                .map(|chunk| {
+                    let handle = scope.spawn(move || chunk.iter().map(read_link).collect::<Vec<_>>());
+                    (chunk.len(), handle)
+                })
+                .collect();
+            handles
+                .into_iter()
+                .flat_map(|(len, handle)| handle.join().unwrap_or_else(|_| vec![None; len]))
+                .collect()
+        })
+    };
+
+    Ok(dirs.into_iter().zip(links).collect())
+}
+
+/// Source label for a repository based on its link.txt contents
+fn repository_source_suffix(link: Option<&str>) -> &'static str {
+    match link {
+        Some(link) if link.to_lowercase().contains("github.com") => " [From github]",
+        Some(_) => " [From git]",
+        None => " [From server]",
+    }
+}
+
 fn default_fallback_repositories() -> HashMap<String, FallbackRepo> {
     let mut repos = HashMap::new();
     
@@ -7,11 +7,11 @@ use crate::repository_installer::RepositoryInstaller;
 use crate::gpu::{GpuDetector, GpuType};
 use std::path::{Path, PathBuf};
 use std::process::Command;
+use std::collections::HashSet;
 use std::fs;
+use std::sync::Mutex;
 use std::time::Duration;
 
-#[cfg(unix)]
-use indicatif::{ProgressBar, ProgressStyle};
 #[cfg(unix)]
 use libc;
 
@@ -22,37 +22,79 @@ const INSTALL_PATH_VALUE: &str = "InstallPath";
 #[cfg(windows)]
 use winreg::enums::*;
 #[cfg(windows)]
-use winreg::RegKey;
+use winreg::{RegKey, RegValue};
+#[cfg(windows)]
+use winreg::types::FromRegValue;
+
+/// Кэш прочитанного пути установки на время процесса (`None` — ещё не читали)
+static INSTALL_PATH_CACHE: Mutex<Option<Option<PathBuf>>> = Mutex::new(None);
+
+/// Replace the cached install path; `None` forces the next load to read storage again
+fn set_install_path_cache(value: Option<Option<PathBuf>>) {
+    if let Ok(mut cached) = INSTALL_PATH_CACHE.lock() {
+        *cached = value;
+    }
+}
 
 /// Save installation path (Windows: registry; Linux: /etc file)
 #[cfg(windows)]
 pub fn save_install_path_to_registry(install_path: &Path) -> Result<()> {
     let hkcu = RegKey::predef(HKEY_CURRENT_USER);
-    let (key, _) = hkcu.create_subkey(REGISTRY_KEY)
+    // Для записи достаточно KEY_SET_VALUE; ключ закрывается при drop
+    let (key, _) = hkcu.create_subkey_with_flags(REGISTRY_KEY, KEY_SET_VALUE)
         .map_err(|e| PortableSourceError::Registry(format!("Failed to create registry key: {}", e)))?;
-    key.set_value(INSTALL_PATH_VALUE, &install_path.to_string_lossy().to_string())
-        .map_err(|e| PortableSourceError::Registry(format!("Failed to set registry value: {}", e)))?;
+    let path_str = install_path.to_string_lossy().to_string();
+    // Путь внутри профиля храним как REG_EXPAND_SZ "%USERPROFILE%\..." — переживает переименование профиля
+    let tokenized = std::env::var("USERPROFILE").ok()
+        .and_then(|profile| tokenize_user_profile(&path_str, &profile));
+    let written = match tokenized {
+        Some(value) => {
+            let bytes: Vec<u8> = value.encode_utf16()
+                .chain(std::iter::once(0))
+                .flat_map(|unit| unit.to_le_bytes())
+                .collect();
+            key.set_raw_value(INSTALL_PATH_VALUE, &RegValue { bytes, vtype: REG_EXPAND_SZ })
+        }
+        None => key.set_value(INSTALL_PATH_VALUE, &path_str),
+    };
+    written.map_err(|e| PortableSourceError::Registry(format!("Failed to set registry value: {}", e)))?;
+    // Только что записанное значение и есть то, что вернёт следующее чтение
+    set_install_path_cache(Some(Some(install_path.to_path_buf())));
     log::info!("Installation path saved to registry: {:?}", install_path);
     Ok(())
 }
 
+/// Location of the per-user install path file (~/.portablesource)
 #[cfg(unix)]
-pub fn save_install_path_to_registry(install_path: &Path) -> Result<()> {
-    // Save install path to ~/.portablesource
-    let config_file = if is_root() {
+fn registry_file_path() -> PathBuf {
+    if is_root() {
         PathBuf::from("/root/.portablesource")
+    } else if let Ok(username) = std::env::var("USER") {
+        PathBuf::from(format!("/home/{}/.portablesource", username))
+    } else if let Some(home) = dirs::home_dir() {
+        home.join(".portablesource")
     } else {
-        if let Ok(username) = std::env::var("USER") {
-            PathBuf::from(format!("/home/{}/.portablesource", username))
-        } else if let Some(home) = dirs::home_dir() {
-            home.join(".portablesource")
-        } else {
-            PathBuf::from("./.portablesource")
-        }
-    };
-    
+        PathBuf::from("./.portablesource")
+    }
+}
+
+/// Read a path file; a missing file is not an error
+#[cfg(unix)]
+fn read_path_file(path: &Path) -> Result<Option<PathBuf>> {
+    match std::fs::read_to_string(path) {
+        Ok(content) => Ok(Some(PathBuf::from(content.trim()))),
+        Err(e) if e.kind() == std::io::ErrorKind::NotFound => Ok(None),
+        Err(e) => Err(PortableSourceError::Registry(format!("Failed to read {}: {}", path.display(), e))),
+    }
+}
+
+#[cfg(unix)]
+pub fn save_install_path_to_registry(install_path: &Path) -> Result<()> {
+    // Save install path to ~/.portablesource
+    let config_file = registry_file_path();
     std::fs::write(&config_file, install_path.to_string_lossy().as_bytes())
         .map_err(|e| PortableSourceError::Registry(format!("Failed to write {}: {}", config_file.display(), e)))?;
+    set_install_path_cache(Some(Some(install_path.to_path_buf())));
     log::info!("Installation path saved to {}", config_file.display());
     Ok(())
 }
@@ -61,8 +103,9 @@ pub fn save_install_path_to_registry(install_path: &Path) -> Result<()> {
 #[cfg(windows)]
 pub fn delete_install_path_from_registry() -> Result<()> {
     let hkcu = RegKey::predef(HKEY_CURRENT_USER);
+    set_install_path_cache(None);
     
-    match hkcu.open_subkey_with_flags(REGISTRY_KEY, KEY_ALL_ACCESS) {
+    match hkcu.open_subkey_with_flags(REGISTRY_KEY, KEY_SET_VALUE) {
         Ok(key) => {
             key.delete_value(INSTALL_PATH_VALUE)
                 .map_err(|e| PortableSourceError::Registry(format!("Failed to delete registry value: {}", e)))?;
@@ -79,81 +122,114 @@ pub fn delete_install_path_from_registry() -> Result<()> {
 #[cfg(unix)]
 pub fn delete_install_path_from_registry() -> Result<()> {
     // Remove ~/.portablesource file
-    let config_file = if is_root() {
-        PathBuf::from("/root/.portablesource")
-    } else {
-        if let Ok(username) = std::env::var("USER") {
-            PathBuf::from(format!("/home/{}/.portablesource", username))
-        } else if let Some(home) = dirs::home_dir() {
-            home.join(".portablesource")
-        } else {
-            PathBuf::from("./.portablesource")
-        }
-    };
-    
-    if config_file.exists() { 
-        let _ = std::fs::remove_file(&config_file); 
-    }
+    set_install_path_cache(None);
+    let _ = std::fs::remove_file(registry_file_path());
 
     // Best-effort: also remove legacy global file if running as root
-    let etc_file = std::path::Path::new("/etc/portablesource").join("install_path");
-    if is_root() && etc_file.exists() { 
-        let _ = std::fs::remove_file(&etc_file); 
+    if is_root() {
+        let _ = std::fs::remove_file(Path::new("/etc/portablesource").join("install_path"));
     }
     log::info!("Installation path deleted (user and legacy locations cleaned where possible)");
     Ok(())
 }
 
-/// Load installation path from Windows registry
-#[cfg(windows)]
+/// Load installation path (cached for the lifetime of the process)
 pub fn load_install_path_from_registry() -> Result<Option<PathBuf>> {
+    if let Ok(cached) = INSTALL_PATH_CACHE.lock() {
+        if let Some(path) = cached.as_ref() {
+            return Ok(path.clone());
+        }
+    }
+    let path = read_install_path_from_registry()?;
+    set_install_path_cache(Some(path.clone()));
+    Ok(path)
+}
+
+/// Read installation path from Windows registry
+#[cfg(windows)]
+fn read_install_path_from_registry() -> Result<Option<PathBuf>> {
     let hkcu = RegKey::predef(HKEY_CURRENT_USER);
     
-    match hkcu.open_subkey(REGISTRY_KEY) {
+    match hkcu.open_subkey_with_flags(REGISTRY_KEY, KEY_QUERY_VALUE) {
         Ok(key) => {
-            match key.get_value::<String, _>(INSTALL_PATH_VALUE) {
-                Ok(path_str) => {
+            let raw = key.get_raw_value(INSTALL_PATH_VALUE);
+            match raw.as_ref().map(|raw| (raw.vtype.clone(), String::from_reg_value(raw))) {
+                Ok((vtype, Ok(path_str))) => {
+                    let path_str = if vtype == REG_EXPAND_SZ {
+                        expand_env_tokens(&path_str, |name| std::env::var(name).ok())
+                    } else {
+                        path_str
+                    };
                     let path = PathBuf::from(path_str);
                     log::debug!("Loaded installation path from registry: {:?}", path);
                     Ok(Some(path))
                 }
-                Err(_) => Ok(None),
+                _ => Ok(None),
             }
         }
         Err(_) => Ok(None),
     }
 }
 
-#[cfg(unix)]
-pub fn load_install_path_from_registry() -> Result<Option<PathBuf>> {
-    // Load install path from ~/.portablesource
-    let config_file = if is_root() {
-        PathBuf::from("/root/.portablesource")
+/// Replace a leading user-profile directory with `%USERPROFILE%` (case-insensitive,
+/// only on a path component boundary)
+#[cfg_attr(not(windows), allow(dead_code))]
+fn tokenize_user_profile(path: &str, profile: &str) -> Option<String> {
+    let profile = profile.trim_end_matches(['\\', '/']);
+    if profile.is_empty() || path.len() < profile.len() || !path.is_char_boundary(profile.len()) {
+        return None;
+    }
+    let (head, rest) = path.split_at(profile.len());
+    if !head.eq_ignore_ascii_case(profile) {
+        return None;
+    }
+    if rest.is_empty() || rest.starts_with(['\\', '/']) {
+        Some(format!("%USERPROFILE%{}", rest))
     } else {
-        if let Ok(username) = std::env::var("USER") {
-            PathBuf::from(format!("/home/{}/.portablesource", username))
-        } else if let Some(home) = dirs::home_dir() {
-            home.join(".portablesource")
-        } else {
-            PathBuf::from("./.portablesource")
+        None
+    }
+}
+
+/// Expand `%NAME%` tokens like ExpandEnvironmentStrings; unknown names are left as is
+#[cfg_attr(not(windows), allow(dead_code))]
+fn expand_env_tokens(value: &str, lookup: impl Fn(&str) -> Option<String>) -> String {
+    let mut out = String::with_capacity(value.len());
+    let mut rest = value;
+    while let Some(start) = rest.find('%') {
+        out.push_str(&rest[..start]);
+        let after = &rest[start + 1..];
+        match after.find('%') {
+            Some(end) => {
+                let name = &after[..end];
+                match (!name.is_empty()).then(|| lookup(name)).flatten() {
+                    Some(expanded) => out.push_str(&expanded),
+                    None => {
+                        out.push('%');
+                        out.push_str(name);
+                        out.push('%');
+                    }
+                }
+                rest = &after[end + 1..];
+            }
+            None => {
+                out.push_str(&rest[start..]);
+                rest = "";
+            }
         }
-    };
-    
-    if config_file.exists() {
-        let content = std::fs::read_to_string(&config_file)
-            .map_err(|e| PortableSourceError::Registry(format!("Failed to read {}: {}", config_file.display(), e)))?;
-        return Ok(Some(PathBuf::from(content.trim())));
     }
-    
-    // Back-compat: legacy global file
-    let path_file = std::path::Path::new("/etc/portablesource").join("install_path");
-    if path_file.exists() {
-        let content = std::fs::read_to_string(&path_file)
-            .map_err(|e| PortableSourceError::Registry(format!("Failed to read {}: {}", path_file.display(), e)))?;
-        return Ok(Some(PathBuf::from(content.trim())));
+    out.push_str(rest);
+    out
+}
+
+#[cfg(unix)]
+fn read_install_path_from_registry() -> Result<Option<PathBuf>> {
+    // Load install path from ~/.portablesource
+    if let Some(path) = read_path_file(&registry_file_path())? {
+        return Ok(Some(path));
     }
-    
-    Ok(None)
+
+    // Back-compat: legacy global file
+    read_path_file(&Path::new("/etc/portablesource").join("install_path"))
 }
 
 /// Validate and create directory if it doesn't exist
@@ -165,49 +241,92 @@ pub fn validate_and_create_path(path: &Path) -> Result<PathBuf> {
         std::env::current_dir()?.join(path)
     };
 
-    if !abs_path.exists() {
-        std::fs::create_dir_all(&abs_path)
-            .map_err(|e| PortableSourceError::installation(
-                format!("Failed to create directory {:?}: {}", abs_path, e)
-            ))?;
-    }
-
-    if !abs_path.is_dir() {
-        return Err(PortableSourceError::invalid_path(
-            format!("Path is not a directory: {:?}", abs_path)
-        ));
+    // Один stat: существующий каталог принимаем сразу, создаём только при NotFound
+    match std::fs::metadata(&abs_path) {
+        Ok(meta) if meta.is_dir() => {}
+        Ok(_) => {
+            return Err(PortableSourceError::invalid_path(
+                format!("Path is not a directory: {:?}", abs_path)
+            ));
+        }
+        Err(e) if e.kind() == std::io::ErrorKind::NotFound => {
+            std::fs::create_dir_all(&abs_path)
+                .map_err(|e| PortableSourceError::installation(
+                    format!("Failed to create directory {:?}: {}", abs_path, e)
+                ))?;
+        }
+        Err(e) => {
+            return Err(PortableSourceError::invalid_path(
+                format!("Cannot access {:?}: {}", abs_path, e)
+            ));
+        }
     }
 
     Ok(abs_path)
 }
 
+/// Lexical comparison of two install paths (no filesystem access): relative paths are
+/// taken from the current directory, trailing separators ignored, and on Windows case
+/// and `/` vs `\` do not matter
+pub fn same_install_path(a: &Path, b: &Path) -> bool {
+    let normalize = |p: &Path| {
+        let abs = if p.is_absolute() {
+            p.to_path_buf()
+        } else {
+            std::env::current_dir().map(|cwd| cwd.join(p)).unwrap_or_else(|_| p.to_path_buf())
+        };
+        let s = abs.to_string_lossy().into_owned();
+        let s = if cfg!(windows) { s.replace('/', "\\").to_lowercase() } else { s };
+        let trimmed = s.trim_end_matches(['/', '\\']);
+        if trimmed.is_empty() { s } else { trimmed.to_string() }
+    };
+    normalize(a) == normalize(b)
+}
+
 /// Validate and convert string path to PathBuf and ensure it exists
 pub fn validate_and_get_path(path_str: &str) -> Result<PathBuf> {
     let path = PathBuf::from(path_str);
     validate_and_create_path(&path)
 }
 
+/// Top-level directories of an installation
+const INSTALL_SUBDIRS: [&str; 3] = ["ps_env", "repos", "envs"];
+
 /// Create necessary directory structure for PortableSource
 pub fn create_directory_structure(install_path: &Path) -> Result<()> {
-    #[cfg(windows)]
-    let directories = [
-        install_path.join("ps_env"),
-        install_path.join("repos"),
-        install_path.join("envs"),
-    ];
-    #[cfg(unix)]
-    let directories = [
-        install_path.join("ps_env"),
-        install_path.join("repos"),
-        install_path.join("envs"),
-    ];
-    
-    for dir in &directories {
-        std::fs::create_dir_all(dir)
-            .map_err(|e| PortableSourceError::installation(
-                format!("Failed to create directory {:?}: {}", dir, e)
-            ))?;
-        log::debug!("Created directory: {:?}", dir);
+    // Тёплый старт: один read_dir вместо mkdir на каждую директорию
+    let existing: HashSet<String> = match fs::read_dir(install_path) {
+        Ok(entries) => entries
+            .flatten()
+            .filter(|e| e.file_type().map(|t| t.is_dir()).unwrap_or(false))
+            .filter_map(|e| e.file_name().into_string().ok())
+            .collect(),
+        Err(_) => {
+            // Родитель создаём один раз, листья — обычным mkdir без повторного обхода предков
+            std::fs::create_dir_all(install_path)
+                .map_err(|e| PortableSourceError::installation(
+                    format!("Failed to create directory {:?}: {}", install_path, e)
+                ))?;
+            HashSet::new()
+        }
+    };
+
+    let mut created: Vec<&str> = Vec::new();
+    for name in INSTALL_SUBDIRS.iter().filter(|name| !existing.contains(**name)) {
+        let dir = install_path.join(name);
+        match std::fs::create_dir(&dir) {
+            Ok(()) => created.push(name),
+            Err(e) if e.kind() == std::io::ErrorKind::AlreadyExists => {}
+            Err(e) => {
+                return Err(PortableSourceError::installation(
+                    format!("Failed to create directory {:?}: {}", dir, e)
+                ));
+            }
+        }
+    }
+    // Одна запись в лог на весь вызов вместо строки на каждую папку
+    if !created.is_empty() {
+        log::debug!("Created directories in {:?}: {}", install_path, created.join(", "));
     }
     
     Ok(())
@@ -285,43 +404,279 @@ pub fn default_install_path_linux() -> PathBuf {
 
 #[cfg(unix)]
 pub fn prompt_install_path_linux(default: &Path) -> Result<PathBuf> {
-    use std::io::{self, Write};
     println!(
         "[{}] — it is base install path, do you like it, or customize?\nEnter new path or press Enter to accept:",
         default.display()
     );
-    print!("> ");
-    io::stdout().flush().ok();
-    let mut input = String::new();
-    io::stdin().read_line(&mut input).ok();
-    let trimmed = input.trim();
-    if trimmed.is_empty() {
-        return validate_and_create_path(default);
-    }
-    let chosen = PathBuf::from(trimmed);
+    let chosen = prompt_path("> ", default)?;
     validate_and_create_path(&chosen)
 }
 
+/// Read/write chunk for downloads: large archives go through in ~1 MiB steps
+/// instead of io::copy's default 8 KiB buffer
+pub(crate) const DOWNLOAD_CHUNK_SIZE: usize = 1 << 20;
+
+/// Read buffer for a body of `content_length` bytes: 1/64 of the size, between 64 KiB and
+/// DOWNLOAD_CHUNK_SIZE (unknown length gets the full chunk). Бинарь micromamba (~15 MiB)
+/// проходит за ~64 крупных шага, а мелкие файлы не раздувают буфер
+pub(crate) fn download_buffer_size(content_length: Option<u64>) -> usize {
+    content_length.map_or(DOWNLOAD_CHUNK_SIZE, |len| {
+        (len / 64).clamp(64 * 1024, DOWNLOAD_CHUNK_SIZE as u64) as usize
+    })
+}
+
+/// Общий HTTP-клиент для загрузок: keep-alive пул переиспользует TCP/TLS соединения
+/// между архивами с одного хоста
+static DOWNLOAD_CLIENT: std::sync::OnceLock<reqwest::blocking::Client> = std::sync::OnceLock::new();
+
+/// Shared blocking client for archive/installer downloads and server API calls
+/// (API requests set their own shorter timeout per request)
+pub(crate) fn download_client() -> Result<&'static reqwest::blocking::Client> {
+    if let Some(client) = DOWNLOAD_CLIENT.get() {
+        return Ok(client);
+    }
+    let client = reqwest::blocking::Client::builder()
+        .timeout(Duration::from_secs(600))
+        .pool_max_idle_per_host(8)
+        .tcp_keepalive(Duration::from_secs(60))
+        .build()?;
+    Ok(DOWNLOAD_CLIENT.get_or_init(|| client))
+}
+
+/// Send a request, retrying connection errors, timeouts and 502/503/504 with backoff
+pub(crate) fn send_with_retry(request: reqwest::blocking::RequestBuilder) -> reqwest::Result<reqwest::blocking::Response> {
+    const ATTEMPTS: u32 = 5;
+    let mut delay = Duration::from_millis(500);
+    for _ in 1..ATTEMPTS {
+        let Some(attempt) = request.try_clone() else { break };
+        match attempt.send() {
+            Ok(resp) if !matches!(resp.status().as_u16(), 502 | 503 | 504) => return Ok(resp),
+            Err(e) if !(e.is_connect() || e.is_timeout()) => return Err(e),
+            Ok(resp) => log::debug!("HTTP {} from {}, retrying in {:?}", resp.status(), resp.url(), delay),
+            Err(e) => log::debug!("Request failed ({}), retrying in {:?}", e, delay),
+        }
+        std::thread::sleep(delay);
+        delay *= 2;
+    }
+    request.send()
+}
+
 /// Simple HTTP(S) download helper
 pub fn download_file(url: &str, destination: &Path) -> Result<()> {
-    use reqwest::blocking::Client;
-    use std::io::copy;
+    download_file_checked(url, destination, None)
+}
+
+/// Download `url` to `destination`, verifying the SHA-256 of the body when `expected_sha256` is given.
+/// Хэш считается по ходу загрузки, без повторного чтения файла; при несовпадении файл удаляется
+pub(crate) fn download_file_checked(url: &str, destination: &Path, expected_sha256: Option<&str>) -> Result<()> {
+    use sha2::{Digest, Sha256};
+    use std::io::{copy, BufWriter, Write};
     if let Some(parent) = destination.parent() { std::fs::create_dir_all(parent)?; }
-    let client = Client::builder().timeout(Duration::from_secs(600)).build()?;
-    let mut resp = client.get(url).send()
+    let mut resp = send_with_retry(download_client()?.get(url))
         .map_err(|e| PortableSourceError::environment(format!("Failed to GET {}: {}", url, e)))?;
     if !resp.status().is_success() {
         return Err(PortableSourceError::environment(format!("Download failed: HTTP {}", resp.status())));
     }
-    let mut file = std::fs::File::create(destination)?;
-    copy(&mut resp, &mut file)?;
+    let out = std::fs::File::create(destination)?;
+    let expected_len = resp.content_length();
+    if let Some(len) = expected_len {
+        preallocate_file(&out, len);
+    }
+    let mut file = BufWriter::with_capacity(download_buffer_size(expected_len), out);
+    let mut reader = HashingReader { inner: &mut resp, hasher: expected_sha256.map(|_| Sha256::new()) };
+    let written = copy(&mut reader, &mut file)?;
+    file.flush()?;
+    // Оборванный ответ — ошибка, а не файл с хвостом из зарезервированных нулей
+    if let Some(len) = expected_len.filter(|&len| written != len) {
+        drop(file);
+        let _ = std::fs::remove_file(destination);
+        return Err(PortableSourceError::environment(format!(
+            "Incomplete download of {}: got {} of {} bytes", url, written, len
+        )));
+    }
+    if let (Some(expected), Some(hasher)) = (expected_sha256, reader.hasher) {
+        drop(file);
+        check_sha256(hasher, expected, url, destination)?;
+    }
     Ok(())
 }
 
+/// Compare a finished digest with `expected`; on mismatch the downloaded file is removed
+fn check_sha256(hasher: sha2::Sha256, expected: &str, url: &str, destination: &Path) -> Result<()> {
+    use sha2::Digest;
+    let actual: String = hasher.finalize().iter().map(|b| format!("{:02x}", b)).collect();
+    if !actual.eq_ignore_ascii_case(expected.trim()) {
+        let _ = std::fs::remove_file(destination);
+        return Err(PortableSourceError::environment(format!(
+            "Checksum mismatch for {}: expected {}, got {}", url, expected.trim(), actual
+        )));
+    }
+    Ok(())
+}
+
+/// Concurrent `Range` requests per parallel download
+#[cfg(unix)]
+const RANGE_SEGMENTS: u64 = 4;
+/// Below this size a single stream is already fast enough
+#[cfg(unix)]
+const RANGE_MIN_SIZE: u64 = 4 << 20;
+
+/// Download `url` as RANGE_SEGMENTS concurrent `Range` requests written into their offsets of
+/// `destination`. Servers without range support (no 206 on the probe) and any failed segment fall
+/// back to the single-stream download_file_checked. SHA-256 is verified the same way
+#[cfg(unix)]
+pub(crate) fn download_file_parallel(url: &str, destination: &Path, expected_sha256: Option<&str>) -> Result<()> {
+    use reqwest::header::{CONTENT_RANGE, RANGE};
+    use reqwest::StatusCode;
+    use sha2::{Digest, Sha256};
+    use std::io::{copy, BufWriter, Seek, SeekFrom, Write};
+
+    let client = download_client()?;
+    // Пробный запрос первого байта: 206 + Content-Range дают полный размер и итоговый URL после редиректов
+    let target = match send_with_retry(client.get(url).header(RANGE, "bytes=0-0")) {
+        Ok(resp) if resp.status() == StatusCode::PARTIAL_CONTENT => resp.headers()
+            .get(CONTENT_RANGE)
+            .and_then(|v| v.to_str().ok())
+            .and_then(|v| v.rsplit('/').next())
+            .and_then(|total| total.parse::<u64>().ok())
+            .filter(|&total| total >= RANGE_MIN_SIZE)
+            .map(|total| (resp.url().clone(), total)),
+        _ => None,
+    };
+    let Some((final_url, total)) = target else {
+        return download_file_checked(url, destination, expected_sha256);
+    };
+
+    if let Some(parent) = destination.parent() { fs::create_dir_all(parent)?; }
+    fs::File::create(destination)?.set_len(total)?;
+    let segment = total.div_ceil(RANGE_SEGMENTS);
+    let result: Result<()> = std::thread::scope(|s| {
+        let handles: Vec<_> = (0..RANGE_SEGMENTS).map(|i| {
+            let (lo, hi) = (i * segment, ((i + 1) * segment).min(total) - 1);
+            let final_url = final_url.clone();
+            s.spawn(move || -> Result<()> {
+                let mut resp = send_with_retry(client.get(final_url).header(RANGE, format!("bytes={}-{}", lo, hi)))?;
+                if resp.status() != StatusCode::PARTIAL_CONTENT {
+                    return Err(PortableSourceError::environment(format!("Range request failed: HTTP {}", resp.status())));
+                }
+                let mut file = fs::OpenOptions::new().write(true).open(destination)?;
+                file.seek(SeekFrom::Start(lo))?;
+                let mut writer = BufWriter::with_capacity(download_buffer_size(Some(hi - lo + 1)), file);
+                let written = copy(&mut resp, &mut writer)?;
+                writer.flush()?;
+                if written != hi - lo + 1 {
+                    return Err(PortableSourceError::environment(format!("Short range response: {} of {} bytes", written, hi - lo + 1)));
+                }
+                Ok(())
+            })
+        }).collect();
+        handles.into_iter().try_for_each(|h| {
+            h.join().unwrap_or_else(|_| Err(PortableSourceError::environment("Range download thread panicked")))
+        })
+    });
+    if let Err(e) = result {
+        log::debug!("Parallel download of {} failed ({}), retrying as a single stream", url, e);
+        let _ = fs::remove_file(destination);
+        return download_file_checked(url, destination, expected_sha256);
+    }
+
+    // Куски пишутся вразнобой, поэтому хэш — отдельным проходом по уже записанному файлу
+    if let Some(expected) = expected_sha256 {
+        let mut reader = HashingReader { inner: fs::File::open(destination)?, hasher: Some(Sha256::new()) };
+        copy(&mut reader, &mut std::io::sink())?;
+        if let Some(hasher) = reader.hasher {
+            check_sha256(hasher, expected, url, destination)?;
+        }
+    }
+    Ok(())
+}
+
+/// Reader that feeds everything it reads into an optional SHA-256 hasher
+struct HashingReader<R> {
+    inner: R,
+    hasher: Option<sha2::Sha256>,
+}
+
+impl<R: std::io::Read> std::io::Read for HashingReader<R> {
+    fn read(&mut self, buf: &mut [u8]) -> std::io::Result<usize> {
+        let n = self.inner.read(buf)?;
+        if let Some(hasher) = self.hasher.as_mut() {
+            sha2::Digest::update(hasher, &buf[..n]);
+        }
+        Ok(n)
+    }
+}
+
+/// Fetch a published `.sha256` file and return its digest (first whitespace-separated token)
+#[cfg(unix)]
+fn fetch_sha256(url: &str) -> Option<String> {
+    let resp = send_with_retry(download_client().ok()?.get(url)).ok()?;
+    if !resp.status().is_success() { return None; }
+    let text = resp.text().ok()?;
+    let digest = text.split_whitespace().next()?;
+    (digest.len() == 64 && digest.chars().all(|c| c.is_ascii_hexdigit())).then(|| digest.to_string())
+}
+
+/// Reserve `len` bytes for a file that is about to be written sequentially, so large downloads
+/// land in contiguous extents. Best-effort: unsupported filesystems simply skip it
+fn preallocate_file(file: &std::fs::File, len: u64) {
+    #[cfg(target_os = "linux")]
+    {
+        use std::os::unix::io::AsRawFd;
+        // fallocate (в отличие от posix_fallocate) не эмулирует резерв записью нулей там, где FS его не умеет
+        let _ = unsafe { libc::fallocate(file.as_raw_fd(), 0, 0, len as libc::off_t) };
+    }
+    #[cfg(windows)]
+    {
+        // SetEndOfFile резервирует место сразу; запись идёт с начала файла
+        let _ = file.set_len(len);
+    }
+    #[cfg(not(any(target_os = "linux", windows)))]
+    {
+        let _ = (file, len);
+    }
+}
+
 #[cfg(unix)]
 #[derive(Clone, Copy, Debug, PartialEq, Eq)]
 pub enum LinuxMode { Cloud, Desk }
 
+/// Lowercased `nvcc --version` output, queried once per process (`None` if nvcc is missing or fails).
+/// Между запусками результат хранится в кэше пользователя и действителен, пока бинарь nvcc
+/// (путь и mtime) не поменялся — без запуска процесса на каждый вызов CLI
+#[cfg(unix)]
+fn nvcc_version_output() -> Option<&'static str> {
+    static NVCC_VERSION: std::sync::OnceLock<Option<String>> = std::sync::OnceLock::new();
+    NVCC_VERSION
+        .get_or_init(|| {
+            let nvcc = which::which("nvcc").ok()?;
+            let mtime_ns = fs::metadata(&nvcc).and_then(|m| m.modified()).ok()
+                .and_then(|t| t.duration_since(std::time::UNIX_EPOCH).ok())
+                .map(|d| d.as_nanos());
+            let key = mtime_ns.map(|ns| format!("{}\n{}\n", nvcc.display(), ns));
+            let cache_file = dirs::cache_dir().map(|d| d.join("portablesource").join("nvcc_version"));
+            if let (Some(key), Some(file)) = (key.as_deref(), cache_file.as_ref()) {
+                if let Some(output) = fs::read_to_string(file).ok().and_then(|s| s.strip_prefix(key).map(str::to_owned)) {
+                    return Some(output);
+                }
+            }
+
+            let out = std::process::Command::new(&nvcc).arg("--version").output().ok()?;
+            if !out.status.success() { return None; }
+            let output = String::from_utf8_lossy(&out.stdout).to_lowercase();
+            if let (Some(key), Some(file)) = (key, cache_file) {
+                // Через временный файл и rename: параллельный запуск не прочтёт половину записи
+                let tmp = file.with_extension("tmp");
+                let written = file.parent().map_or(Ok(()), fs::create_dir_all)
+                    .and_then(|_| fs::write(&tmp, format!("{}{}", key, output)))
+                    .and_then(|_| fs::rename(&tmp, &file));
+                if written.is_err() { let _ = fs::remove_file(&tmp); }
+            }
+            Some(output)
+        })
+        .as_deref()
+}
+
 #[cfg(unix)]
 pub fn detect_linux_mode() -> LinuxMode {
     // Env override: PORTABLESOURCE_MODE=CLOUD|DESK
@@ -332,15 +687,10 @@ pub fn detect_linux_mode() -> LinuxMode {
     }
     
     // Check if CUDA is available via nvcc command
-    if let Ok(output) = std::process::Command::new("nvcc")
-        .arg("--version")
-        .output() {
-        if output.status.success() {
-            let stdout = String::from_utf8_lossy(&output.stdout);
-            // Check if output contains "Cuda compilation tools"
-            if stdout.contains("Cuda compilation tools") {
-                return LinuxMode::Cloud;
-            }
+    if let Some(stdout) = nvcc_version_output() {
+        // Check if output contains "Cuda compilation tools"
+        if stdout.contains("cuda compilation tools") {
+            return LinuxMode::Cloud;
         }
     }
     
@@ -348,129 +698,342 @@ pub fn detect_linux_mode() -> LinuxMode {
     LinuxMode::Desk
 }
 
+/// Префикс релиза из `nvcc --version` -> поддерживаемая версия CUDA
+#[cfg(unix)]
+const CUDA_LINUX_RELEASES: [(&str, crate::config::CudaVersionLinux); 5] = [
+    ("12.8", crate::config::CudaVersionLinux::Cuda128),
+    ("12.6", crate::config::CudaVersionLinux::Cuda126),
+    ("12.4", crate::config::CudaVersionLinux::Cuda124),
+    ("12.1", crate::config::CudaVersionLinux::Cuda121),
+    ("11.8", crate::config::CudaVersionLinux::Cuda118),
+];
+
 #[cfg(unix)]
 pub fn detect_cuda_version_from_system() -> Option<crate::config::CudaVersionLinux> {
-    let out = std::process::Command::new("nvcc").arg("--version").output().ok()?;
-    if !out.status.success() { return None; }
-    let stdout = String::from_utf8_lossy(&out.stdout).to_lowercase();
+    let stdout = nvcc_version_output()?;
     for line in stdout.lines() {
         if line.contains("cuda compilation tools") && line.contains("release") {
             let ver = line.split_whitespace().filter(|s| s.chars().next().map(|c| c.is_ascii_digit()).unwrap_or(false)).next().unwrap_or("");
-            if ver.starts_with("12.8") { return Some(crate::config::CudaVersionLinux::Cuda128); }
-            if ver.starts_with("12.6") { return Some(crate::config::CudaVersionLinux::Cuda126); }
-            if ver.starts_with("12.4") { return Some(crate::config::CudaVersionLinux::Cuda124); }
-            if ver.starts_with("12.1") { return Some(crate::config::CudaVersionLinux::Cuda121); }
-            if ver.starts_with("11.8") { return Some(crate::config::CudaVersionLinux::Cuda118); }
+            if let Some((_, cv)) = CUDA_LINUX_RELEASES.iter().find(|(release, _)| ver.starts_with(release)) {
+                return Some(cv.clone());
+            }
         }
     }
     None
 }
 
+/// Копирует micromamba из PATH (2.x и новее) в `dest` жёсткой ссылкой, при другом разделе — копией
 #[cfg(unix)]
-fn cuda_version_to_runtime_spec(v: &crate::config::CudaVersionLinux) -> &'static str {
-    match v {
-        crate::config::CudaVersionLinux::Cuda118 => "11.8",
-        crate::config::CudaVersionLinux::Cuda121 => "12.1",
-        crate::config::CudaVersionLinux::Cuda124 => "12.4",
-        crate::config::CudaVersionLinux::Cuda126 => "12.6",
-        crate::config::CudaVersionLinux::Cuda128 => "12.8",
-    }
+fn adopt_system_micromamba(dest: &Path) -> bool {
+    let Ok(found) = which::which("micromamba") else { return false };
+    let version = std::process::Command::new(&found)
+        .arg("--version")
+        .stderr(std::process::Stdio::null())
+        .output()
+        .ok()
+        .filter(|o| o.status.success())
+        .map(|o| String::from_utf8_lossy(&o.stdout).trim().to_string())
+        .unwrap_or_default();
+    let major = version.split('.').next().and_then(|m| m.parse::<u32>().ok()).unwrap_or(0);
+    if major < 2 {
+        log::debug!("micromamba in PATH ({}) has unsupported version '{}'", found.display(), version);
+        return false;
+    }
+    fs::hard_link(&found, dest).is_ok() || fs::copy(&found, dest).is_ok()
 }
 
+/// Puts the micromamba binary into ps_env (from PATH or GitHub releases) and returns its path.
+/// Не зависит от CUDA-спецификации, поэтому его можно запускать параллельно с определением GPU
 #[cfg(unix)]
-pub fn setup_micromamba_base_env(install_path: &Path, cuda_version: Option<crate::config::CudaVersionLinux>) -> Result<()> {
+pub fn ensure_micromamba_binary(install_path: &Path) -> Result<PathBuf> {
     use std::os::unix::fs::PermissionsExt;
-    // Ensure directory layout
-    create_directory_structure(install_path)?;
     let mamba_bin = install_path.join("ps_env").join("micromamba-linux-64");
     // Correct latest asset URL + fallback pinned version
     let mamba_url_latest = "https://github.com/mamba-org/micromamba-releases/releases/latest/download/micromamba-linux-64";
     let mamba_url_fallback = "https://github.com/mamba-org/micromamba-releases/releases/download/2.3.1-0/micromamba-linux-64";
-    if !mamba_bin.exists() {
-        if let Err(e) = download_file(mamba_url_latest, &mamba_bin) {
+    if mamba_bin.exists() { return Ok(mamba_bin); }
+    // Пишем в .part и переименовываем готовый бинарь: оборванная загрузка не выглядит установленной
+    let part = mamba_bin.with_extension("part");
+    let _ = fs::remove_file(&part);
+    if adopt_system_micromamba(&part) {
+        log::info!("Using micromamba from PATH instead of downloading");
+    } else {
+        // Релизы micromamba публикуют рядом .sha256; без него качаем без проверки
+        let download = |url: &str| download_file_parallel(url, &part, fetch_sha256(&format!("{}.sha256", url)).as_deref());
+        if let Err(e) = download(mamba_url_latest) {
             log::warn!("micromamba latest download failed: {} — trying fallback", e);
-            download_file(mamba_url_fallback, &mamba_bin)?;
+            if let Err(e) = download(mamba_url_fallback) {
+                let _ = fs::remove_file(&part);
+                return Err(e);
+            }
         }
-        let mut perms = std::fs::metadata(&mamba_bin)?.permissions();
+        let mut perms = std::fs::metadata(&part)?.permissions();
         perms.set_mode(0o755);
-        std::fs::set_permissions(&mamba_bin, perms)?;
+        std::fs::set_permissions(&part, perms)?;
     }
+    fs::rename(&part, &mamba_bin)?;
+    Ok(mamba_bin)
+}
 
-    let base_prefix = install_path.join("ps_env").join("mamba_env");
-    let root_prefix = install_path.join("ps_env");
-    let mut args: Vec<String> = vec![
-        "create".into(),
-        "-y".into(),
-        "-r".into(), root_prefix.to_string_lossy().to_string(),
-        "-p".into(), base_prefix.to_string_lossy().to_string(),
-        "-c".into(), "nvidia".into(), "-c".into(), "conda-forge".into(),
-        "python=3.11".into(), "git".into(), "ffmpeg".into(),
-    ];
-    let mut attempted_cuda = false;
-    if let Some(v) = cuda_version.as_ref() {
-        let spec = cuda_version_to_runtime_spec(v);
-        args.push(format!("cuda-toolkit={}", spec));
-        args.push("cudnn".into());
-        attempted_cuda = true;
+/// Prefetches micromamba unless the base env will come from a bootstrap archive; errors are
+/// left for setup_micromamba_base_env to report
+#[cfg(unix)]
+pub fn prefetch_micromamba(install_path: &Path) {
+    if std::env::var_os(BASE_ENV_BOOTSTRAP_VAR).is_some() { return; }
+    if let Err(e) = create_directory_structure(install_path).and_then(|_| ensure_micromamba_binary(install_path)) {
+        log::debug!("micromamba prefetch failed: {}", e);
     }
+}
+
+/// Hash of the micromamba create spec, written into the base prefix after a successful setup
+#[cfg(unix)]
+const BASE_ENV_SPEC_STAMP: &str = ".portablesource_spec";
+
+/// Whether libcudart.so* is present in the base env's lib or lib64
+#[cfg(unix)]
+fn has_cuda_runtime(base_prefix: &Path) -> bool {
+    ["lib", "lib64"].iter().any(|dir| {
+        fs::read_dir(base_prefix.join(dir))
+            .map(|read| read.flatten().any(|e| e.file_name().to_string_lossy().starts_with("libcudart.so")))
+            .unwrap_or(false)
+    })
+}
+
+/// URL or local path of a pre-built base env archive (conda-pack output compressed with zstd)
+#[cfg(unix)]
+const BASE_ENV_BOOTSTRAP_VAR: &str = "PORTABLESOURCE_BASE_ENV_ARCHIVE";
+
+/// Optional SHA-256 of the archive from BASE_ENV_BOOTSTRAP_VAR
+#[cfg(unix)]
+const BASE_ENV_BOOTSTRAP_SHA256_VAR: &str = "PORTABLESOURCE_BASE_ENV_ARCHIVE_SHA256";
+
+/// Unpacks a pre-built base env into `base_prefix`; the old prefix is replaced only after a full unpack
+#[cfg(unix)]
+fn bootstrap_base_env(source: &str, expected_sha256: Option<&str>, root_prefix: &Path, base_prefix: &Path) -> Result<()> {
+    let remote = source.starts_with("http://") || source.starts_with("https://");
+    let archive = if remote {
+        let dest = root_prefix.join("mamba_env.tar.zst");
+        if let Err(e) = download_file_parallel(source, &dest, expected_sha256) {
+            let _ = fs::remove_file(&dest);
+            return Err(e);
+        }
+        dest
+    } else {
+        let path = PathBuf::from(source);
+        if let Some(expected) = expected_sha256 {
+            use sha2::{Digest, Sha256};
+            let mut hasher = Sha256::new();
+            std::io::copy(&mut fs::File::open(&path)?, &mut hasher)?;
+            let actual: String = hasher.finalize().iter().map(|b| format!("{:02x}", b)).collect();
+            if !actual.eq_ignore_ascii_case(expected.trim()) {
+                return Err(PortableSourceError::environment(format!(
+                    "Checksum mismatch for {}: expected {}, got {}", source, expected.trim(), actual
+                )));
+            }
+        }
+        path
+    };
+
+    // Распаковываем рядом и подменяем префикс только целиком распакованным окружением
+    let staging = root_prefix.join(".mamba_env.bootstrap");
+    if staging.exists() { remove_dir_all_parallel(&staging)?; }
+    fs::create_dir_all(&staging)?;
+    let unpacked = (|| -> Result<()> {
+        let decoder = zstd::stream::Decoder::new(std::io::BufReader::new(fs::File::open(&archive)?))?;
+        tar::Archive::new(decoder).unpack(&staging)
+            .map_err(|e| PortableSourceError::environment(format!("Failed to extract tar archive: {}", e)))?;
+        if !staging.join("bin").join("python").exists() {
+            return Err(PortableSourceError::environment("archive has no bin/python"));
+        }
+        Ok(())
+    })();
+    if remote { let _ = fs::remove_file(&archive); }
+    if let Err(e) = unpacked {
+        let _ = remove_dir_all_parallel(&staging);
+        return Err(e);
+    }
+
+    if base_prefix.exists() { remove_dir_all_parallel(base_prefix)?; }
+    fs::rename(&staging, base_prefix)?;
+    // conda-pack оставляет пути сборочной машины; conda-unpack переписывает их на текущий префикс
+    let conda_unpack = base_prefix.join("bin").join("conda-unpack");
+    if conda_unpack.exists() {
+        let ok = std::process::Command::new(base_prefix.join("bin").join("python"))
+            .arg(&conda_unpack)
+            .status()
+            .is_ok_and(|s| s.success());
+        if !ok {
+            let _ = remove_dir_all_parallel(base_prefix);
+            return Err(PortableSourceError::environment("conda-unpack failed"));
+        }
+    }
+    Ok(())
+}
+
+/// Channels and packages of the micromamba base env (order is part of the spec stamp hash).
+/// Только явно заданные каналы: лишние каналы из окружения раздувают repodata и задачу солвера
+#[cfg(unix)]
+const BASE_ENV_PACKAGES: &[&str] = &[
+    "--override-channels",
+    "-c", "nvidia", "-c", "conda-forge",
+    "python=3.11", "git", "ffmpeg",
+];
+
+/// CUDA runtime packages added to BASE_ENV_PACKAGES for the given version
+#[cfg(unix)]
+fn cuda_runtime_packages(v: &crate::config::CudaVersionLinux) -> [&'static str; 2] {
+    match v {
+        crate::config::CudaVersionLinux::Cuda118 => ["cuda-toolkit=11.8", "cudnn"],
+        crate::config::CudaVersionLinux::Cuda121 => ["cuda-toolkit=12.1", "cudnn"],
+        crate::config::CudaVersionLinux::Cuda124 => ["cuda-toolkit=12.4", "cudnn"],
+        crate::config::CudaVersionLinux::Cuda126 => ["cuda-toolkit=12.6", "cudnn"],
+        crate::config::CudaVersionLinux::Cuda128 => ["cuda-toolkit=12.8", "cudnn"],
+    }
+}
+
+/// Runs `micromamba <args>` with the spinner; Ok(false) when micromamba exits with an error
+#[cfg(unix)]
+fn run_micromamba_create(mamba_bin: &Path, root_prefix: &Path, args: &[String]) -> Result<bool> {
     // auto-accept ToS/licenses
-    let mut child = std::process::Command::new(&mamba_bin)
+    let mut child = std::process::Command::new(mamba_bin)
         .env("MAMBA_ALWAYS_YES", "true")
         .env("MAMBA_NO_RC", "true")
-        .env("MAMBA_ROOT_PREFIX", &root_prefix)
-        .current_dir(&root_prefix)
+        .env("MAMBA_ROOT_PREFIX", root_prefix)
+        .current_dir(root_prefix)
         .stdout(std::process::Stdio::piped())
         .stderr(std::process::Stdio::inherit())
         .args(args)
         .spawn()
         .map_err(|e| PortableSourceError::environment(format!("Failed to run micromamba: {}", e)))?;
 
-    let pb = ProgressBar::new_spinner();
-    pb.set_style(ProgressStyle::with_template("{spinner} {msg}").unwrap());
-    pb.enable_steady_tick(Duration::from_millis(120));
+    // Общий спиннер загрузок: тот же стиль и то же правило «только в терминал»
+    let pb = crate::envs_manager::create_download_progress_bar(None, "micromamba");
     if let Some(out) = child.stdout.take() {
         use std::io::{BufRead, BufReader};
-        let reader = BufReader::new(out);
-        for line in reader.lines().flatten() {
+        // Построчно по байтам: не-UTF-8 строка не теряется, и каждая строка уходит в лог сразу,
+        // а не после завершения create
+        for line in BufReader::new(out).split(b'\n').flatten() {
+            let line = String::from_utf8_lossy(&line);
             let l = line.trim();
             if !l.is_empty() {
+                log::debug!("[micromamba] {}", l);
                 pb.set_message(l.to_string());
             }
         }
     }
     let status = child.wait().map_err(|e| PortableSourceError::environment(format!("micromamba wait failed: {}", e)))?;
-    if status.success() {
-        pb.finish_with_message("micromamba: done");
-        // Verify env created
-        let py = base_prefix.join("bin").join("python");
-        if !py.exists() {
-            return Err(PortableSourceError::environment(format!(
-                "micromamba create succeeded but python not found at {}",
-                py.display()
-            )));
+    pb.finish_with_message(if status.success() { "done" } else { "failed" });
+    Ok(status.success())
+}
+
+/// Saves `micromamba env export --explicit` of the base env; a failed export only costs a solve next time
+#[cfg(unix)]
+fn export_micromamba_lock(mamba_bin: &Path, root_prefix: &Path, base_prefix: &Path, lock_path: &Path) {
+    let output = std::process::Command::new(mamba_bin)
+        .env("MAMBA_NO_RC", "true")
+        .env("MAMBA_ROOT_PREFIX", root_prefix)
+        .args(["env", "export", "--explicit", "-p"])
+        .arg(base_prefix)
+        .stderr(std::process::Stdio::null())
+        .output();
+    match output {
+        Ok(out) if out.status.success() && !out.stdout.is_empty() => {
+            let tmp = lock_path.with_extension("txt.part");
+            if fs::write(&tmp, &out.stdout).and_then(|_| fs::rename(&tmp, lock_path)).is_err() {
+                let _ = fs::remove_file(&tmp);
+            }
         }
-    } else {
-        pb.finish_with_message("micromamba: failed");
-        return Err(PortableSourceError::environment("micromamba create failed"));
+        _ => log::debug!("micromamba env export failed, lock file not written"),
     }
-    // Verify CUDA runtime presence on DESK: libcudart.so* must exist if we attempted CUDA
-    if attempted_cuda {
-        let lib_dir = base_prefix.join("lib");
-        let lib64_dir = base_prefix.join("lib64");
-        let mut found = false;
-        for dir in [&lib_dir, &lib64_dir] {
-            if dir.exists() {
-                if let Ok(read) = std::fs::read_dir(dir) {
-                    for e in read.flatten() {
-                        if let Some(name) = e.file_name().to_str() {
-                            if name.starts_with("libcudart.so") { found = true; break; }
-                        }
-                    }
-                }
+}
+
+#[cfg(unix)]
+pub fn setup_micromamba_base_env(install_path: &Path, cuda_version: Option<crate::config::CudaVersionLinux>, force_check: bool) -> Result<()> {
+    // Ensure directory layout
+    create_directory_structure(install_path)?;
+    let base_prefix = install_path.join("ps_env").join("mamba_env");
+    let root_prefix = install_path.join("ps_env");
+    let mut args: Vec<String> = vec![
+        "create".into(),
+        "-y".into(),
+        "-r".into(), root_prefix.to_string_lossy().to_string(),
+        "-p".into(), base_prefix.to_string_lossy().to_string(),
+    ];
+    args.extend(BASE_ENV_PACKAGES.iter().map(|s| s.to_string()));
+    let attempted_cuda = cuda_version.is_some();
+    if let Some(v) = cuda_version.as_ref() {
+        args.extend(cuda_runtime_packages(v).map(String::from));
+    }
+
+    // Та же спецификация, что при прошлом успешном create — база уже готова (--force-check пересобирает)
+    let spec_stamp = base_prefix.join(BASE_ENV_SPEC_STAMP);
+    let spec_hash = {
+        use sha2::{Digest, Sha256};
+        format!("{:x}", Sha256::digest(args.join("\n").as_bytes()))
+    };
+    if !force_check
+        && base_prefix.join("bin").join("python").exists()
+        && fs::read_to_string(&spec_stamp).is_ok_and(|s| s.trim() == spec_hash)
+    {
+        log::info!("micromamba base env is up to date, skipping create");
+        return Ok(());
+    }
+    let _ = fs::remove_file(&spec_stamp);
+
+    // Готовый архив базы (conda-pack, .tar.zst): без солвера и без загрузки пакетов по одному
+    if let Ok(source) = std::env::var(BASE_ENV_BOOTSTRAP_VAR) {
+        let expected = std::env::var(BASE_ENV_BOOTSTRAP_SHA256_VAR).ok();
+        match bootstrap_base_env(&source, expected.as_deref(), &root_prefix, &base_prefix) {
+            // Архив без libcudart не подходит под CUDA-спецификацию — не штампуем его, а собираем базу солвером
+            Ok(()) if attempted_cuda && !has_cuda_runtime(&base_prefix) => {
+                log::warn!("Bootstrap archive {} has no CUDA runtime — creating base env with micromamba", source);
             }
-            if found { break; }
+            Ok(()) => {
+                log::info!("micromamba base env restored from {}", source);
+                let _ = fs::write(&spec_stamp, &spec_hash);
+                return Ok(());
+            }
+            Err(e) => log::warn!("Bootstrap archive {} not used: {} — creating base env with micromamba", source, e),
+        }
+    }
+
+    let mamba_bin = ensure_micromamba_binary(install_path)?;
+
+    // Решение для одной и той же спецификации детерминировано: explicit-lock с прошлого
+    // успешного create позволяет micromamba не запускать солвер повторно
+    let lock_path = root_prefix.join(format!("lock-{}.txt", &spec_hash[..16]));
+    let mut created = false;
+    if lock_path.exists() {
+        let lock_args: Vec<String> = vec![
+            "create".into(),
+            "-y".into(),
+            "-r".into(), root_prefix.to_string_lossy().to_string(),
+            "-p".into(), base_prefix.to_string_lossy().to_string(),
+            "--file".into(), lock_path.to_string_lossy().to_string(),
+        ];
+        created = run_micromamba_create(&mamba_bin, &root_prefix, &lock_args)?;
+        if !created {
+            log::warn!("micromamba create from {} failed, solving from scratch", lock_path.display());
+            let _ = fs::remove_file(&lock_path);
+        }
+    }
+    if !created {
+        if !run_micromamba_create(&mamba_bin, &root_prefix, &args)? {
+            return Err(PortableSourceError::environment("micromamba create failed"));
         }
-        if !found {
+        export_micromamba_lock(&mamba_bin, &root_prefix, &base_prefix, &lock_path);
+    }
+    // Verify env created
+    let py = base_prefix.join("bin").join("python");
+    if !py.exists() {
+        return Err(PortableSourceError::environment(format!(
+            "micromamba create succeeded but python not found at {}",
+            py.display()
+        )));
+    }
+    // Verify CUDA runtime presence on DESK: libcudart.so* must exist if we attempted CUDA
+    if attempted_cuda {
+        if !has_cuda_runtime(&base_prefix) {
             // Fallback: try install TensorRT via pip from NVIDIA PyPI if conda TRT missing
             let py = base_prefix.join("bin").join("python");
             if py.exists() {
@@ -484,22 +1047,10 @@ pub fn setup_micromamba_base_env(install_path: &Path, cuda_version: Option<crate
                 }
             }
             // Recheck libcudart after pip fallback (usually not provided by TRT, но оставим на случай будущих wheels)
-            let mut ok = false;
-            for dir in [&lib_dir, &lib64_dir] {
-                if dir.exists() {
-                    if let Ok(read) = std::fs::read_dir(dir) {
-                        for e in read.flatten() {
-                            if let Some(name) = e.file_name().to_str() {
-                                if name.starts_with("libcudart.so") { ok = true; break; }
-                            }
-                        }
-                    }
-                }
-                if ok { break; }
-            }
-            if !ok { return Err(PortableSourceError::environment("CUDA runtime verification failed: libcudart not found")); }
+            if !has_cuda_runtime(&base_prefix) { return Err(PortableSourceError::environment("CUDA runtime verification failed: libcudart not found")); }
         }
     }
+    let _ = fs::write(&spec_stamp, &spec_hash);
     Ok(())
 }
 
@@ -513,22 +1064,26 @@ pub fn check_msvc_build_tools_installed() -> bool {
         r"C:\Program Files\Microsoft Visual Studio\2022\Community\VC\Tools\MSVC",
     ];
     
+    // Все известные каталоги проверяются до перехода к реестру; отсутствующий каталог
+    // отсеивает сам read_dir, без отдельного exists()
     for base_path in &common_paths {
-        let path = Path::new(base_path);
-        if path.exists() {
-            // Look for any version subdirectory
-            if let Ok(entries) = std::fs::read_dir(path) {
-                for entry in entries.flatten() {
-                    let cl_path = entry.path().join("bin").join("Hostx64").join("x64").join("cl.exe");
-                    if cl_path.exists() {
-                        return true;
-                    }
+        // Look for any version subdirectory
+        if let Ok(entries) = std::fs::read_dir(base_path) {
+            for entry in entries.flatten() {
+                let cl_path = entry.path().join("bin").join("Hostx64").join("x64").join("cl.exe");
+                if cl_path.is_file() {
+                    return true;
                 }
             }
         }
     }
     
-    // Also check if cl.exe is in PATH or registry Instances
+    // Registry Instances first: a key query is far cheaper than spawning cl.exe
+    if check_msvc_registry() {
+        return true;
+    }
+
+    // Also check if cl.exe is in PATH
     let mut cmd = Command::new("cl");
     cmd.arg("/?")
        .stdout(std::process::Stdio::null())
@@ -541,21 +1096,19 @@ pub fn check_msvc_build_tools_installed() -> bool {
         cmd.creation_flags(0x08000000); // CREATE_NO_WINDOW
     }
     
-    cmd.output()
-        .map(|output| output.status.success())
+    // Нужен только код возврата: вывод уже отброшен, status() не собирает буферы
+    cmd.status()
+        .map(|status| status.success())
         .unwrap_or(false)
-        || check_msvc_registry()
 }
 
 #[cfg(windows)]
 fn check_msvc_registry() -> bool {
     let hklm = RegKey::predef(HKEY_LOCAL_MACHINE);
-    if let Ok(instances) = hklm.open_subkey(r"SOFTWARE\\Microsoft\\VisualStudio\\Setup\\Instances") {
+    if let Ok(instances) = hklm.open_subkey_with_flags(r"SOFTWARE\\Microsoft\\VisualStudio\\Setup\\Instances", KEY_ENUMERATE_SUB_KEYS) {
         for subkey in instances.enum_keys().flatten() {
-            if let Ok(instance) = hklm.open_subkey(format!(
-                r"SOFTWARE\\Microsoft\\VisualStudio\\Setup\\Instances\\{}",
-                subkey
-            )) {
+            // Открываем относительно уже открытого ключа Instances, без повторного обхода от HKLM
+            if let Ok(instance) = instances.open_subkey_with_flags(&subkey, KEY_QUERY_VALUE) {
                 if let Ok::<String, _>(product_id) = instance.get_value("ProductId") {
                     if product_id.contains("BuildTools") {
                         return true;
@@ -573,10 +1126,50 @@ fn check_msvc_registry() -> bool {
     false
 }
 
+/// Download an installer into a persistent cache path, revalidating an existing copy by ETag.
+/// 304 Not Modified переиспользует файл с диска без передачи тела
+fn fetch_cached_installer(url: &str, installer_path: &Path) -> Result<()> {
+    use std::io::copy;
+    use reqwest::header::{ETAG, IF_NONE_MATCH};
+
+    let etag_path = installer_path.with_extension("etag");
+    let mut request = download_client()?.get(url);
+    if installer_path.is_file() {
+        if let Ok(tag) = fs::read_to_string(&etag_path) {
+            request = request.header(IF_NONE_MATCH, tag.trim());
+        }
+    }
+    let mut resp = send_with_retry(request)?;
+    if resp.status() == reqwest::StatusCode::NOT_MODIFIED {
+        log::info!("Installer unchanged, using cached {:?}", installer_path);
+        return Ok(());
+    }
+    if !resp.status().is_success() {
+        return Err(PortableSourceError::installation(format!(
+            "Failed to download installer: HTTP {}",
+            resp.status()
+        )));
+    }
+    let etag = resp.headers().get(ETAG).and_then(|v| v.to_str().ok()).map(str::to_owned);
+    // Старый ETag снимаем до записи: прерванная загрузка не должна выглядеть актуальной
+    let _ = fs::remove_file(&etag_path);
+
+    log::info!("Downloading installer to {:?}...", installer_path);
+    let mut file = std::io::BufWriter::with_capacity(DOWNLOAD_CHUNK_SIZE, std::fs::File::create(installer_path)?);
+    copy(&mut resp, &mut file)?;
+    let file = file.into_inner().map_err(|e| e.into_error())?;
+    // Ensure data is fully flushed and file handle is closed before executing (Windows lock avoidance)
+    let _ = file.sync_all();
+    drop(file);
+
+    if let Some(tag) = etag {
+        let _ = fs::write(&etag_path, tag);
+    }
+    Ok(())
+}
+
 /// Download and run MSVC Build Tools installer (blocking)
 pub fn install_msvc_build_tools() -> Result<()> {
-    use reqwest::blocking::Client;
-    use std::io::copy;
     
     // Prefer winget if available (often faster and more reliable)
     // Helper: choose one SDK depending on OS build (Win11 vs Win10)
@@ -584,19 +1177,27 @@ pub fn install_msvc_build_tools() -> Result<()> {
     fn detect_windows_sdk_component() -> &'static str {
         use winreg::enums::*;
         use winreg::RegKey;
-        let hklm = RegKey::predef(HKEY_LOCAL_MACHINE);
-        if let Ok(key) = hklm.open_subkey("SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion") {
-            if let Ok(build_str) = key.get_value::<String, _>("CurrentBuildNumber") {
-                if build_str.parse::<u32>().unwrap_or(0) >= 22000 {
-                    return "Microsoft.VisualStudio.Component.Windows11SDK.26100";
+        // Сборка ОС не меняется за время процесса — читаем реестр один раз
+        static SDK_COMPONENT: std::sync::OnceLock<&'static str> = std::sync::OnceLock::new();
+        *SDK_COMPONENT.get_or_init(|| {
+            let hklm = RegKey::predef(HKEY_LOCAL_MACHINE);
+            // Ключ закрывается при drop, в том числе на ранних выходах
+            if let Ok(key) = hklm.open_subkey_with_flags("SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion", KEY_QUERY_VALUE) {
+                if let Ok(build_str) = key.get_value::<String, _>("CurrentBuildNumber") {
+                    if build_str.parse::<u32>().unwrap_or(0) >= 22000 {
+                        return "Microsoft.VisualStudio.Component.Windows11SDK.26100";
+                    }
                 }
             }
-        }
-        "Microsoft.VisualStudio.Component.Windows10SDK.19041"
+            "Microsoft.VisualStudio.Component.Windows10SDK.19041"
+        })
     }
     #[cfg(not(windows))]
     fn detect_windows_sdk_component() -> &'static str { "Microsoft.VisualStudio.Component.Windows10SDK.19041" }
 
+    // Один запрос к реестру на оба пути установки (winget и bootstrapper)
+    let sdk_component = detect_windows_sdk_component();
+
     if which::which("winget").is_ok() {
         let args = concat!(
             " --quiet --wait --norestart --nocache",
@@ -618,7 +1219,7 @@ pub fn install_msvc_build_tools() -> Result<()> {
             .arg("--disable-interactivity")
             // Важно: без обрамляющих кавычек, Command сам корректно экранирует аргумент
             .arg("--override")
-            .arg(format!("{} --add {}", args.trim(), detect_windows_sdk_component()))
+            .arg(format!("{} --add {}", args.trim(), sdk_component))
             // На некоторых системах нужно явно указать источник
             .arg("--source").arg("winget");
         let status = cmd.status();
@@ -649,7 +1250,7 @@ pub fn install_msvc_build_tools() -> Result<()> {
             " --add Microsoft.VisualStudio.Component.VC.AddressSanitizer",
             " --add Microsoft.VisualStudio.Component.VC.Redist.14.Latest"
         ),
-        detect_windows_sdk_component()
+        sdk_component
     );
 
     log::info!("Starting MSVC Build Tools installation...");
@@ -659,26 +1260,7 @@ pub fn install_msvc_build_tools() -> Result<()> {
     let temp_dir = std::env::temp_dir().join("portablesource");
     fs::create_dir_all(&temp_dir)?;
     let installer_path = temp_dir.join("vs_buildtools.exe");
-    // Best-effort cleanup of previous leftover/locked file
-    if installer_path.exists() { let _ = std::fs::remove_file(&installer_path); }
-
-    // Download file
-    log::info!("Downloading installer to {:?}...", installer_path);
-    let client = Client::builder()
-        .timeout(Duration::from_secs(600))
-        .build()?;
-    let mut resp = client.get(&url).send()?;
-    if !resp.status().is_success() {
-        return Err(PortableSourceError::installation(format!(
-            "Failed to download installer: HTTP {}",
-            resp.status()
-        )));
-    }
-    let mut file = std::fs::File::create(&installer_path)?;
-    copy(&mut resp, &mut file)?;
-    // Ensure data is fully flushed and file handle is closed before executing (Windows lock avoidance)
-    let _ = file.sync_all();
-    drop(file);
+    fetch_cached_installer(&url, &installer_path)?;
 
     // Run installer
     log::info!("Running installer (this may take a while)...");
@@ -694,9 +1276,6 @@ pub fn install_msvc_build_tools() -> Result<()> {
             .map_err(|e| PortableSourceError::command(format!("Failed to start installer: {}", e)))?
     };
 
-    // Cleanup best-effort
-    let _ = std::fs::remove_file(&installer_path);
-
     if status.success() {
         log::info!("[OK] MSVC Build Tools installed successfully");
         Ok(())
@@ -710,9 +1289,6 @@ pub fn install_msvc_build_tools() -> Result<()> {
 
 /// Install MSVC Build Tools using a provided install path for temp storage
 pub fn install_msvc_build_tools_with_path(install_path: &Path) -> Result<()> {
-    use reqwest::blocking::Client;
-    use std::io::copy;
-
     let (url, args) = ConfigManager::new(None)
         .map(|cm| cm.msvc_bt_config())
         .unwrap_or_else(|_| (
@@ -726,18 +1302,7 @@ pub fn install_msvc_build_tools_with_path(install_path: &Path) -> Result<()> {
     let temp_dir = install_path.join("tmp");
     fs::create_dir_all(&temp_dir)?;
     let installer_path = temp_dir.join("vs_buildtools.exe");
-
-    log::info!("Downloading installer to {:?}...", installer_path);
-    let client = Client::builder().timeout(Duration::from_secs(600)).build()?;
-    let mut resp = client.get(&url).send()?;
-    if !resp.status().is_success() {
-        return Err(PortableSourceError::installation(format!(
-            "Failed to download installer: HTTP {}",
-            resp.status()
-        )));
-    }
-    let mut file = std::fs::File::create(&installer_path)?;
-    copy(&mut resp, &mut file)?;
+    fetch_cached_installer(&url, &installer_path)?;
 
     log::info!("Running installer (this may take a while)...");
     let status = Command::new(&installer_path)
@@ -745,8 +1310,6 @@ pub fn install_msvc_build_tools_with_path(install_path: &Path) -> Result<()> {
         .status()
         .map_err(|e| PortableSourceError::command(format!("Failed to start installer: {}", e)))?;
 
-    let _ = std::fs::remove_file(&installer_path);
-
     if status.success() {
         log::info!("[OK] MSVC Build Tools installed successfully");
         Ok(())
@@ -816,19 +1379,25 @@ fn linux_detect_package_manager() -> LinuxPackageManager {
 
 #[cfg(unix)]
 fn linux_collect_tool_status() -> Vec<(&'static str, String)> {
-    use std::process::Command;
+    use std::process::{Command, Stdio};
     let mut out = Vec::new();
     let has = |bin: &str| which::which(bin).is_ok();
+    // Пробы python3 независимы: запускаем все сразу и ждём вместе, а не платим за старт интерпретатора трижды подряд
+    let probe = |args: &[&str]| Command::new("python3").args(args).stdout(Stdio::null()).stderr(Stdio::null()).spawn().ok();
+    let wait_ok = |child: Option<std::process::Child>| child.and_then(|mut c| c.wait().ok()).map(|s| s.success()).unwrap_or(false);
+    let venv_probe = probe(&["-c", "import venv"]);
+    let pip_probe = if has("pip3") { None } else { probe(&["-m", "pip", "--version"]) };
+    let pyconf_probe = if has("python3-config") { None } else { probe(&["-c", "import sysconfig;print(sysconfig.get_config_var('INCLUDEPY') or '')"]) };
     out.push(("git", if has("git") { "OK".to_string() } else { "Missing".to_string() }));
     out.push(("python3", if has("python3") { "OK".to_string() } else { "Missing".to_string() }));
     // venv module
-    let venv_ok = Command::new("python3").arg("-c").arg("import venv").status().map(|s| s.success()).unwrap_or(false);
+    let venv_ok = wait_ok(venv_probe);
     out.push(("python3-venv", if venv_ok { "OK".to_string() } else { "Missing".to_string() }));
     // pip3
-    let pip_ok = has("pip3") || Command::new("python3").arg("-m").arg("pip").arg("--version").status().map(|s| s.success()).unwrap_or(false);
+    let pip_ok = has("pip3") || wait_ok(pip_probe);
     out.push(("python3-pip", if pip_ok { "OK".to_string() } else { "Missing".to_string() }));
     // dev headers: python3-dev / python3-devel / (arch: part of python)
-    let pyconf_ok = has("python3-config") || Command::new("python3").arg("-c").arg("import sysconfig;print(sysconfig.get_config_var('INCLUDEPY') or '')").status().map(|s| s.success()).unwrap_or(false);
+    let pyconf_ok = has("python3-config") || wait_ok(pyconf_probe);
     out.push(("python3-dev", if pyconf_ok { "OK".to_string() } else { "Missing".to_string() }));
     out.push(("ffmpeg", if has("ffmpeg") { "OK".to_string() } else { "Missing".to_string() }));
     // optional nvcc
@@ -944,7 +1513,8 @@ pub fn get_system_info() -> Result<String> {
     // Available tools (cross-platform detection)
     let git_ok = which::which("git").is_ok();
     let py_ok = which::which("python3").is_ok() || which::which("python").is_ok();
-    let pip_ok = which::which("pip3").is_ok() || {
+    // `python -m pip` запускаем, только если pip не нашёлся в PATH
+    let pip_ok = which::which("pip3").is_ok() || which::which("pip").is_ok() || {
         let py = if which::which("python3").is_ok() { "python3" } else { "python" };
         let mut cmd = std::process::Command::new(py);
         cmd.args(["-m", "pip", "--version"]);
@@ -1059,10 +1629,10 @@ pub fn show_system_info_detailed(install_path: &Path, config_manager: &ConfigMan
     log::info!("  - Operating system: {}", os_name);
 
     // Directory structure
-    log::info!("  - Directory structure:");
-    log::info!("    * {}{}ps_env", install_path.display(), slash);
-    log::info!("    * {}{}repos", install_path.display(), slash);
-    log::info!("    * {}{}envs", install_path.display(), slash);
+    let root = install_path.display();
+    log::info!(
+        "  - Directory structure:\n    * {root}{slash}ps_env\n    * {root}{slash}repos\n    * {root}{slash}envs"
+    );
 
     // GPU information
     if config_manager.has_cuda() {
@@ -1088,15 +1658,98 @@ pub fn show_system_info_detailed(install_path: &Path, config_manager: &ConfigMan
     Ok(())
 }
 
-/// Interactive change of installation path, saves to registry and config
-pub fn change_installation_path_interactive(config_manager: &mut ConfigManager) -> Result<()> {
+/// Print `prompt` and read one trimmed line; `None` on EOF
+fn read_prompt_line(prompt: &str) -> Result<Option<String>> {
     use std::io::{self, Write};
+    print!("{}", prompt);
+    io::stdout().flush().ok();
+    let mut input = String::new();
+    let read = io::stdin().read_line(&mut input)
+        .map_err(|e| PortableSourceError::installation(format!("Failed to read input: {}", e)))?;
+    Ok(if read == 0 { None } else { Some(input.trim().to_string()) })
+}
+
+/// Interpret a y/n answer (English or Russian)
+fn parse_yes_no(answer: &str) -> Option<bool> {
+    match answer.to_lowercase().as_str() {
+        "y" | "yes" | "д" | "да" => Some(true),
+        "n" | "no" | "н" | "нет" => Some(false),
+        _ => None,
+    }
+}
+
+/// Ask a y/n question until it is answered; EOF or a read error counts as "no"
+pub fn prompt_yes_no(prompt: &str) -> bool {
+    loop {
+        match read_prompt_line(prompt) {
+            Ok(Some(answer)) => match parse_yes_no(&answer) {
+                Some(choice) => return choice,
+                None => println!("Please enter 'y' or 'n'"),
+            },
+            _ => return false,
+        }
+    }
+}
 
+/// Names of the entries in `dir` from a single read_dir; `None` if the directory can't be read
+pub fn list_dir_names(dir: &Path) -> Option<HashSet<String>> {
+    let entries = fs::read_dir(dir).ok()?;
+    Some(entries.flatten().filter_map(|e| e.file_name().into_string().ok()).collect())
+}
+
+/// Key for comparing file names from an in-memory listing the way the filesystem would:
+/// на Windows (NTFS) имена регистронезависимы, на Linux — нет
+pub(crate) fn file_name_key(name: &str) -> String {
+    if cfg!(windows) { name.to_lowercase() } else { name.to_string() }
+}
+
+/// Remove a directory tree, deleting its top-level entries from several threads.
+/// Окружения содержат десятки тысяч мелких файлов: последовательный unlink упирается в задержку
+/// каждого вызова, а параллельные удаления ФС обслуживает заметно быстрее
+pub(crate) fn remove_dir_all_parallel(path: &Path) -> std::io::Result<()> {
+    use std::sync::atomic::{AtomicUsize, Ordering};
+    let entries: Vec<fs::DirEntry> = fs::read_dir(path)?.flatten().collect();
+    let workers = std::thread::available_parallelism().map(|n| n.get()).unwrap_or(4).min(8).min(entries.len());
+    if workers > 1 {
+        let next = AtomicUsize::new(0);
+        std::thread::scope(|s| {
+            for _ in 0..workers {
+                s.spawn(|| {
+                    while let Some(entry) = entries.get(next.fetch_add(1, Ordering::Relaxed)) {
+                        // Ошибки здесь не фатальны: остатки дочищает финальный remove_dir_all
+                        let _ = match entry.file_type() {
+                            Ok(t) if t.is_dir() => fs::remove_dir_all(entry.path()),
+                            _ => fs::remove_file(entry.path()),
+                        };
+                    }
+                });
+            }
+        });
+    }
+    fs::remove_dir_all(path)
+}
+
+/// True if `path` is a directory with at least one entry; stops at the first entry
+fn dir_is_nonempty(path: &Path) -> bool {
+    fs::read_dir(path).map(|mut it| it.next().is_some()).unwrap_or(false)
+}
+
+/// Ask for a path; empty input (or EOF) selects `default`, anything else is validated and created
+fn prompt_path(prompt: &str, default: &Path) -> Result<PathBuf> {
+    match read_prompt_line(prompt)? {
+        Some(input) if !input.is_empty() => validate_and_get_path(&input),
+        _ => Ok(default.to_path_buf()),
+    }
+}
+
+/// Interactive change of installation path, saves to registry and config
+pub fn change_installation_path_interactive(config_manager: &mut ConfigManager) -> Result<()> {
     println!("\n============================================================");
     println!("CHANGE PORTABLESOURCE INSTALLATION PATH");
     println!("============================================================");
 
-    if let Some(reg_path) = load_install_path_from_registry()? {
+    let current_path = load_install_path_from_registry()?;
+    if let Some(reg_path) = &current_path {
         println!("\nCurrent installation path: {}", reg_path.display());
     } else {
         println!("\nCurrent installation path not found in registry");
@@ -1108,26 +1761,18 @@ pub fn change_installation_path_interactive(config_manager: &mut ConfigManager)
     println!("1. Press Enter to use the default path");
     println!("2. Enter your own installation path");
 
-    print!("\nEnter new installation path (or Enter for default): ");
-    io::stdout().flush().ok();
-    let mut input = String::new();
-    io::stdin().read_line(&mut input).map_err(|e| PortableSourceError::installation(format!("Failed to read input: {}", e)))?;
-    let input = input.trim();
-
-    let new_path = if input.is_empty() { default_path } else { validate_and_get_path(input)? };
+    let input = read_prompt_line("\nEnter new installation path (or Enter for default): ")?.unwrap_or_default();
+    // Тот же путь, что уже записан: ни проверок каталога, ни записи в реестр
+    let candidate = if input.is_empty() { default_path.clone() } else { PathBuf::from(&input) };
+    if let Some(current) = current_path.as_deref().filter(|current| same_install_path(&candidate, current)) {
+        println!("\nInstallation path unchanged: {}", current.display());
+        return Ok(());
+    }
+    let new_path = if input.is_empty() { default_path } else { validate_and_get_path(&input)? };
 
     println!("\nNew installation path: {}", new_path.display());
-    if new_path.exists() && fs::read_dir(&new_path).map(|mut it| it.next().is_some()).unwrap_or(false) {
-        loop {
-            print!("Continue? (y/n): ");
-            io::stdout().flush().ok();
-            let mut confirm = String::new();
-            io::stdin().read_line(&mut confirm).ok();
-            let c = confirm.trim().to_lowercase();
-            if c == "y" || c == "yes" { break; }
-            if c == "n" || c == "no" { println!("Path change cancelled."); return Ok(()); }
-            println!("Please enter 'y' or 'n'");
-        }
+    if dir_is_nonempty(&new_path) {
+        if !prompt_yes_no("Continue? (y/n): ") { println!("Path change cancelled."); return Ok(()); }
     }
 
     save_install_path_to_registry(&new_path)?;
@@ -1167,7 +1812,8 @@ impl PortableSourceApp {
         if cfg.get_config().install_path.as_os_str().is_empty() {
             cfg.set_install_path(install_path.clone())?;
         }
-        self.environment_manager = Some(PortableEnvironmentManager::new(install_path.clone()));
+        // Reuse the config loaded above instead of reading it a second time
+        self.environment_manager = Some(PortableEnvironmentManager::with_config(install_path.clone(), cfg.clone()));
         self.repository_installer = Some(RepositoryInstaller::new(install_path.clone(), cfg.clone()));
         self.config_manager = Some(cfg);
         Ok(())
@@ -1175,8 +1821,6 @@ impl PortableSourceApp {
 
     fn get_installation_path_interactive(&self) -> Result<PathBuf> {
         if let Some(path) = load_install_path_from_registry()? { return Ok(path); }
-        #[cfg(windows)]
-        use std::io::{self, Write};
         println!("\n============================================================");
         println!("PORTABLESOURCE INSTALLATION PATH SETUP");
         println!("============================================================");
@@ -1200,25 +1844,12 @@ impl PortableSourceApp {
             println!("1. Press Enter to use the default path");
             println!("2. Enter your own installation path");
 
-            print!("\nEnter installation path (or Enter for default): ");
-            io::stdout().flush().ok();
-            let mut input = String::new();
-            io::stdin().read_line(&mut input).ok();
-            let input = input.trim();
-
-            let chosen = if input.is_empty() { default_path } else { validate_and_get_path(input)? };
+            let chosen = prompt_path("\nEnter installation path (or Enter for default): ", &default_path)?;
             println!("\nChosen installation path: {}", chosen.display());
 
-            if chosen.exists() && fs::read_dir(&chosen).map(|mut it| it.next().is_some()).unwrap_or(false) {
-                loop {
-                    print!("Continue? (y/n): ");
-                    io::stdout().flush().ok();
-                    let mut confirm = String::new();
-                    io::stdin().read_line(&mut confirm).ok();
-                    let c = confirm.trim().to_lowercase();
-                    if c == "y" || c == "yes" { break; }
-                    if c == "n" || c == "no" { return Err(PortableSourceError::installation("Installation cancelled")); }
-                    println!("Please enter 'y' or 'n'");
+            if dir_is_nonempty(&chosen) {
+                if !prompt_yes_no("Continue? (y/n): ") {
+                    return Err(PortableSourceError::installation("Installation cancelled"));
                 }
             }
 
@@ -1227,9 +1858,21 @@ impl PortableSourceApp {
         }
     }
 
+    fn root(&self) -> Result<&PathBuf> {
+        self.install_path.as_ref().ok_or_else(|| PortableSourceError::installation("Installation path not initialized"))
+    }
+
+    fn installer(&self) -> Result<&RepositoryInstaller> {
+        self.repository_installer.as_ref().ok_or_else(|| PortableSourceError::repository("Repository installer not initialized"))
+    }
+
+    fn installer_mut(&mut self) -> Result<&mut RepositoryInstaller> {
+        self.repository_installer.as_mut().ok_or_else(|| PortableSourceError::repository("Repository installer not initialized"))
+    }
+
     pub async fn setup_environment(&mut self) -> Result<()> {
-        if self.environment_manager.is_none() { return Err(PortableSourceError::environment("Environment manager not initialized")); }
-        let env_mgr = self.environment_manager.as_ref().unwrap();
+        let env_mgr = self.environment_manager.as_ref()
+            .ok_or_else(|| PortableSourceError::environment("Environment manager not initialized"))?;
         env_mgr.setup_environment().await?;
 
         if let Some(cfg) = self.config_manager.as_mut() {
@@ -1241,35 +1884,34 @@ impl PortableSourceApp {
     }
 
     pub async fn install_repository(&mut self, repo: &str) -> Result<()> {
-        let installer = self.repository_installer.as_mut().ok_or_else(|| PortableSourceError::repository("Repository installer not initialized"))?;
-        installer.install_repository(repo).await
+        self.installer_mut()?.install_repository(repo).await.map(|_| ())
     }
 
     pub async fn update_repository(&mut self, repo: &str) -> Result<()> {
-        let installer = self.repository_installer.as_mut().ok_or_else(|| PortableSourceError::repository("Repository installer not initialized"))?;
-        installer.update_repository(repo).await
+        self.installer_mut()?.update_repository(repo).await
     }
 
     pub fn delete_repository(&self, repo: &str) -> Result<()> {
-        let installer = self.repository_installer.as_ref().ok_or_else(|| PortableSourceError::repository("Repository installer not initialized"))?;
-        installer.delete_repository(repo)
+        self.installer()?.delete_repository(repo)
     }
 
     pub fn list_installed_repositories(&self) -> Result<Vec<String>> {
-        let installer = self.repository_installer.as_ref().ok_or_else(|| PortableSourceError::repository("Repository installer not initialized"))?;
-        installer.list_repositories()
+        self.installer()?.list_repositories()
     }
 
     pub fn show_system_info_with_repos(&self) -> Result<()> {
-        let install_path = self.install_path.as_ref().ok_or_else(|| PortableSourceError::installation("Installation path not initialized"))?;
+        let install_path = self.root()?;
         let cfg = self.config_manager.as_ref().ok_or_else(|| PortableSourceError::config("Config manager not initialized"))?;
         let env_ref = self.environment_manager.as_ref();
         show_system_info_detailed(install_path, cfg, env_ref)?;
         if let Ok(repos) = self.list_installed_repositories() {
-            log::info!("  - Installed repositories: {}", repos.len());
-            for repo in repos {
-                log::info!("    * {}", repo);
+            // Одна запись лога на весь список вместо строки на каждый репозиторий
+            let mut record = format!("  - Installed repositories: {}", repos.len());
+            for repo in &repos {
+                record.push_str("\n    * ");
+                record.push_str(repo);
             }
+            log::info!("{}", record);
         }
         Ok(())
     }
@@ -1297,7 +1939,7 @@ pub async fn uninstall_portablesource(install_path: &PathBuf) -> Result<()> {
     
     // Remove the entire installation directory
     if install_path.exists() {
-        match fs::remove_dir_all(install_path) {
+        match remove_dir_all_parallel(install_path) {
             Ok(_) => println!("[SUCCESS] Environment directory removed: {}", install_path.display()),
             Err(e) => {
                 log::error!("Failed to remove environment directory: {}", e);
@@ -1355,18 +1997,18 @@ pub async fn uninstall_portablesource(install_path: &PathBuf) -> Result<()> {
 pub async fn run_repository(repo: &str, install_path: &PathBuf, additional_args: &[String]) -> Result<()> {
     let repo_path = install_path.join("repos").join(repo);
     
-    if !repo_path.exists() {
-        println!("[ERROR] Repository '{}' not found at: {}", repo, repo_path.display());
-        return Err(PortableSourceError::repository(format!("Repository '{}' not installed", repo)));
-    }
-    
     // Look for start script based on platform
     #[cfg(windows)]
     let start_script = repo_path.join(format!("start_{}.bat", repo));
     #[cfg(unix)]
     let start_script = repo_path.join(format!("start_{}.sh", repo));
     
-    if !start_script.exists() {
+    // Обычный случай — скрипт на месте: один stat; папку репозитория проверяем только при промахе
+    if !start_script.is_file() {
+        if !repo_path.is_dir() {
+            println!("[ERROR] Repository '{}' not found at: {}", repo, repo_path.display());
+            return Err(PortableSourceError::repository(format!("Repository '{}' not installed", repo)));
+        }
         println!("[ERROR] Start script not found: {}", start_script.display());
         return Err(PortableSourceError::repository(format!("Start script for '{}' not found", repo)));
     }
@@ -1531,6 +2173,58 @@ mod tests {
         assert_eq!(format_file_size(1048576), "1.0 MB");
     }
     
+    #[test]
+    fn test_tokenize_user_profile() {
+        assert_eq!(
+            tokenize_user_profile(r"C:\Users\Bob\PortableSource", r"C:\Users\Bob"),
+            Some(r"%USERPROFILE%\PortableSource".to_string())
+        );
+        assert_eq!(
+            tokenize_user_profile(r"c:\users\bob\PS", r"C:\Users\Bob\"),
+            Some(r"%USERPROFILE%\PS".to_string())
+        );
+        assert_eq!(tokenize_user_profile(r"C:\Users\Bob", r"C:\Users\Bob"), Some("%USERPROFILE%".to_string()));
+        assert_eq!(tokenize_user_profile(r"C:\Users\Bobby\PS", r"C:\Users\Bob"), None);
+        assert_eq!(tokenize_user_profile(r"D:\PortableSource", r"C:\Users\Bob"), None);
+    }
+
+    #[test]
+    fn test_expand_env_tokens() {
+        let lookup = |name: &str| (name == "USERPROFILE").then(|| r"C:\Users\Bob".to_string());
+        assert_eq!(expand_env_tokens(r"%USERPROFILE%\PS", lookup), r"C:\Users\Bob\PS");
+        assert_eq!(expand_env_tokens(r"%MISSING%\PS", lookup), r"%MISSING%\PS");
+        assert_eq!(expand_env_tokens("100% sure", lookup), "100% sure");
+        assert_eq!(expand_env_tokens(r"D:\PS", lookup), r"D:\PS");
+    }
+
+    #[test]
+    fn test_parse_yes_no() {
+        assert_eq!(parse_yes_no("y"), Some(true));
+        assert_eq!(parse_yes_no("YES"), Some(true));
+        assert_eq!(parse_yes_no("n"), Some(false));
+        assert_eq!(parse_yes_no("No"), Some(false));
+        assert_eq!(parse_yes_no("Да"), Some(true));
+        assert_eq!(parse_yes_no("нет"), Some(false));
+        assert_eq!(parse_yes_no(""), None);
+        assert_eq!(parse_yes_no("maybe"), None);
+    }
+
+    #[test]
+    fn test_same_install_path() {
+        let base = std::env::temp_dir().join("portablesource");
+        let with_slash = PathBuf::from(format!("{}/", base.display()));
+        assert!(same_install_path(&base, &with_slash));
+        assert!(!same_install_path(&base, &base.join("repos")));
+    }
+
+    #[test]
+    fn test_download_buffer_size() {
+        assert_eq!(download_buffer_size(None), DOWNLOAD_CHUNK_SIZE);
+        assert_eq!(download_buffer_size(Some(100 * 1024)), 64 * 1024);
+        assert_eq!(download_buffer_size(Some(16_000_000)), 250_000);
+        assert_eq!(download_buffer_size(Some(500_000_000)), DOWNLOAD_CHUNK_SIZE);
+    }
+
     #[test]
     fn test_is_command_available() {
         // These should be available on most systems